@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'tr4cking_rest_api'
@@ -46,6 +47,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Primero para medir también las consultas de sesión y autenticación;
+    # no hace nada si TR4CKING_INSTRUMENTACION es False
+    'tr4cking_rest_api.instrumentacion.InstrumentacionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  
     "corsheaders.middleware.CorsMiddleware",
@@ -108,6 +112,19 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Memoria local por defecto. Con varios procesos (gunicorn) usar un backend
+# compartido, p. ej. django.core.cache.backends.redis.RedisCache, para que la
+# invalidación de los catálogos llegue a todos.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tr4cking',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -156,6 +173,64 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Django REST Framework
+# Paginación por cursor en todos los listados; ver tr4cking_rest_api/paginacion.py
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'tr4cking_rest_api.paginacion.CursorPaginacion',
+    'PAGE_SIZE': 50,
+}
+
+# Tr4cking
+# Minutos que un asiento queda retenido para una reserva antes de liberarse
+
+TR4CKING_RETENCION_ASIENTO_MINUTOS = 10
+
+# Plantillas de distribución de asientos por bus (tramos en orden de numeración).
+# 'estandar' (un piso, todo Semi-cama) está siempre disponible.
+TR4CKING_PLANTILLAS_ASIENTOS = {
+    'doble_piso': [
+        {'piso': 1, 'tipo_asiento': 'Cama', 'cantidad': 12},
+        {'piso': 2, 'tipo_asiento': 'Semi-cama'},
+    ],
+}
+
+# Cache de respuestas de catálogos (rutas, paradas, localidades, empresas,
+# tipos de documento): alias de CACHES y vida máxima de cada respuesta
+TR4CKING_CACHE_ALIAS = 'default'
+TR4CKING_CACHE_CATALOGOS_SEGUNDOS = 3600
+
+# Segundos que se recuerda la caja abierta de cada empleado o terminal; abrir
+# o cerrar una caja invalida el cache de inmediato
+TR4CKING_CACHE_CAJA_SEGUNDOS = 30
+
+# Máximos por escenario del comando benchmark_endpoints: patrones fnmatch
+# ('pasajes:list', '*:create', 'reserva:*') con p50_ms, p95_ms, consultas y/o
+# bytes. Si varios coinciden, el que aparece después pisa al anterior
+TR4CKING_BENCHMARK_PRESUPUESTOS = {
+    '*': {'p95_ms': 500, 'consultas': 20},
+    '*:list': {'consultas': 8, 'bytes': 100000},
+    '*:retrieve': {'consultas': 8},
+    'users:create': {'p95_ms': 1500},  # Hash de la contraseña
+    'reserva:reservar+emitir': {'consultas': 60},
+}
+
+# Instrumentación por request (consultas, tiempo en la base, N+1,
+# serialización): Server-Timing, log 'tr4cking.instrumentacion' e histogramas
+# en /api/instrumentacion/. Un request es N+1 si repite la misma consulta
+# UMBRAL veces; cada proceso vuelca sus histogramas al cache cada VOLCADO segundos
+TR4CKING_INSTRUMENTACION = False
+TR4CKING_INSTRUMENTACION_UMBRAL_N_MAS_1 = 5
+TR4CKING_INSTRUMENTACION_VOLCADO_SEGUNDOS = 10
+
+# Resultados por defecto y máximos del autocompletado /api/personas/buscar/
+TR4CKING_BUSQUEDA_PERSONAS_LIMITE = 10
+TR4CKING_BUSQUEDA_PERSONAS_MAXIMO = 50
+
+# Tasa de IVA (0, 5 o 10) de cada concepto facturado; los precios la incluyen
+TR4CKING_IVA_PASAJE = 10
+TR4CKING_IVA_ENCOMIENDA = 10
+
 from django.templatetags.static import static
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
@@ -6,15 +8,20 @@ from django.core.exceptions import ValidationError
 from django.contrib import messages
 from django.urls import path
 from django.shortcuts import redirect
+from django.utils import timezone
 from unfold.admin import ModelAdmin, TabularInline, StackedInline
 from .models import (
     Persona, UsuarioPersona, Cliente, Pasajero,
     Empresa, Empleado, Localidad, Parada,
     Bus, Asiento, Ruta, DetalleRuta,
-    Viaje, Pasaje, Reserva, Encomienda,
+    Viaje, Pasaje, Reserva, Encomienda, EventoEncomienda,
     TipoDocumento, Timbrado, CabeceraFactura, DetalleFactura, HistorialFactura,
-    Caja, CabeceraCaja, DetalleCaja
+    Caja, CabeceraCaja, DetalleCaja, AsientoViaje, TramoRuta, VentaDiaria, PuntoExpedicion, Horario,
+    MAX_PARADAS_RUTA,
 )
+from .numeracion import NumeracionNoDisponible, numerar_factura, punto_para
+from .cajas import caja_abierta, cambiar_fondo
+from .horarios import generar_viajes
 
 
 admin.site.site_header = 'Tr4cking'
@@ -28,8 +35,17 @@ class UsuarioPersonaInline(StackedInline):
     can_delete = False
     verbose_name_plural = 'Información Personal'
 
+class DetalleRutaFormSet(forms.BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        # Cada formulario valida contra lo guardado; acá se cuentan también las filas nuevas
+        paradas = sum(1 for form in self.forms if form.cleaned_data and not form.cleaned_data.get('DELETE'))
+        if paradas > MAX_PARADAS_RUTA:
+            raise ValidationError(f"Una ruta admite hasta {MAX_PARADAS_RUTA} paradas")
+
 class DetalleRutaInline(TabularInline):
     model = DetalleRuta
+    formset = DetalleRutaFormSet
     extra = 1
 
 class AsientoInline(TabularInline):
@@ -42,6 +58,17 @@ class DetalleFacturaInline(TabularInline):
     fields = ('pasaje', 'encomienda', 'cantidad', 'precio_unitario', 'iva_porcentaje', 'subtotal')
     readonly_fields = ('subtotal',)
 
+class EventoEncomiendaInline(TabularInline):
+    # Solo lectura: los eventos se agregan con seguimiento.registrar_evento
+    model = EventoEncomienda
+    extra = 0
+    can_delete = False
+    fields = ('tipo', 'fecha', 'parada', 'viaje', 'empleado', 'observaciones')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 # Custom User Admin
 class CustomUserAdmin(UserAdmin):
     inlines = (UsuarioPersonaInline,)
@@ -59,13 +86,20 @@ admin.site.register(User, CustomUserAdmin)
 @admin.register(Persona)
 class PersonaAdmin(ModelAdmin):
     list_display = ('cedula', 'nombre', 'apellido', 'telefono')
-    search_fields = ('cedula', 'nombre', 'apellido')
+    # nombre y apellido tienen índices de trigramas; la cédula se compara
+    # exacta (ver get_search_results) en vez de como texto
+    search_fields = ('nombre', 'apellido')
     ordering = ('apellido', 'nombre')
     unfold_form_tabs = [
         ("Información Personal", ["cedula", "nombre", "apellido"]),
         ("Contacto", ["telefono", "email"]),
     ]
 
+    def get_search_results(self, request, queryset, search_term):
+        if search_term.strip().isdigit():
+            return queryset.filter(cedula=int(search_term)), False
+        return super().get_search_results(request, queryset, search_term)
+
 @admin.register(Cliente)
 class ClienteAdmin(ModelAdmin):
     list_display = ('id_cliente', 'get_nombre', 'dv', 'razon_social', 'fecha_registro')
@@ -140,25 +174,25 @@ class BusAdmin(ModelAdmin):
     inlines = [AsientoInline]
     unfold_form_tabs = [
         ("Información del Bus", ["placa", "empresa", "marca", "modelo"]),
-        ("Capacidad", ["capacidad", "tipo_bus"]),
+        ("Capacidad", ["capacidad", "plantilla_asientos"]),
         ("Estado", ["estado", "observaciones"]),
     ]
 
 @admin.register(Asiento)
 class AsientoAdmin(admin.ModelAdmin):
-    list_display = ('bus', 'numero_asiento', 'estado', 'tipo_asiento')
-    list_filter = ('bus', 'estado', 'tipo_asiento')
+    list_display = ('bus', 'numero_asiento', 'piso', 'estado', 'tipo_asiento')
+    list_filter = ('bus', 'estado', 'tipo_asiento', 'piso')
     search_fields = ('bus__placa',)
 
 # Rutas
 @admin.register(Ruta)
 class RutaAdmin(ModelAdmin):
-    list_display = ('nombre', 'activo', 'fecha_actualizacion')
+    list_display = ('nombre', 'precio_base', 'activo', 'fecha_actualizacion')
     list_filter = ('activo',)
     search_fields = ('nombre',)
     inlines = [DetalleRutaInline]
     unfold_form_tabs = [
-        ("Información de Ruta", ["nombre", "descripcion"]),
+        ("Información de Ruta", ["nombre", "descripcion", "precio_base"]),
         ("Estado", ["activo"]),
     ]
 
@@ -168,10 +202,26 @@ class DetalleRutaAdmin(admin.ModelAdmin):
     list_filter = ('ruta', 'parada')
     ordering = ('ruta', 'orden')
 
+@admin.register(Horario)
+class HorarioAdmin(ModelAdmin):
+    list_display = ('ruta', 'hora_salida', 'dias_semana', 'vigente_desde', 'vigente_hasta', 'activo')
+    list_filter = ('ruta', 'activo')
+    ordering = ('ruta', 'hora_salida')
+    filter_horizontal = ('buses',)
+    actions = ['generar_proximos_30_dias']
+
+    def generar_proximos_30_dias(self, request, queryset):
+        hoy = timezone.localdate()
+        resultado = generar_viajes(hoy, hoy + timedelta(days=29), horarios=list(queryset.values_list('pk', flat=True)))
+        messages.success(request, f'{resultado.viajes_creados} viajes creados, {resultado.viajes_existentes} ya existían')
+        if resultado.sin_bus:
+            messages.warning(request, f'{len(resultado.sin_bus)} salidas sin bus activo libre')
+    generar_proximos_30_dias.short_description = "Generar viajes de los próximos 30 días"
+
 # Viajes y Servicios
 @admin.register(Viaje)
 class ViajeAdmin(ModelAdmin):
-    list_display = ('ruta', 'bus', 'fecha', 'activo')
+    list_display = ('ruta', 'bus', 'fecha', 'horario', 'activo')
     list_filter = ('ruta', 'bus', 'activo')
     date_hierarchy = 'fecha'
     search_fields = ('ruta__nombre', 'bus__placa')
@@ -198,18 +248,42 @@ class ReservaAdmin(admin.ModelAdmin):
 
 @admin.register(Pasaje)
 class PasajeAdmin(admin.ModelAdmin):
-    list_display = ('id_pasaje', 'viaje', 'asiento', 'pasajero', 'reserva')
+    list_display = ('id_pasaje', 'viaje', 'asiento', 'pasajero', 'origen', 'destino', 'reserva')
     list_filter = ('viaje__ruta', 'viaje__fecha')
     search_fields = ('pasajero__cedula__nombre', 'pasajero__cedula__apellido')
     autocomplete_fields = ['viaje', 'asiento', 'pasajero']
 
+@admin.register(AsientoViaje)
+class AsientoViajeAdmin(admin.ModelAdmin):
+    list_display = ('viaje', 'asiento', 'estado', 'tramos_ocupados', 'retenido_hasta', 'reserva')
+    list_filter = ('estado', 'viaje__fecha')
+    search_fields = ('viaje__bus__placa', 'viaje__ruta__nombre')
+    raw_id_fields = ('viaje', 'asiento', 'reserva')
+
+@admin.register(TramoRuta)
+class TramoRutaAdmin(admin.ModelAdmin):
+    # Se mantiene desde DetalleRuta; aquí solo se carga el precio del tramo
+    list_display = ('ruta', 'origen', 'destino', 'cantidad_paradas', 'hora_salida', 'hora_llegada', 'precio')
+    list_filter = ('ruta',)
+    list_select_related = ('ruta', 'origen', 'destino')
+    fields = ('ruta', 'origen', 'destino', 'cantidad_paradas', 'hora_salida', 'hora_llegada', 'precio')
+    readonly_fields = ('ruta', 'origen', 'destino', 'cantidad_paradas', 'hora_salida', 'hora_llegada')
+
+    def has_add_permission(self, request):
+        return False
+
 @admin.register(Encomienda)
 class EncomiendaAdmin(admin.ModelAdmin):
-    list_display = ('id_encomienda', 'viaje', 'cliente', 'tipo_envio', 'fecha_creacion')
-    list_filter = ('tipo_envio', 'viaje__ruta')
+    list_display = ('id_encomienda', 'codigo_seguimiento', 'viaje', 'cliente', 'tipo_envio', 'estado', 'fecha_creacion')
+    list_filter = ('estado', 'tipo_envio', 'viaje__ruta')
     date_hierarchy = 'fecha_creacion'
-    search_fields = ('remitente', 'ruc_ci', 'descripcion')
+    search_fields = ('=codigo_seguimiento', 'remitente', 'ruc_ci', 'numero_contacto', 'descripcion')
+    readonly_fields = ('codigo_seguimiento', 'estado', 'ubicacion', 'fecha_estado')
+    inlines = (EventoEncomiendaInline,)
     fieldsets = (
+        ('Seguimiento', {
+            'fields': ('codigo_seguimiento', 'estado', 'ubicacion', 'fecha_estado')
+        }),
         ('Información Básica', {
             'fields': ('viaje', 'cliente', 'origen', 'destino')
         }),
@@ -238,20 +312,41 @@ class TimbradoAdmin(admin.ModelAdmin):
     list_filter = ('activo',)
     date_hierarchy = 'fecha_inicio'
 
+@admin.register(PuntoExpedicion)
+class PuntoExpedicionAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'parada', 'caja', 'numero_actual', 'numero_hasta', 'activo')
+    list_filter = ('timbrado', 'parada', 'activo')
+    # El contador solo lo mueve numeracion.asignar_numeros
+    readonly_fields = ('numero_actual',)
+
 class CabeceraFacturaForm(forms.ModelForm):
     class Meta:
         model = CabeceraFactura
         fields = '__all__'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'numero_factura' in self.fields:
+            self.fields['numero_factura'].required = False
+            self.fields['numero_factura'].help_text = "Vacío: se asigna el siguiente número del punto de expedición"
+
     def clean(self):
         cleaned_data = super().clean()
-        # Verificar si hay una caja abierta
-        caja_abierta = Caja.objects.filter(estado='Abierta').exists()
-        if not caja_abierta:
+        # Verificar si hay una caja abierta (el admin deja el request en el formulario)
+        if caja_abierta(getattr(self, 'request', None)) is None:
             raise ValidationError(
                 'No se puede crear una factura sin una caja abierta. '
                 'Por favor, abra una caja primero.'
             )
+        # Sin número, debe poder tomarse del punto de expedición
+        timbrado, parada = cleaned_data.get('timbrado'), cleaned_data.get('parada')
+        if not cleaned_data.get('numero_factura') and not self.instance.pk and timbrado:
+            if parada is None:
+                raise ValidationError('Indique la parada para asignar el número de factura.')
+            if not timbrado.vigente(timezone.localdate()):
+                raise ValidationError(f'El timbrado {timbrado} no está vigente.')
+            if punto_para(timbrado, parada, caja_abierta(getattr(self, 'request', None))) is None:
+                raise ValidationError('No hay un punto de expedición activo para este timbrado y parada.')
         return cleaned_data
 
 @admin.register(CabeceraFactura)
@@ -275,9 +370,14 @@ class CabeceraFacturaAdmin(ModelAdmin):
         }),
     ]
 
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        form.request = request
+        return form
+
     def has_add_permission(self, request):
         # Verificar si hay una caja abierta antes de mostrar el botón "Añadir"
-        if not Caja.objects.filter(estado='Abierta').exists():
+        if caja_abierta(request) is None:
             messages.warning(request, 'No se pueden crear facturas sin una caja abierta')
             return False
         return True
@@ -285,16 +385,23 @@ class CabeceraFacturaAdmin(ModelAdmin):
     def save_model(self, request, obj, form, change):
         if not change:  # Solo para nuevas facturas
             # Verificar nuevamente al guardar por seguridad
-            if not Caja.objects.filter(estado='Abierta').exists():
+            caja = caja_abierta(request)
+            if caja is None:
                 messages.error(request, 'No se puede guardar la factura sin una caja abierta')
                 return
+            if not obj.numero_factura:
+                try:
+                    numerar_factura(obj, caja)
+                except NumeracionNoDisponible as e:
+                    messages.error(request, str(e))
+                    return
         super().save_model(request, obj, form, change)
 
     def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
-        caja_abierta = Caja.objects.filter(estado='Abierta').first()
-        if caja_abierta:
-            extra_context['caja_actual'] = f"Caja abierta: {caja_abierta.nombre}"
+        caja = caja_abierta(request)
+        if caja:
+            extra_context['caja_actual'] = f"Caja abierta: {caja.nombre}"
         else:
             extra_context['caja_actual'] = "No hay caja abierta"
         return super().changelist_view(request, extra_context=extra_context)
@@ -344,11 +451,27 @@ class CabeceraCajaAdmin(ModelAdmin):
     search_fields = ('caja__nombre', 'empleado__cedula__nombre')
     date_hierarchy = 'fecha_mov'
     inlines = [DetalleCajaInline]
+    readonly_fields = ('monto_final',)
     unfold_form_tabs = [
         ("Información de Movimiento", ["caja", "empleado", "tipo_mov"]),
         ("Montos", ["monto_inical", "monto_final"]),
     ]
 
+    def save_model(self, request, obj, form, change):
+        # monto_final es el saldo corriente: parte del fondo y lo mueven los
+        # detalles, así que al editar no se vuelve a escribir; un cambio del
+        # fondo lo corre en la misma diferencia
+        if change:
+            campos = [campo for campo in form.changed_data if campo != 'monto_inical']
+            if campos:
+                obj.save(update_fields=campos)
+            if 'monto_inical' in form.changed_data:
+                cambiar_fondo(obj.pk, obj.monto_inical)
+                obj.refresh_from_db(fields=['monto_inical', 'monto_final'])
+            return
+        obj.monto_final = obj.monto_inical
+        super().save_model(request, obj, form, change)
+
 @admin.register(DetalleCaja)
 class DetalleCajaAdmin(ModelAdmin):
     list_display = ('cabecera_caja', 'tipo_transaccion', 'monto', 'fecha_transaccion', 'factura')
@@ -360,5 +483,16 @@ class DetalleCajaAdmin(ModelAdmin):
         ("Detalles", ["monto", "descripcion"]),
     ]
 
+@admin.register(VentaDiaria)
+class VentaDiariaAdmin(admin.ModelAdmin):
+    # Resumen calculado; se corrige con el comando recalcular_ventas_diarias
+    list_display = ('fecha', 'empresa', 'ruta', 'parada', 'pasajes_vendidos', 'encomiendas', 'monto_total')
+    list_filter = ('empresa', 'ruta')
+    date_hierarchy = 'fecha'
+    list_select_related = ('empresa', 'ruta', 'parada')
 
+    def has_add_permission(self, request):
+        return False
 
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,11 @@
 from django.views.generic import TemplateView
-from datetime import datetime, timedelta
-from .models import CabeceraFactura, Encomienda, Ruta
+from datetime import timedelta
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import Ruta, VentaDiaria
+
+MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
 
 class DashboardView(TemplateView):
     template_name = 'admin/index.html'
@@ -9,22 +14,42 @@ def dashboard_callback(request, context):
     """
     Callback para el dashboard de django-unfold.
     Agrega estadísticas reales al contexto para el template admin/index.html.
+    Las ventas y encomiendas se leen del resumen VentaDiaria, no de las
+    tablas de facturas.
     """
-    today = datetime.now().date()
+    today = timezone.localdate()
     thirty_days_ago = today - timedelta(days=30)
 
-    # Ventas totales (facturas) en los últimos 30 días
-    ventas_totales = CabeceraFactura.objects.filter(fecha_factura__gte=thirty_days_ago).count()
+    # Ventas (monto facturado), pasajes y encomiendas de los últimos 30 días
+    resumen = VentaDiaria.objects.filter(fecha__gte=thirty_days_ago).aggregate(
+        monto=Sum('monto_total'),
+        pasajes=Sum('pasajes_vendidos'),
+        encomiendas=Sum('encomiendas'),
+    )
 
     # Rutas activas
     rutas_activas = Ruta.objects.filter(activo=True).count()
 
-    # Encomiendas en los últimos 30 días
-    total_encomiendas = Encomienda.objects.filter(fecha_creacion__gte=thirty_days_ago).count()
+    # Monto facturado de los últimos 6 meses, incluido el actual
+    meses = []
+    mes = today.replace(day=1)
+    for _ in range(6):
+        meses.insert(0, mes)
+        mes = (mes - timedelta(days=1)).replace(day=1)
+    por_mes = dict(
+        VentaDiaria.objects.filter(fecha__gte=meses[0])
+        .annotate(mes=TruncMonth('fecha')).values('mes')
+        .annotate(monto=Sum('monto_total')).values_list('mes', 'monto')
+    )
 
     context.update({
-        "ventas_totales": ventas_totales,
+        "ventas_totales": resumen['monto'] or 0,
+        "pasajes_vendidos": resumen['pasajes'] or 0,
         "rutas_activas": rutas_activas,
-        "total_encomiendas": total_encomiendas,
+        "total_encomiendas": resumen['encomiendas'] or 0,
+        "ventas_mensuales": {
+            "labels": [MESES[mes.month - 1] for mes in meses],
+            "data": [float(por_mes.get(mes, 0)) for mes in meses],
+        },
     })
-    return context
\ No newline at end of file
+    return context
@@ -0,0 +1,74 @@
+"""
+Generación de asientos de un bus a partir de una plantilla de distribución.
+
+Las plantillas se definen en settings.TR4CKING_PLANTILLAS_ASIENTOS como una
+lista de tramos en orden de numeración:
+
+    'doble_piso': [
+        {'piso': 1, 'tipo_asiento': 'Cama', 'cantidad': 12},
+        {'piso': 2, 'tipo_asiento': 'Semi-cama'},   # sin cantidad: el resto
+    ]
+"""
+from django.conf import settings
+
+from .models import Asiento, Pasaje
+from .inventario import agregar_asientos_a_viajes
+
+PLANTILLA_POR_DEFECTO = 'estandar'
+
+PLANTILLAS_BASE = {
+    'estandar': [
+        {'piso': 1, 'tipo_asiento': 'Semi-cama'},
+    ],
+}
+
+
+def plantillas():
+    return {**PLANTILLAS_BASE, **getattr(settings, 'TR4CKING_PLANTILLAS_ASIENTOS', {})}
+
+
+def plan_asientos(capacidad, plantilla=PLANTILLA_POR_DEFECTO):
+    """
+    Devuelve {numero_asiento: (piso, tipo_asiento)} para `capacidad`
+    asientos según la plantilla. El último tramo se repite si la plantilla
+    no alcanza a cubrir la capacidad.
+    """
+    tramos = plantillas().get(plantilla) or plantillas()[PLANTILLA_POR_DEFECTO]
+    plan = {}
+    numero = 1
+    for indice, tramo in enumerate(tramos):
+        ultimo = indice == len(tramos) - 1
+        cantidad = tramo.get('cantidad')
+        if cantidad is None or ultimo:
+            cantidad = capacidad - len(plan)
+        for _ in range(min(cantidad, capacidad - len(plan))):
+            plan[numero] = (tramo.get('piso', 1), tramo.get('tipo_asiento', 'Semi-cama'))
+            numero += 1
+    return plan
+
+
+def sincronizar_asientos(bus):
+    """
+    Ajusta los asientos del bus a su capacidad sin regenerar los existentes:
+    crea los números faltantes con un solo bulk_create y elimina los que
+    exceden la capacidad, salvo que tengan pasajes vendidos. Los asientos
+    nuevos se agregan al inventario de los viajes pendientes del bus.
+    """
+    existentes = set(Asiento.objects.filter(bus=bus).values_list('numero_asiento', flat=True))
+    plan = plan_asientos(bus.capacidad, bus.plantilla_asientos)
+
+    nuevos = Asiento.objects.bulk_create([
+        Asiento(bus=bus, numero_asiento=numero, piso=piso, tipo_asiento=tipo_asiento, estado='Disponible')
+        for numero, (piso, tipo_asiento) in plan.items()
+        if numero not in existentes
+    ])
+    if nuevos:
+        agregar_asientos_a_viajes(bus, [asiento.pk for asiento in nuevos])
+
+    sobrantes = [numero for numero in existentes if numero > bus.capacidad]
+    if sobrantes:
+        vendidos = Pasaje.objects.filter(asiento__bus=bus, asiento__numero_asiento__in=sobrantes)
+        Asiento.objects.filter(bus=bus, numero_asiento__in=sobrantes).exclude(
+            pk__in=vendidos.values('asiento_id')
+        ).delete()
+    return nuevos
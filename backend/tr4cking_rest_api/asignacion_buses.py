@@ -0,0 +1,279 @@
+"""
+Asignación de buses a los viajes de un día.
+
+Viaje es único por (bus, fecha), así que cada bus hace a lo sumo un viaje
+por día. Para cada empresa se reparte su flota activa entre sus viajes del
+día de modo que sobren la menor cantidad de asientos: los viajes se recorren
+de mayor a menor demanda (asientos vendidos) y cada uno toma el bus más
+chico que todavía le alcanza. Como un bus que sirve a un viaje sirve también
+a todos los de menor demanda, ese orden da el mínimo de asientos vacíos; es
+O(n log n) y resuelve cientos de buses en milisegundos.
+
+A igual capacidad se prefiere el bus que el viaje ya tiene y después uno sin
+viaje ese día, para no mover buses sin ganar nada. No se tocan los viajes
+inactivos ni los que tienen asientos retenidos por una venta en curso. Los
+viajes con un bus en mantenimiento o inactivo se pasan a un bus activo si
+queda alguno que alcance; si no, se quedan con el suyo.
+
+Aplicar mueve los pasajes vendidos al asiento del mismo número en el bus
+nuevo (o al primero libre si no existe) y rehace el inventario del viaje.
+Los buses candidatos quedan bloqueados hasta el final: un viaje nuevo en
+alguno de ellos (su FK bloquea la fila del bus) espera a que termine.
+"""
+import bisect
+from collections import defaultdict
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .inventario import tramos_vendidos
+from .models import Asiento, AsientoViaje, Bus, Pasaje, Viaje
+
+RETENCIONES, BUS_NO_ACTIVO, INACTIVO = 'Asientos retenidos', 'Sin bus activo que alcance', 'Viaje inactivo'
+
+# Fecha donde se estaciona un viaje para romper un intercambio de buses
+# (A toma el bus de B y B el de A) sin violar (bus, fecha) en el medio. Ningún
+# viaje real usa el año 1; el viaje estacionado conserva su bus, que en un
+# ciclo siempre es candidato y está bloqueado (ver proponer), así que dos
+# asignaciones simultáneas no pueden estacionar el mismo bus a la vez. Nunca
+# queda guardada: el viaje vuelve a su fecha en la misma transacción.
+_ESTACIONADO = date(1, 1, 1)
+
+
+class AsignacionInvalida(Exception):
+    """La asignación no se puede aplicar tal como está."""
+
+
+class _Flota:
+    """Buses libres de una empresa agrupados por capacidad."""
+
+    def __init__(self, buses, con_viaje):
+        self.por_capacidad = defaultdict(set)
+        for bus in buses:
+            self.por_capacidad[bus.capacidad].add(bus.pk)
+        self.capacidades = sorted(self.por_capacidad)
+        self.buses = {bus.pk: bus for bus in buses}
+        self.con_viaje = con_viaje
+
+    def tomar(self, demanda, actual):
+        """El bus libre más chico con capacidad >= demanda, o None."""
+        for capacidad in self.capacidades[bisect.bisect_left(self.capacidades, demanda):]:
+            libres = self.por_capacidad[capacidad]
+            if not libres:
+                continue
+            bus_id = actual if actual in libres else min(libres, key=lambda bus_id: (bus_id in self.con_viaje, bus_id))
+            libres.remove(bus_id)
+            return self.buses[bus_id]
+        return None
+
+
+def _repartir(viajes, demanda, buses, con_viaje):
+    """{viaje_id: Bus} para los viajes que consiguen un bus que les alcance."""
+    flota = _Flota(buses, con_viaje)
+    asignacion = {}
+    for viaje in sorted(viajes, key=lambda viaje: (-demanda.get(viaje.pk, 0), viaje.pk)):
+        bus = flota.tomar(demanda.get(viaje.pk, 0), viaje.bus_id)
+        if bus is not None:
+            asignacion[viaje.pk] = bus
+    return asignacion
+
+
+def _asignar_empresa(viajes, demanda, buses, con_viaje):
+    asignacion = _repartir(viajes, demanda, buses, con_viaje)
+    activos = [viaje for viaje in viajes if viaje.bus.estado == 'Activo']
+    if any(viaje.pk not in asignacion for viaje in activos):
+        # Un viaje de un bus en mantenimiento se quedó con un bus que otro
+        # necesitaba: primero los que ya tienen bus activo (siempre entran,
+        # cada uno tiene el suyo) y los demás con lo que sobre
+        asignacion = _repartir(activos, demanda, buses, con_viaje)
+        usados = {bus.pk for bus in asignacion.values()}
+        otros = [viaje for viaje in viajes if viaje.bus.estado != 'Activo']
+        asignacion.update(_repartir(otros, demanda, [bus for bus in buses if bus.pk not in usados], con_viaje))
+    return asignacion
+
+
+def proponer(fecha, empresa=None, bloquear=False):
+    """
+    Asignación propuesta para los viajes de `fecha` (de una empresa o de
+    todas): {'fecha', 'viajes': [...], 'totales'}. Cada viaje lleva su
+    demanda, el bus actual y el propuesto, los asientos vacíos de cada uno y
+    el motivo si no se pudo optimizar. Con `bloquear` (dentro de una
+    transacción) bloquea los viajes, su inventario y los buses candidatos
+    hasta el final.
+    """
+    viajes = Viaje.objects.filter(fecha=fecha).select_related('bus', 'ruta').order_by('id_viaje')
+    if empresa is not None:
+        viajes = viajes.filter(bus__empresa=empresa)
+    if bloquear:
+        viajes = viajes.select_for_update(of=('self',))
+    viajes = list(viajes)
+    ids = [viaje.pk for viaje in viajes]
+    if bloquear:
+        # Las ventas bloquean filas de AsientoViaje: mientras tanto no cambia la demanda
+        list(AsientoViaje.objects.select_for_update().filter(viaje__in=ids).values_list('pk', flat=True))
+
+    demanda = dict(
+        Pasaje.objects.filter(viaje__in=ids).order_by().values('viaje')
+        .annotate(asientos=Count('asiento', distinct=True)).values_list('viaje', 'asientos')
+    )
+    con_retenciones = set(
+        AsientoViaje.objects.filter(viaje__in=ids, retenido_hasta__gt=timezone.now())
+        .exclude(tramos_retenidos=0).values_list('viaje_id', flat=True)
+    )
+    motivos = {}
+    for viaje in viajes:
+        if not viaje.activo:
+            motivos[viaje.pk] = INACTIVO
+        elif viaje.pk in con_retenciones:
+            motivos[viaje.pk] = RETENCIONES
+    fijos = {viaje.bus_id for viaje in viajes if viaje.pk in motivos}
+    con_viaje = {viaje.bus_id for viaje in viajes}
+
+    buses_por_empresa = defaultdict(list)
+    flota = Bus.objects.filter(estado='Activo', empresa_id__in={viaje.bus.empresa_id for viaje in viajes})
+    flota = flota.exclude(pk__in=fijos).order_by('pk')
+    if bloquear:
+        flota = list(flota.select_for_update())
+        # Un viaje creado en uno de estos buses antes del bloqueo ya ocupa el bus ese día
+        ajenos = set(
+            Viaje.objects.filter(fecha=fecha, bus__in=[bus.pk for bus in flota]).exclude(pk__in=ids)
+            .values_list('bus_id', flat=True)
+        )
+        flota = [bus for bus in flota if bus.pk not in ajenos]
+    for bus in flota:
+        buses_por_empresa[bus.empresa_id].append(bus)
+    viajes_por_empresa = defaultdict(list)
+    for viaje in viajes:
+        if viaje.pk not in motivos:
+            viajes_por_empresa[viaje.bus.empresa_id].append(viaje)
+
+    asignacion = {}
+    for empresa_id, propios in viajes_por_empresa.items():
+        asignacion.update(_asignar_empresa(propios, demanda, buses_por_empresa[empresa_id], con_viaje))
+
+    filas = []
+    for viaje in viajes:
+        bus = asignacion.get(viaje.pk)
+        if bus is None:
+            bus = viaje.bus
+            motivos.setdefault(viaje.pk, None if viaje.bus.estado == 'Activo' else BUS_NO_ACTIVO)
+        vendidos = demanda.get(viaje.pk, 0)
+        filas.append({
+            'viaje': viaje.pk,
+            'ruta': viaje.ruta.nombre,
+            'demanda': vendidos,
+            'bus_actual': viaje.bus_id,
+            'placa_actual': viaje.bus.placa,
+            'capacidad_actual': viaje.bus.capacidad,
+            'vacios_actual': viaje.bus.capacidad - vendidos,
+            'bus': bus.pk,
+            'placa': bus.placa,
+            'capacidad': bus.capacidad,
+            'vacios': bus.capacidad - vendidos,
+            'cambia': bus.pk != viaje.bus_id,
+            'motivo': motivos.get(viaje.pk),
+        })
+    return {
+        'fecha': fecha,
+        'viajes': filas,
+        'totales': {
+            'viajes': len(filas),
+            'cambios': sum(fila['cambia'] for fila in filas),
+            'vacios_actual': sum(fila['vacios_actual'] for fila in filas),
+            'vacios': sum(fila['vacios'] for fila in filas),
+            'sin_optimizar': sum(fila['motivo'] is not None for fila in filas),
+        },
+    }
+
+
+def _mover_viajes(fecha, cambios):
+    """
+    Cambia el bus de cada viaje ({viaje_id: (bus_actual, bus_nuevo)}) en un
+    orden que nunca deja dos viajes con el mismo bus y fecha; en los ciclos
+    se estaciona un viaje en otra fecha hasta que su bus nuevo se libera.
+    """
+    pendientes = dict(cambios)
+    ocupados = {actual: viaje_id for viaje_id, (actual, _) in pendientes.items()}
+    while pendientes:
+        listos = [viaje_id for viaje_id, (_, nuevo) in pendientes.items() if nuevo not in ocupados]
+        if not listos:
+            viaje_id = next(iter(pendientes))
+            Viaje.objects.filter(pk=viaje_id).update(fecha=_ESTACIONADO)
+            del ocupados[pendientes[viaje_id][0]]
+            continue
+        for viaje_id in listos:
+            actual, nuevo = pendientes.pop(viaje_id)
+            Viaje.objects.filter(pk=viaje_id).update(bus_id=nuevo, fecha=fecha)
+            ocupados.pop(actual, None)  # Ya liberado si el viaje estaba estacionado
+
+
+def _mover_pasajes(cambios):
+    """Pasa cada asiento vendido al del mismo número en el bus nuevo, o al primero libre."""
+    asientos = defaultdict(dict)
+    for bus_id, numero, asiento_id in Asiento.objects.filter(
+        bus_id__in={nuevo for _, nuevo in cambios.values()}
+    ).order_by('numero_asiento').values_list('bus_id', 'numero_asiento', 'pk'):
+        asientos[bus_id][numero] = asiento_id
+
+    pasajes = list(
+        Pasaje.objects.filter(viaje__in=list(cambios)).select_related('asiento')
+        .order_by('viaje_id', 'asiento__numero_asiento', 'pk')
+    )
+    vendidos = defaultdict(dict)  # {viaje_id: {numero anterior: None}} en orden
+    for pasaje in pasajes:
+        vendidos[pasaje.viaje_id].setdefault(pasaje.asiento.numero_asiento, None)
+
+    destino = {}
+    for viaje_id, numeros in vendidos.items():
+        disponibles = dict(asientos[cambios[viaje_id][1]])
+        if len(disponibles) < len(numeros):
+            raise AsignacionInvalida(f"El bus nuevo del viaje {viaje_id} no tiene asientos para todos los pasajes")
+        for numero in [numero for numero in numeros if numero in disponibles]:
+            destino[viaje_id, numero] = disponibles.pop(numero)
+        for numero in [numero for numero in numeros if (viaje_id, numero) not in destino]:
+            destino[viaje_id, numero] = disponibles.pop(next(iter(disponibles)))
+
+    for pasaje in pasajes:
+        pasaje.asiento_id = destino[pasaje.viaje_id, pasaje.asiento.numero_asiento]
+    # bulk_update no dispara las señales de Pasaje: la ocupación se rehace después
+    Pasaje.objects.bulk_update(pasajes, ['asiento'], batch_size=500)
+    return asientos
+
+
+def aplicar(fecha, empresa=None):
+    """
+    Aplica la asignación propuesta para `fecha` y la devuelve. Todo pasa en
+    una transacción con los viajes, su inventario y los buses bloqueados, así
+    que una venta concurrente espera o ve el bus nuevo.
+    """
+    try:
+        return _aplicar(fecha, empresa)
+    except IntegrityError as e:
+        # No debería pasar con los buses bloqueados; si otro cambio igual tomó
+        # un bus propuesto, no se aplicó nada y se puede volver a calcular
+        raise AsignacionInvalida(f"Otro viaje ocupó uno de los buses propuestos: {e}") from e
+
+
+def _aplicar(fecha, empresa):
+    with transaction.atomic():
+        propuesta = proponer(fecha, empresa, bloquear=True)
+        cambios = {fila['viaje']: (fila['bus_actual'], fila['bus']) for fila in propuesta['viajes'] if fila['cambia']}
+        if not cambios:
+            return propuesta
+        _mover_viajes(fecha, cambios)
+        asientos = _mover_pasajes(cambios)
+        # El inventario nuevo sale ya ocupado según los pasajes movidos (no
+        # hay retenciones: esos viajes no se tocan)
+        ocupados = tramos_vendidos(list(cambios))
+        filas = []
+        for viaje_id, (_, nuevo) in cambios.items():
+            for asiento_id in asientos[nuevo].values():
+                fila = AsientoViaje(viaje_id=viaje_id, asiento_id=asiento_id,
+                                    tramos_ocupados=ocupados.get((viaje_id, asiento_id), 0))
+                fila.estado = fila.calcular_estado()
+                filas.append(fila)
+        AsientoViaje.objects.filter(viaje__in=list(cambios)).delete()
+        AsientoViaje.objects.bulk_create(filas, batch_size=5000)
+    return propuesta
@@ -0,0 +1,159 @@
+"""
+Búsqueda de viajes por origen, destino y fecha, y de personas por nombre,
+razón social o cédula (el autocompletado de boletería).
+
+Las rutas que sirven para el par (origen, destino) salen de la tabla
+materializada TramoRuta (índice origen, destino, ruta); los viajes del día
+del índice Viaje(fecha, activo, ruta) y los asientos libres para ese tramo
+de la máscara de ocupación de AsientoViaje, una fila por asiento.
+
+En personas, cada palabra buscada tiene que aparecer en el nombre o el
+apellido (o en la razón social del cliente): los índices de trigramas
+(pg_trgm) de esas columnas resuelven los ILIKE sin recorrer la tabla y, en
+PostgreSQL, los resultados se ordenan por similitud con el texto. Una
+cédula se busca por prefijo, como rangos de la clave primaria.
+"""
+import operator
+import re
+from functools import reduce
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .inventario import filtro_libre
+from .models import AsientoViaje, Cliente, Pasajero, Persona, TramoRuta, Viaje
+
+# Palabras del texto que se tienen en cuenta; el resto no afina más
+MAX_PALABRAS = 5
+
+# Cédulas y RUC sin dígito verificador
+MAX_DIGITOS_CEDULA = 10
+
+CAMPOS_PERSONA = ('cedula', 'nombre', 'apellido', 'telefono')
+
+
+def buscar_viajes(origen, destino, fecha):
+    tramos = TramoRuta.objects.filter(origen_id=origen, destino_id=destino)
+    tramo = tramos.filter(ruta=OuterRef('ruta')).order_by()
+    libres = (
+        AsientoViaje.objects.filter(viaje=OuterRef('pk')).filter(filtro_libre(mascara=OuterRef('mascara')))
+        .order_by().values('viaje').annotate(total=Count('pk')).values('total')
+    )
+    return (
+        Viaje.objects.filter(fecha=fecha, activo=True, ruta__in=tramos.values('ruta'))
+        .annotate(
+            hora_salida=Subquery(tramo.values('hora_salida')[:1]),
+            hora_llegada=Subquery(tramo.values('hora_llegada')[:1]),
+            mascara=Subquery(tramo.values('mascara')[:1]),
+        )
+        .annotate(asientos_disponibles=Coalesce(Subquery(libres, output_field=IntegerField()), 0))
+        .order_by('hora_salida', 'id_viaje')
+        .values(
+            'id_viaje', 'fecha', 'ruta', 'bus', 'hora_salida', 'hora_llegada', 'asientos_disponibles',
+            ruta_nombre=F('ruta__nombre'),
+            bus_placa=F('bus__placa'),
+            empresa_nombre=F('bus__empresa__nombre'),
+        )
+    )
+
+
+def _cedula(texto):
+    """El número de '1234567', '1.234.567' o el RUC '1234567-8'; None si el texto no es una cédula."""
+    encontrado = re.fullmatch(r'(\d[\d.]*)(?:-\d)?', texto)
+    return int(encontrado.group(1).replace('.', '')) if encontrado else None
+
+
+def _por_cedula(prefijo, limite):
+    """
+    Personas cuya cédula empieza con `prefijo`: primero la exacta y después
+    los rangos [p·10^k, (p+1)·10^k) de los números más largos, cada uno un
+    recorrido corto de la clave primaria que corta al llegar al límite.
+    """
+    personas = []
+    if not prefijo:
+        return personas
+    for k in range(max(MAX_DIGITOS_CEDULA - len(str(prefijo)), 0) + 1):
+        personas += (
+            Persona.objects.filter(cedula__gte=prefijo * 10 ** k, cedula__lt=(prefijo + 1) * 10 ** k)
+            .order_by('cedula').values(*CAMPOS_PERSONA)[:limite - len(personas)]
+        )
+        if len(personas) >= limite:
+            break
+    return personas
+
+
+def _filtro_palabras(palabras, *campos):
+    filtro = Q()
+    for palabra in palabras:
+        # Con una o dos letras no hay trigramas de adentro de la palabra: solo el comienzo
+        lookup = 'icontains' if len(palabra) >= 3 else 'istartswith'
+        filtro &= reduce(operator.or_, (Q(**{f'{campo}__{lookup}': palabra}) for campo in campos))
+    return filtro
+
+
+def _similitud(texto, *campos):
+    if connection.vendor != 'postgresql':
+        return Value(0.0, output_field=FloatField())
+    return reduce(operator.add, (TrigramWordSimilarity(texto, campo) for campo in campos))
+
+
+def buscar_personas(texto, limite=10):
+    """
+    Hasta `limite` personas, las más parecidas primero, cada una con su
+    pasajero y sus clientes. Los clientes que coinciden por razón social y
+    no tienen persona salen con cedula None.
+    """
+    texto = ' '.join(texto.split())
+    prefijo = _cedula(texto)
+    if prefijo is not None:
+        resultados = {persona['cedula']: {**persona, 'similitud': 0.0} for persona in _por_cedula(prefijo, limite)}
+    else:
+        palabras = texto.split()[:MAX_PALABRAS]
+        personas = (
+            Persona.objects.filter(_filtro_palabras(palabras, 'nombre', 'apellido'))
+            .annotate(similitud=_similitud(texto, 'nombre', 'apellido'))
+            .order_by('-similitud', 'apellido', 'nombre')
+            .values(*CAMPOS_PERSONA, 'similitud')[:limite]
+        )
+        resultados = {persona['cedula']: persona for persona in personas}
+        por_razon_social = (
+            Cliente.objects.filter(_filtro_palabras(palabras, 'razon_social'))
+            .annotate(similitud=_similitud(texto, 'razon_social'))
+            .order_by('-similitud', 'razon_social')
+            .values('id_cliente', 'cedula_id', 'razon_social', 'dv', 'similitud',
+                    nombre=F('cedula__nombre'), apellido=F('cedula__apellido'), telefono=F('cedula__telefono'))[:limite]
+        )
+        for cliente in por_razon_social:
+            cedula = cliente['cedula_id']
+            clave = cedula if cedula is not None else ('cliente', cliente['id_cliente'])
+            if clave in resultados:
+                resultados[clave]['similitud'] = max(resultados[clave]['similitud'], cliente['similitud'])
+                continue
+            resultados[clave] = {
+                'cedula': cedula, 'nombre': cliente['nombre'], 'apellido': cliente['apellido'],
+                'telefono': cliente['telefono'], 'similitud': cliente['similitud'],
+            }
+            if cedula is None:
+                resultados[clave]['clientes'] = [
+                    {'id_cliente': cliente['id_cliente'], 'razon_social': cliente['razon_social'], 'dv': cliente['dv']}
+                ]
+
+    # sorted() es estable: sin similitud (otras bases) quedan primero las personas
+    resultados = sorted(resultados.values(), key=lambda fila: -fila['similitud'])[:limite]
+
+    cedulas = [fila['cedula'] for fila in resultados if fila['cedula'] is not None]
+    pasajeros = dict(Pasajero.objects.filter(cedula_id__in=cedulas).values_list('cedula_id', 'id_pasajero'))
+    clientes = {}
+    for cliente in Cliente.objects.filter(cedula_id__in=cedulas).order_by('id_cliente').values(
+            'id_cliente', 'cedula_id', 'razon_social', 'dv'):
+        clientes.setdefault(cliente.pop('cedula_id'), []).append(cliente)
+    for fila in resultados:
+        del fila['similitud']
+        if fila['cedula'] is not None:
+            fila['pasajero'] = pasajeros.get(fila['cedula'])
+            fila['clientes'] = clientes.get(fila['cedula'], [])
+        else:
+            fila['pasajero'] = None
+    return resultados
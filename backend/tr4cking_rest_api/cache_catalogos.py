@@ -0,0 +1,101 @@
+"""
+Cache de respuestas para los catálogos que casi no cambian (rutas, paradas,
+localidades, empresas, tipos de documento).
+
+Cada modelo tiene un número de versión en el cache. La clave de una
+respuesta combina la URL (con sus filtros ordenados) y la versión de todos
+los modelos que aparecen en ella, así que al guardar o borrar una fila basta
+con incrementar la versión de su modelo: las respuestas viejas dejan de
+encontrarse y expiran solas. El backend es el de settings.CACHES
+(TR4CKING_CACHE_ALIAS); con varios procesos tiene que ser compartido.
+"""
+import hashlib
+import json
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+PREFIJO = 'tr4cking:catalogo'
+
+
+def cache_compartido():
+    """Backend de cache compartido por los procesos (TR4CKING_CACHE_ALIAS)."""
+    return caches[getattr(settings, 'TR4CKING_CACHE_ALIAS', 'default')]
+
+
+def _clave_version(model):
+    return f'{PREFIJO}:version:{model._meta.label_lower}'
+
+
+def versiones(modelos):
+    claves = [_clave_version(model) for model in modelos]
+    guardadas = cache_compartido().get_many(claves)
+    for clave in claves:
+        if clave not in guardadas:
+            # Si la versión se perdió del cache no se puede volver a empezar
+            # de 1 sin arriesgar respuestas viejas: se parte de la hora actual.
+            cache_compartido().add(clave, time.time_ns(), None)
+            guardadas[clave] = cache_compartido().get(clave)
+    return [guardadas[clave] for clave in claves]
+
+
+def invalidar(model):
+    clave = _clave_version(model)
+    try:
+        cache_compartido().incr(clave)
+    except ValueError:
+        cache_compartido().set(clave, time.time_ns(), None)
+
+
+def clave_respuesta(request, modelos):
+    parametros = urlencode(sorted(
+        (nombre, valor) for nombre, valores in request.query_params.lists() for valor in valores
+    ))
+    base = '|'.join([
+        request.get_host(), request.path, parametros, request.accepted_media_type or '',
+        *map(str, versiones(modelos)),
+    ])
+    return f'{PREFIJO}:respuesta:{hashlib.md5(base.encode()).hexdigest()}'
+
+
+def _coincide(request, etag):
+    pedidos = request.headers.get('If-None-Match', '')
+    return pedidos.strip() == '*' or etag in [valor.strip() for valor in pedidos.split(',')]
+
+
+class CacheCatalogoMixin:
+    """
+    Cachea list y retrieve del viewset. `cache_modelos` son todos los
+    modelos cuyos datos aparecen en la respuesta, incluidos los anidados;
+    cualquier cambio en uno de ellos invalida las respuestas del viewset.
+    Las respuestas llevan ETag y un If-None-Match que coincide recibe 304.
+    """
+    cache_modelos = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(super().retrieve, request, *args, **kwargs)
+
+    def _respuesta_cacheada(self, vista, request, *args, **kwargs):
+        clave = clave_respuesta(request, self.cache_modelos or [self.queryset.model])
+        guardado = cache_compartido().get(clave)
+        if guardado is None:
+            response = vista(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            contenido = JSONRenderer().render(response.data)
+            guardado = (f'"{hashlib.md5(contenido).hexdigest()}"', json.loads(contenido))
+            cache_compartido().set(clave, guardado, getattr(settings, 'TR4CKING_CACHE_CATALOGOS_SEGUNDOS', 3600))
+
+        etag, data = guardado
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if _coincide(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, headers=headers)
@@ -0,0 +1,225 @@
+"""
+Cajas: la abierta con la que trabaja cada empleado o terminal y el saldo de
+sus sesiones.
+
+caja_abierta() responde con a lo sumo una consulta por request: el
+resultado se guarda en el request (admin y API lo consultan varias veces
+en el mismo pedido) y en el cache por unos segundos. Las claves llevan una
+versión propia que las señales de Caja y CabeceraCaja incrementan
+(invalidar_cajas_abiertas) al abrir, cerrar o mover una caja, así que un
+cambio de estado deja de verse al instante en todos los procesos.
+"""
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, When
+from django.utils import timezone
+
+from .cache_catalogos import cache_compartido
+from .models import CabeceraCaja, Caja, DetalleCaja
+
+ABIERTA = 'Abierta'
+
+PREFIJO = 'tr4cking:caja_abierta'
+
+# Cabecera con la que una terminal indica su caja
+CABECERA_TERMINAL = 'X-Caja'
+
+
+def _version():
+    clave = f'{PREFIJO}:version'
+    version = cache_compartido().get(clave)
+    if version is None:
+        cache_compartido().add(clave, time.time_ns(), None)
+        version = cache_compartido().get(clave)
+    return version
+
+
+def invalidar_cajas_abiertas():
+    """Descarta las cajas abiertas cacheadas en todos los procesos."""
+    try:
+        cache_compartido().incr(f'{PREFIJO}:version')
+    except ValueError:
+        cache_compartido().set(f'{PREFIJO}:version', time.time_ns(), None)
+
+
+def _terminal(request):
+    try:
+        return int(request.headers.get(CABECERA_TERMINAL, ''))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _usuario(request):
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def _buscar(caja_id, empleado_id, usuario_id):
+    cajas = Caja.objects.filter(estado=ABIERTA)
+    if caja_id is not None:
+        return cajas.filter(pk=caja_id).first()
+    if empleado_id is None and usuario_id is None:
+        return None
+    # La caja donde el empleado hizo su último movimiento. Sin movimientos en
+    # ninguna abierta no tiene caja: no se le presta la de otro cajero
+    if empleado_id is not None:
+        propios = Q(cabeceracaja__empleado_id=empleado_id)
+    else:
+        propios = Q(cabeceracaja__empleado__cedula__usuariopersona__user_id=usuario_id)
+    return (
+        cajas.annotate(ultimo_movimiento=Max('cabeceracaja__fecha_mov', filter=propios))
+        .filter(ultimo_movimiento__isnull=False)
+        .order_by('-ultimo_movimiento', 'pk')
+        .first()
+    )
+
+
+def caja_abierta(request=None, empleado_id=None, caja_id=None):
+    """
+    Caja abierta para la terminal (caja_id o cabecera X-Caja del request) o
+    para el empleado (empleado_id o el del usuario del request). None si esa
+    terminal o ese empleado no tienen una caja abierta.
+    """
+    if caja_id is None and request is not None:
+        caja_id = _terminal(request)
+    usuario_id = _usuario(request) if empleado_id is None and request is not None else None
+    clave = (caja_id, empleado_id, usuario_id)
+
+    memoria = getattr(request, '_cajas_abiertas', None) if request is not None else None
+    if memoria is not None and clave in memoria:
+        return memoria[clave]
+
+    clave_cache = '{}:{}:{}'.format(PREFIJO, _version(), ':'.join(map(str, clave)))
+    guardado = cache_compartido().get(clave_cache)
+    if guardado is None:
+        guardado = (_buscar(caja_id, empleado_id, usuario_id),)
+        cache_compartido().set(clave_cache, guardado, getattr(settings, 'TR4CKING_CACHE_CAJA_SEGUNDOS', 30))
+    caja, = guardado
+
+    if request is not None:
+        if memoria is None:
+            memoria = request._cajas_abiertas = {}
+        memoria[clave] = caja
+    return caja
+
+
+# -----------------------------------------------
+# Saldo de la sesión
+# -----------------------------------------------
+# Cada apertura (CabeceraCaja 'Apertura') es una sesión: monto_inical es el
+# fondo con que abrió y monto_final el saldo corriente, que las señales de
+# DetalleCaja mueven con F() en cada ingreso o egreso. Cerrar la caja lee ese
+# saldo sin sumar los movimientos del turno; conciliar() los suma para
+# verificarlo. Los DetalleCaja cargados con bulk_create o update() no
+# disparan señales: hay que correr la conciliación después.
+APERTURA, CIERRE = 'Apertura', 'Cierre'
+CERRADA = 'Cerrada'
+
+SIGNOS = {'Ingreso': 1, 'Egreso': -1}
+
+
+class CajaNoDisponible(Exception):
+    """La caja no está abierta o no se puede operar con ella."""
+
+
+def aporte(tipo_transaccion, monto):
+    """Lo que un movimiento suma al saldo de su sesión."""
+    return SIGNOS.get(tipo_transaccion, 0) * (monto or 0)
+
+
+def mover_saldo(cabecera_caja_id, delta):
+    if delta:
+        CabeceraCaja.objects.filter(pk=cabecera_caja_id).update(monto_final=F('monto_final') + delta)
+
+
+def cambiar_fondo(cabecera_caja_id, monto_inicial):
+    """
+    Corrige el fondo de una sesión y corre el saldo lo mismo, en un solo
+    UPDATE contra los valores guardados: los movimientos ya sumados se
+    conservan aunque lleguen mientras tanto.
+    """
+    CabeceraCaja.objects.filter(pk=cabecera_caja_id).update(
+        monto_inical=monto_inicial,
+        monto_final=F('monto_final') + monto_inicial - F('monto_inical'),
+    )
+
+
+def bloquear_caja(caja_id):
+    """Bloquea la caja hasta el fin de la transacción; debe estar abierta."""
+    caja = Caja.objects.select_for_update().filter(pk=caja_id).first()
+    if caja is None or caja.estado != ABIERTA:
+        raise CajaNoDisponible(f"La caja {caja or caja_id} no está abierta")
+    return caja
+
+
+def sesion_actual(caja, bloquear=False):
+    """
+    Última apertura de la caja, si no se cerró después. Con `bloquear` queda
+    bloqueada hasta el fin de la transacción: su saldo no cambia mientras.
+    """
+    sesiones = CabeceraCaja.objects.filter(caja=caja)
+    if bloquear:
+        sesiones = sesiones.select_for_update()
+    ultima = sesiones.order_by('-fecha_mov', '-pk').first()
+    return ultima if ultima is not None and ultima.tipo_mov == APERTURA else None
+
+
+def abrir_sesion(caja, empleado, monto_inicial=None):
+    monto = caja.monto_inicial if monto_inicial is None else monto_inicial
+    return CabeceraCaja.objects.create(
+        caja=caja, empleado=empleado, tipo_mov=APERTURA, fecha_mov=timezone.now(),
+        monto_inical=monto, monto_final=monto,
+    )
+
+
+def cerrar_caja(caja_id, empleado, monto_contado=None):
+    """
+    Cierra la caja: registra el cierre con el saldo de la sesión (o lo
+    contado en el arqueo) y la marca Cerrada. Devuelve el cierre, el saldo
+    esperado y la diferencia con lo contado (None sin arqueo).
+    """
+    with transaction.atomic():
+        caja = bloquear_caja(caja_id)
+        # Los movimientos mueven el saldo sin bloquear la Caja: se bloquea la
+        # sesión para que uno que llega ahora entre en el saldo o espere
+        sesion = sesion_actual(caja, bloquear=True)
+        esperado = sesion.monto_final if sesion else Decimal(caja.monto_inicial)
+        contado = esperado if monto_contado is None else Decimal(monto_contado)
+        cierre = CabeceraCaja.objects.create(
+            caja=caja, empleado=empleado, tipo_mov=CIERRE, fecha_mov=timezone.now(),
+            monto_inical=sesion.monto_inical if sesion else caja.monto_inicial, monto_final=contado,
+        )
+        caja.estado = CERRADA
+        caja.save(update_fields=['estado'])
+    return cierre, esperado, None if monto_contado is None else contado - esperado
+
+
+def conciliar(sesiones):
+    """
+    Compara el saldo de cada apertura con su fondo más la suma de sus
+    movimientos y corrige las que no coinciden. Devuelve las corregidas
+    como [(sesion, saldo_anterior)].
+    """
+    sesiones = sesiones.filter(tipo_mov=APERTURA)
+    corregidas = []
+    with transaction.atomic():
+        # Bloqueadas primero: un movimiento concurrente espera a la corrección
+        bloqueadas = list(sesiones.select_for_update().order_by('pk'))
+        movimientos = dict(
+            DetalleCaja.objects.filter(cabecera_caja__in=sesiones).order_by()
+            .values('cabecera_caja').annotate(total=Sum(Case(
+                *[When(tipo_transaccion=tipo, then=F('monto') * signo) for tipo, signo in SIGNOS.items()],
+                default=0, output_field=IntegerField(),
+            )))
+            .values_list('cabecera_caja', 'total')
+        )
+        for sesion in bloqueadas:
+            saldo = sesion.monto_inical + (movimientos.get(sesion.pk) or 0)
+            if sesion.monto_final != saldo:
+                corregidas.append((sesion, sesion.monto_final))
+                sesion.monto_final = saldo
+        CabeceraCaja.objects.bulk_update([sesion for sesion, _ in corregidas], ['monto_final'], batch_size=500)
+    return corregidas
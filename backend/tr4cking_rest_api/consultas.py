@@ -0,0 +1,117 @@
+"""
+Plan de consultas derivado del árbol de serializers.
+
+Recorre los campos de un serializer y arma los select_related /
+prefetch_related necesarios para serializar un listado con una cantidad de
+consultas constante, sin importar cuántas filas tenga:
+
+- serializers anidados y campos con source punteado ('bus.placa') sobre
+  ForeignKey / OneToOne -> select_related
+- serializers many=True y relaciones inversas o ManyToMany -> Prefetch con
+  su propio queryset optimizado (recursivo)
+"""
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _relacion(model, attr):
+    """Campo de relación de `model` accesible como `attr`, o None."""
+    for field in model._meta.get_fields():
+        if not field.is_relation:
+            continue
+        nombre = field.get_accessor_name() if field.auto_created and not field.concrete else field.name
+        if nombre == attr:
+            return field
+    return None
+
+
+def _es_simple(field):
+    return field.many_to_one or field.one_to_one
+
+
+def plan_relaciones(serializer, model=None):
+    """
+    Devuelve (select_related, prefetch_related) para `serializer`. Los
+    sources que no correspondan a relaciones reales del modelo se ignoran.
+    """
+    model = model or serializer.Meta.model
+    select, prefetch = set(), []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+            continue
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            continue  # usa el <campo>_id, no consulta
+
+        # Para un serializer anidado todo el source es relación; para un
+        # campo simple ('bus.placa') todos los atributos menos el último.
+        anidado = isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField))
+        attrs = field.source.split('.') if anidado else field.source.split('.')[:-1]
+
+        actual, camino = model, []
+        for attr in attrs:
+            relacion = _relacion(actual, attr)
+            if relacion is None:
+                break
+            if not _es_simple(relacion):
+                prefetch.append(_prefetch('__'.join(camino + [attr]), field, relacion.related_model))
+                break
+            camino.append(attr)
+            actual = relacion.related_model
+        else:
+            if camino and isinstance(field, serializers.ModelSerializer):
+                prefijo = '__'.join(camino)
+                sub_select, sub_prefetch = plan_relaciones(field, actual)
+                select.update(f'{prefijo}__{sub}' for sub in sub_select)
+                prefetch.extend(_con_prefijo(prefijo, sub_prefetch))
+        if camino:
+            select.add('__'.join(camino))
+
+    # select_related('a__b') ya incluye 'a'
+    select = {ruta for ruta in select if not any(otra.startswith(ruta + '__') for otra in select)}
+    return sorted(select), prefetch
+
+
+def _prefetch(ruta, field, model):
+    hijo = field.child if isinstance(field, serializers.ListSerializer) else None
+    if not isinstance(hijo, serializers.ModelSerializer):
+        return ruta
+    sub_select, sub_prefetch = plan_relaciones(hijo, model)
+    return Prefetch(ruta, queryset=_aplicar(model._default_manager.all(), sub_select, sub_prefetch))
+
+
+def _con_prefijo(prefijo, prefetch):
+    resultado = []
+    for lookup in prefetch:
+        if isinstance(lookup, Prefetch):
+            resultado.append(Prefetch(f'{prefijo}__{lookup.prefetch_through}', queryset=lookup.queryset))
+        else:
+            resultado.append(f'{prefijo}__{lookup}')
+    return resultado
+
+
+def _aplicar(queryset, select, prefetch):
+    # select_related() sin argumentos seguiría todas las FK
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def optimizar_queryset(queryset, serializer):
+    select, prefetch = plan_relaciones(serializer, queryset.model)
+    return _aplicar(queryset, select, prefetch)
+
+
+class ConsultaOptimizadaMixin:
+    """
+    Aplica a los listados y detalles del viewset el plan de consultas de su
+    serializer, así cada endpoint hace un número fijo de consultas.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in ('list', 'retrieve'):
+            queryset = optimizar_queryset(queryset, self.get_serializer())
+        return queryset
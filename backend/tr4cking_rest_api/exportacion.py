@@ -0,0 +1,177 @@
+"""
+Exportación en streaming (CSV o JSON por líneas) de listados grandes.
+
+La respuesta se arma a medida que se leen las filas: el queryset se
+proyecta con .values() (sin instanciar modelos ni serializers) y se recorre
+con .iterator(), que en PostgreSQL usa un cursor del lado del servidor. La
+memoria no crece con el rango de fechas pedido.
+"""
+import csv
+import io
+import json
+from datetime import date
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+CHUNK = 2000
+FILAS_POR_ESCRITURA = 500
+
+
+class _RendererExportacion(BaseRenderer):
+    # Solo para que ?format=csv / ?format=ndjson pasen la negociación de
+    # DRF; la vista devuelve un StreamingHttpResponse y no se renderiza
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class CSVRenderer(_RendererExportacion):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(_RendererExportacion):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class PDFRenderer(_RendererExportacion):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+def _csv(filas, columnas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    for i, fila in enumerate(filas, start=1):
+        escritor.writerow([fila[columna] for columna in columnas])
+        if i % FILAS_POR_ESCRITURA == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson(filas, columnas):
+    lineas = []
+    for fila in filas:
+        lineas.append(json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False))
+        if len(lineas) == FILAS_POR_ESCRITURA:
+            yield '\n'.join(lineas) + '\n'
+            lineas = []
+    if lineas:
+        yield '\n'.join(lineas) + '\n'
+
+
+FORMATOS = {
+    'csv': (_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+# PDF de solo texto (Courier 9 en A4), escrito a mano para no depender de
+# una librería: alcanza para planillas que se imprimen
+PDF_LINEAS_POR_PAGINA = 62
+PDF_COLUMNAS = 96
+
+
+def _texto_pdf(linea):
+    linea = linea[:PDF_COLUMNAS].encode('cp1252', errors='replace')
+    return linea.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def documento_pdf(lineas):
+    """Bytes de un PDF con las líneas de texto dadas, paginado."""
+    lineas = list(lineas)
+    paginas = [lineas[i:i + PDF_LINEAS_POR_PAGINA] for i in range(0, len(lineas), PDF_LINEAS_POR_PAGINA)] or [[]]
+    # 1 catálogo, 2 páginas, 3 fuente; después contenido y página de cada una
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>',
+    ]
+    hijos = []
+    for pagina in paginas:
+        texto = b'BT /F1 9 Tf 12 TL 36 806 Td ' + b' '.join(b'(' + _texto_pdf(linea) + b') Tj T*' for linea in pagina) + b' ET'
+        objetos.append(b'<< /Length %d >>\nstream\n' % len(texto) + texto + b'\nendstream')
+        objetos.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> '
+            b'/Contents %d 0 R >>' % len(objetos)
+        )
+        hijos.append(b'%d 0 R' % len(objetos))
+    objetos[1] = b'<< /Type /Pages /Kids [' + b' '.join(hijos) + b'] /Count %d >>' % len(hijos)
+
+    salida = io.BytesIO()
+    salida.write(b'%PDF-1.4\n')
+    posiciones = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posiciones.append(salida.tell())
+        salida.write(b'%d 0 obj\n' % numero + objeto + b'\nendobj\n')
+    inicio_xref = salida.tell()
+    salida.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1))
+    for posicion in posiciones:
+        salida.write(b'%010d 00000 n \n' % posicion)
+    salida.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, inicio_xref))
+    return salida.getvalue()
+
+
+def _adjunto(response, nombre, formato):
+    response['Content-Disposition'] = f'attachment; filename="{nombre}-{timezone.localdate():%Y%m%d}.{formato}"'
+    return response
+
+
+def respuesta_filas(filas, columnas, formato, nombre):
+    """StreamingHttpResponse con las `columnas` de cada fila (dicts)."""
+    generador, content_type = FORMATOS[formato]
+    return _adjunto(StreamingHttpResponse(generador(filas, columnas), content_type=content_type), nombre, formato)
+
+
+def respuesta_pdf(lineas, nombre):
+    return _adjunto(HttpResponse(documento_pdf(lineas), content_type='application/pdf'), nombre, 'pdf')
+
+
+def respuesta_exportacion(queryset, columnas, formato, nombre):
+    """StreamingHttpResponse con las `columnas` (lookups de .values()) del queryset."""
+    filas = queryset.select_related(None).prefetch_related(None).values(*columnas).iterator(chunk_size=CHUNK)
+    return respuesta_filas(filas, columnas, formato, nombre)
+
+
+def _fecha(request, parametro):
+    valor = request.query_params.get(parametro)
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ValidationError({parametro: "Use el formato AAAA-MM-DD"})
+
+
+class ExportacionMixin:
+    """
+    Agrega GET .../exportar/?format=csv|ndjson&desde=&hasta= al viewset.
+    `exportacion_columnas` son lookups de .values() ('cliente__razon_social')
+    y `exportacion_fecha` el campo (o lookup) de fecha que filtran desde/hasta.
+    Los filtros del get_queryset del viewset se aplican igual que en el listado.
+    """
+    exportacion_columnas = ()
+    exportacion_fecha = None
+    exportacion_nombre = None  # Nombre del archivo; por defecto el basename del router
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer, JSONRenderer])
+    def exportar(self, request):
+        formato = request.query_params.get('format', 'csv')
+        if formato not in FORMATOS:
+            raise ValidationError({'format': f"Formatos disponibles: {', '.join(FORMATOS)}"})
+        queryset = self.filter_queryset(self.get_queryset())
+        desde, hasta = _fecha(request, 'desde'), _fecha(request, 'hasta')
+        if desde:
+            queryset = queryset.filter(**{f'{self.exportacion_fecha}__gte': desde})
+        if hasta:
+            queryset = queryset.filter(**{f'{self.exportacion_fecha}__lte': hasta})
+        queryset = queryset.order_by(*getattr(self, 'ordering', None) or ('pk',))
+        return respuesta_exportacion(queryset, self.exportacion_columnas, formato, self.exportacion_nombre or self.basename)
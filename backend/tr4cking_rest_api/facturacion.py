@@ -0,0 +1,173 @@
+"""
+Emisión de facturas en el servidor.
+
+emitir_factura() recibe los pasajes y encomiendas a cobrar, los tarifa,
+calcula subtotales e IVA con Decimal y guarda cabecera, líneas (bulk_create)
+y el ingreso en caja en una sola transacción, con el número tomado del
+punto de expedición de la parada/caja.
+
+Tarifa de un pasaje: el precio del tramo (TramoRuta.precio) si está cargado;
+si no, el precio base de la ruta prorrateado por los tramos recorridos. Los
+precios incluyen IVA, como en el ticket.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    CabeceraFactura, DetalleCaja, DetalleFactura, Encomienda, Pasaje, TramoRuta
+)
+from .cajas import CajaNoDisponible, abrir_sesion, bloquear_caja, caja_abierta, sesion_actual
+from .numeracion import NumeracionNoDisponible, asignar_numeros, punto_para, punto_vigente
+from . import ventas_diarias
+
+GUARANIES = Decimal('1')
+
+
+class FacturacionError(Exception):
+    """La factura no se puede emitir con los datos recibidos."""
+
+
+class ItemsYaFacturados(FacturacionError):
+    """Algunos pasajes o encomiendas ya figuran en una factura vigente."""
+
+    def __init__(self, pasajes, encomiendas):
+        self.pasajes, self.encomiendas = sorted(pasajes), sorted(encomiendas)
+        super().__init__("Hay pasajes o encomiendas que ya fueron facturados")
+
+
+def _redondear(monto):
+    return Decimal(monto).quantize(GUARANIES, rounding=ROUND_HALF_UP)
+
+
+def tarifas_pasajes(pasajes):
+    """
+    {pasaje_id: precio} para pasajes con viaje__ruta cargado. Lee los
+    tramos de todas las rutas involucradas en una sola consulta.
+    """
+    rutas = {pasaje.viaje.ruta_id for pasaje in pasajes}
+    tramos, tramos_por_ruta = {}, {}
+    for tramo in TramoRuta.objects.filter(ruta__in=rutas):
+        tramos[(tramo.ruta_id, tramo.origen_id, tramo.destino_id)] = tramo
+        tramos_por_ruta[tramo.ruta_id] = max(tramos_por_ruta.get(tramo.ruta_id, 0), tramo.posicion_destino)
+
+    precios = {}
+    for pasaje in pasajes:
+        ruta = pasaje.viaje.ruta
+        tramo = tramos.get((ruta.pk, pasaje.origen_id, pasaje.destino_id))
+        if tramo is not None and tramo.precio is not None:
+            precios[pasaje.pk] = tramo.precio
+        elif tramo is not None and tramos_por_ruta.get(ruta.pk):
+            precios[pasaje.pk] = _redondear(ruta.precio_base * tramo.cantidad_paradas / tramos_por_ruta[ruta.pk])
+        else:
+            precios[pasaje.pk] = ruta.precio_base  # Sin tramos o pasaje sin origen/destino: ruta completa
+    return precios
+
+
+def _lineas(pasajes, encomiendas):
+    iva_pasaje = getattr(settings, 'TR4CKING_IVA_PASAJE', 10)
+    iva_encomienda = getattr(settings, 'TR4CKING_IVA_ENCOMIENDA', 10)
+    precios = tarifas_pasajes(pasajes)
+    lineas = [
+        DetalleFactura(
+            pasaje=pasaje, cantidad=1, precio_unitario=precios[pasaje.pk], subtotal=precios[pasaje.pk],
+            iva_porcentaje=iva_pasaje,
+            descripcion=f"Pasaje {pasaje.viaje.ruta.nombre} {pasaje.viaje.fecha:%d/%m/%Y} - Asiento {pasaje.asiento.numero_asiento}"[:100],
+        )
+        for pasaje in pasajes
+    ]
+    lineas += [
+        DetalleFactura(
+            encomienda=encomienda, cantidad=1, precio_unitario=encomienda.flete, subtotal=encomienda.flete,
+            iva_porcentaje=iva_encomienda,
+            descripcion=f"Encomienda #{encomienda.pk} ({encomienda.get_tipo_envio_display()})"[:100],
+        )
+        for encomienda in encomiendas
+    ]
+    return lineas
+
+
+def totales(lineas):
+    """Total, exenta e IVA 5/10 (incluidos) de las líneas, sumados línea por línea."""
+    resultado = dict.fromkeys(('monto_total', 'monto_exenta', 'monto_iva_5', 'monto_iva_10'), Decimal('0'))
+    for linea in lineas:
+        resultado['monto_total'] += linea.subtotal
+        if linea.iva_porcentaje == 5:
+            resultado['monto_iva_5'] += ventas_diarias.iva_incluido(linea.subtotal, 5)
+        elif linea.iva_porcentaje == 10:
+            resultado['monto_iva_10'] += ventas_diarias.iva_incluido(linea.subtotal, 10)
+        else:
+            resultado['monto_exenta'] += linea.subtotal
+    return resultado
+
+
+def _bloquear(model, ids, relacionados):
+    ids = set(ids)
+    filas = list(
+        model.objects.select_for_update(of=('self',)).select_related(*relacionados)
+        .filter(pk__in=ids).order_by('pk')
+    )
+    faltantes = ids - {fila.pk for fila in filas}
+    if faltantes:
+        raise FacturacionError(f"No existen {model._meta.verbose_name_plural.lower()}: {sorted(faltantes)}")
+    return filas
+
+
+def emitir_factura(empleado, parada, pasajes=(), encomiendas=(), cliente=None, caja=None,
+                   timbrado=None, condicion='Contado', request=None):
+    """
+    Emite una factura por los pasajes y encomiendas (ids) indicados. Sin
+    caja se usa la abierta del empleado (o de la terminal del request).
+    Lanza FacturacionError (o ItemsYaFacturados) sin guardar nada si algo
+    no cierra. Devuelve la cabecera y sus líneas.
+    """
+    if not pasajes and not encomiendas:
+        raise FacturacionError("La factura debe tener al menos un pasaje o una encomienda")
+
+    with transaction.atomic():
+        caja = caja or caja_abierta(request, empleado_id=empleado.pk)
+        if caja is None:
+            raise FacturacionError("No se puede facturar sin una caja abierta")
+        try:
+            # Bloqueada hasta el commit: un cierre simultáneo espera a este ingreso
+            caja = bloquear_caja(caja.pk)
+        except CajaNoDisponible as e:
+            raise FacturacionError(str(e))
+
+        punto = punto_para(timbrado, parada, caja) if timbrado else punto_vigente(parada, caja)
+        if punto is None:
+            raise FacturacionError("No hay un punto de expedición con timbrado vigente para la parada")
+
+        pasajes = _bloquear(Pasaje, pasajes, ['viaje__ruta', 'asiento'])
+        encomiendas = _bloquear(Encomienda, encomiendas, [])
+        vigentes = DetalleFactura.objects.exclude(factura__estado__in=ventas_diarias.ESTADOS_EXCLUIDOS)
+        ya_pasajes = set(vigentes.filter(pasaje__in=pasajes).values_list('pasaje_id', flat=True))
+        ya_encomiendas = set(vigentes.filter(encomienda__in=encomiendas).values_list('encomienda_id', flat=True))
+        if ya_pasajes or ya_encomiendas:
+            raise ItemsYaFacturados(ya_pasajes, ya_encomiendas)
+
+        lineas = _lineas(pasajes, encomiendas)
+        try:
+            punto, (numero,) = asignar_numeros(punto)
+        except NumeracionNoDisponible as e:
+            raise FacturacionError(str(e))
+
+        factura = CabeceraFactura.objects.create(
+            cliente=cliente, empleado=empleado, timbrado=punto.timbrado, parada=parada,
+            punto_expedicion=punto, numero_factura=numero, condicion=condicion, estado='Emitida',
+            **totales(lineas),
+        )
+        for linea in lineas:
+            linea.factura = factura
+        DetalleFactura.objects.bulk_create(lineas)
+        # bulk_create no dispara las señales del resumen diario
+        ventas_diarias.aplicar(ventas_diarias.aportes_lineas(DetalleFactura.objects.filter(factura=factura)))
+
+        DetalleCaja.objects.create(
+            cabecera_caja=sesion_actual(caja) or abrir_sesion(caja, empleado), factura=factura, tipo_transaccion='Ingreso',
+            monto=int(factura.monto_total), fecha_transaccion=timezone.now(),
+            descripcion=f"Factura {factura.numero_factura}",
+        )
+    return factura, lineas
@@ -0,0 +1,146 @@
+"""
+Generación de viajes a partir de los horarios.
+
+Para cada día del período y cada horario que sale ese día se crea un Viaje
+con el primer bus activo del grupo del horario que no tenga otro viaje esa
+fecha (Viaje es único por bus y fecha). Los horarios se recorren por hora de
+salida, así las salidas más tempranas eligen bus primero.
+
+Es idempotente: lo que ya existe se saltea y viajes e inventario se insertan
+con bulk_create(ignore_conflicts=True) contra las restricciones (bus, fecha)
+y (horario, fecha), así que dos corridas simultáneas no duplican nada. Se
+trabaja por bloques de días, cada uno en su transacción y con un número
+fijo de consultas: si se corta, lo ya generado queda y se retoma desde ahí.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Asiento, AsientoViaje, Horario, Viaje
+
+DIAS_POR_BLOQUE = 31
+LOTE = 5000
+
+
+class ResultadoGeneracion:
+    CONTADORES = ('viajes_creados', 'viajes_existentes', 'asientos_creados')
+
+    def __init__(self):
+        for nombre in self.CONTADORES:
+            setattr(self, nombre, 0)
+        self.sin_bus = []  # [(horario_id, fecha)] sin ningún bus libre ese día
+
+    def como_dict(self, max_sin_bus=None):
+        datos = {nombre: getattr(self, nombre) for nombre in self.CONTADORES}
+        datos['total_sin_bus'] = len(self.sin_bus)
+        datos['sin_bus'] = [{'horario': horario, 'fecha': fecha} for horario, fecha in self.sin_bus[:max_sin_bus]]
+        return datos
+
+
+def _lotes(objetos, tam_lote):
+    objetos = iter(objetos)
+    while lote := list(islice(objetos, tam_lote)):
+        yield lote
+
+
+def _horarios(desde, hasta, horarios=None):
+    consulta = Horario.objects.filter(activo=True, ruta__activo=True, vigente_desde__lte=hasta).filter(
+        Q(vigente_hasta__isnull=True) | Q(vigente_hasta__gte=desde)
+    )
+    if horarios is not None:
+        consulta = consulta.filter(pk__in=horarios)
+    return list(consulta.order_by('hora_salida', 'id_horario'))
+
+
+def _buses_por_horario(horarios):
+    """{horario_id: [bus_id]} solo con los buses activos, en orden de id."""
+    buses = defaultdict(list)
+    grupos = (
+        Horario.buses.through.objects
+        .filter(horario_id__in=[horario.pk for horario in horarios], bus__estado='Activo')
+        .order_by('bus_id').values_list('horario_id', 'bus_id')
+    )
+    for horario_id, bus_id in grupos:
+        buses[horario_id].append(bus_id)
+    return buses
+
+
+def _inventario(viajes, asientos_por_bus):
+    for viaje_id, bus_id in viajes:
+        for asiento_id in asientos_por_bus.get(bus_id, ()):
+            yield AsientoViaje(viaje_id=viaje_id, asiento_id=asiento_id)
+
+
+def _generar_bloque(desde, hasta, horarios, buses, asientos_por_bus, resultado, lote):
+    ids = {horario.pk for horario in horarios}
+    todos_los_buses = {bus_id for grupo in buses.values() for bus_id in grupo}
+    ocupados, hechos = set(), set()
+    existentes = Viaje.objects.filter(fecha__range=(desde, hasta)).filter(
+        Q(bus_id__in=todos_los_buses) | Q(horario_id__in=ids)
+    )
+    for bus_id, fecha, horario_id in existentes.values_list('bus_id', 'fecha', 'horario_id'):
+        ocupados.add((bus_id, fecha))
+        if horario_id is not None:
+            hechos.add((horario_id, fecha))
+
+    nuevos = []
+    fecha = desde
+    while fecha <= hasta:
+        for horario in horarios:
+            if not horario.sale_el(fecha):
+                continue
+            if (horario.pk, fecha) in hechos:
+                resultado.viajes_existentes += 1
+                continue
+            bus_id = next((bus_id for bus_id in buses.get(horario.pk, ()) if (bus_id, fecha) not in ocupados), None)
+            if bus_id is None:
+                resultado.sin_bus.append((horario.pk, fecha))
+                continue
+            ocupados.add((bus_id, fecha))
+            nuevos.append(Viaje(horario_id=horario.pk, ruta_id=horario.ruta_id, bus_id=bus_id, fecha=fecha))
+        fecha += timedelta(days=1)
+    if not nuevos:
+        return
+
+    with transaction.atomic():
+        # Sin pk de vuelta con ignore_conflicts: los creados se cuentan después
+        Viaje.objects.bulk_create(nuevos, batch_size=lote, ignore_conflicts=True)
+        de_horarios = Viaje.objects.filter(horario_id__in=ids, fecha__range=(desde, hasta))
+        resultado.viajes_creados += de_horarios.count() - sum(1 for horario_id, _ in hechos if horario_id in ids)
+        # bulk_create no dispara crear_inventario_viaje (signals): se arma acá
+        # para los viajes que todavía no tienen filas
+        sin_inventario = de_horarios.filter(inventario__isnull=True).values_list('pk', 'bus_id')
+        for filas in _lotes(_inventario(sin_inventario, asientos_por_bus), lote):
+            AsientoViaje.objects.bulk_create(filas, ignore_conflicts=True)
+            resultado.asientos_creados += len(filas)
+
+
+def generar_viajes(desde, hasta, horarios=None, lote=LOTE, progreso=None):
+    """
+    Crea los viajes de los horarios activos (o de los ids en `horarios`)
+    entre `desde` y `hasta` inclusive, con su inventario de asientos.
+    `progreso(hasta_fecha, resultado)` se llama al terminar cada bloque.
+    """
+    resultado = ResultadoGeneracion()
+    horarios = _horarios(desde, hasta, horarios)
+    if not horarios:
+        return resultado
+    buses = _buses_por_horario(horarios)
+    asientos_por_bus = defaultdict(list)
+    asientos = Asiento.objects.filter(
+        bus_id__in={bus_id for grupo in buses.values() for bus_id in grupo}
+    ).order_by('bus_id', 'numero_asiento').values_list('bus_id', 'pk')
+    for bus_id, asiento_id in asientos:
+        asientos_por_bus[bus_id].append(asiento_id)
+
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(inicio + timedelta(days=DIAS_POR_BLOQUE - 1), hasta)
+        _generar_bloque(inicio, fin, horarios, buses, asientos_por_bus, resultado, lote)
+        if progreso:
+            progreso(fin, resultado)
+        inicio = fin + timedelta(days=1)
+    return resultado
@@ -0,0 +1,242 @@
+"""
+Importación masiva de personas (y sus clientes/pasajeros) desde CSV o XLSX.
+
+El archivo se lee fila por fila y se procesa en lotes: cada lote valida sus
+filas, hace upsert de Persona por cédula con INSERT ... ON CONFLICT y crea
+en bloque los Cliente/Pasajero que falten. Las filas con errores (incluidas
+las que no se pueden leer) se informan con su número y no frenan al resto.
+Cada lote es una transacción.
+
+Columnas (la primera fila es el encabezado, sin distinguir mayúsculas):
+cedula, nombre, apellido, telefono, direccion y, opcionales, razon_social,
+dv, cliente y pasajero (si/no; si faltan se usa lo pedido al importar).
+Un telefono o direccion vacío (o una columna ausente) no pisa el dato de una
+persona existente.
+"""
+import csv
+import io
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Cliente, Pasajero, Persona
+
+LOTE = 2000
+
+CAMPOS_PERSONA = ('nombre', 'apellido', 'telefono', 'direccion')
+CAMPOS_OPCIONALES = ('telefono', 'direccion')
+VERDADEROS = {'si', 'sí', 's', 'true', '1', 'x', 'yes'}
+
+
+class ArchivoInvalido(Exception):
+    """El archivo no se puede leer o no tiene las columnas necesarias."""
+
+
+class ResultadoImportacion:
+    CONTADORES = ('filas', 'personas_creadas', 'personas_actualizadas', 'clientes_creados', 'pasajeros_creados')
+
+    def __init__(self):
+        for nombre in self.CONTADORES:
+            setattr(self, nombre, 0)
+        self.errores = []  # [(número de fila, mensaje)]
+
+    def como_dict(self, max_errores=None):
+        datos = {nombre: getattr(self, nombre) for nombre in self.CONTADORES}
+        datos['total_errores'] = len(self.errores)
+        datos['errores'] = [{'fila': fila, 'error': error} for fila, error in self.errores[:max_errores]]
+        return datos
+
+
+def _normalizar(encabezado):
+    return [str(columna or '').strip().lower() for columna in encabezado]
+
+
+def _validar_encabezado(encabezado):
+    faltantes = [columna for columna in ('cedula', 'nombre', 'apellido') if columna not in encabezado]
+    if faltantes:
+        raise ArchivoInvalido(f"Faltan las columnas: {', '.join(faltantes)}")
+
+
+def _es_utf8(valores):
+    # Con surrogateescape los bytes que no son UTF-8 quedan como sustitutos
+    try:
+        ''.join(valores).encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def filas_csv(archivo):
+    """
+    (número de fila, dict) de un CSV binario; detecta ',' o ';'. Una fila
+    que no se puede leer (no es UTF-8 o está mal formada) se entrega como
+    (número de fila, ValueError) para informarla sin cortar la importación.
+    """
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', errors='surrogateescape', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t') if muestra else csv.excel
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.reader(texto, dialecto)
+    try:
+        encabezado = next(lector, [])
+    except csv.Error as e:
+        raise ArchivoInvalido(f"No se pudo leer el encabezado: {e}")
+    if not _es_utf8(encabezado):
+        raise ArchivoInvalido("El archivo no está en UTF-8")
+    encabezado = _normalizar(encabezado)
+    _validar_encabezado(encabezado)
+    numero = 1
+    while True:
+        numero += 1
+        try:
+            valores = next(lector)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield numero, ValueError(f"Fila mal formada: {e}")
+            continue
+        if not _es_utf8(valores):
+            yield numero, ValueError("La fila no está en UTF-8")
+        elif any(valor.strip() for valor in valores):
+            yield numero, dict(zip(encabezado, valores))
+
+
+def filas_xlsx(archivo):
+    """(número de fila, dict) de la primera hoja de un XLSX, sin cargarlo entero."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ArchivoInvalido("Para importar archivos XLSX hay que instalar openpyxl")
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as e:
+        raise ArchivoInvalido(f"No se pudo leer el XLSX: {e}")
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = _normalizar(next(filas, ()))
+        _validar_encabezado(encabezado)
+        for numero, valores in enumerate(filas, start=2):
+            if any(valor not in (None, '') for valor in valores):
+                yield numero, dict(zip(encabezado, valores))
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """Elige el lector por la extensión del archivo."""
+    if nombre.lower().endswith('.xlsx'):
+        return filas_xlsx(archivo)
+    if nombre.lower().endswith(('.csv', '.txt')):
+        return filas_csv(archivo)
+    raise ArchivoInvalido("Formato no soportado: use CSV o XLSX")
+
+
+def _texto(fila, columna):
+    valor = fila.get(columna)
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():  # Números de Excel
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _bandera(fila, columna, por_defecto):
+    valor = _texto(fila, columna).lower()
+    return por_defecto if valor == '' else valor in VERDADEROS
+
+
+def _validar(fila):
+    """(cedula, datos de persona) o ValueError con el motivo."""
+    if isinstance(fila, ValueError):  # No se pudo leer
+        raise fila
+    cedula = _texto(fila, 'cedula').replace('.', '')
+    if not cedula.isdigit() or int(cedula) <= 0:
+        raise ValueError(f"Cédula inválida: {cedula or '(vacía)'}")
+    datos = {campo: _texto(fila, campo) for campo in CAMPOS_PERSONA}
+    for campo in ('nombre', 'apellido'):
+        if not datos[campo]:
+            raise ValueError(f"Falta {campo}")
+    for campo, largo in (('nombre', 50), ('apellido', 50), ('telefono', 30)):
+        if len(datos[campo]) > largo:
+            raise ValueError(f"{campo} supera {largo} caracteres")
+    return int(cedula), datos
+
+
+def _importar_lote(lote, resultado, clientes, pasajeros):
+    personas, extra = {}, {}
+    for numero, fila in lote:
+        try:
+            cedula, datos = _validar(fila)
+        except ValueError as e:
+            resultado.errores.append((numero, str(e)))
+            continue
+        if cedula in personas:
+            # Un INSERT ... ON CONFLICT no puede tocar dos veces la misma fila
+            resultado.errores.append((extra[cedula]['numero'], f"Cédula {cedula} repetida: se usa la fila {numero}"))
+        personas[cedula] = Persona(cedula=cedula, **datos)
+        razon_social = _texto(fila, 'razon_social') or f"{datos['nombre']} {datos['apellido']}"
+        extra[cedula] = {
+            'numero': numero,
+            'cliente': _bandera(fila, 'cliente', clientes),
+            'pasajero': _bandera(fila, 'pasajero', pasajeros),
+            'razon_social': razon_social[:100],
+            'dv': _texto(fila, 'dv')[:2] or None,
+        }
+    if not personas:
+        return
+
+    # Solo se actualiza lo que la fila trae: un upsert por combinación de
+    # campos opcionales presentes (a lo sumo cuatro por lote)
+    grupos = {}
+    for persona in personas.values():
+        campos = tuple(campo for campo in CAMPOS_OPCIONALES if getattr(persona, campo))
+        grupos.setdefault(campos, []).append(persona)
+
+    cedulas = list(personas)
+    with transaction.atomic():
+        existentes = set(Persona.objects.filter(cedula__in=cedulas).values_list('cedula', flat=True))
+        for campos, grupo in grupos.items():
+            Persona.objects.bulk_create(
+                grupo, update_conflicts=True, unique_fields=['cedula'], update_fields=['nombre', 'apellido', *campos]
+            )
+        resultado.personas_creadas += len(cedulas) - len(existentes)
+        resultado.personas_actualizadas += len(existentes)
+
+        con_cliente = set(Cliente.objects.filter(cedula__in=cedulas).values_list('cedula_id', flat=True))
+        nuevos_clientes = [
+            Cliente(cedula_id=cedula, razon_social=extra[cedula]['razon_social'], dv=extra[cedula]['dv'])
+            for cedula in cedulas if extra[cedula]['cliente'] and cedula not in con_cliente
+        ]
+        Cliente.objects.bulk_create(nuevos_clientes)
+        resultado.clientes_creados += len(nuevos_clientes)
+
+        con_pasajero = set(Pasajero.objects.filter(cedula__in=cedulas).values_list('cedula_id', flat=True))
+        nuevos_pasajeros = [
+            Pasajero(cedula_id=cedula)
+            for cedula in cedulas if extra[cedula]['pasajero'] and cedula not in con_pasajero
+        ]
+        Pasajero.objects.bulk_create(nuevos_pasajeros)
+        resultado.pasajeros_creados += len(nuevos_pasajeros)
+
+
+def importar_personas(filas, clientes=False, pasajeros=False, lote=LOTE, progreso=None):
+    """
+    Importa (número de fila, dict) por lotes. `clientes`/`pasajeros` indican
+    si crear el Cliente/Pasajero de cada persona cuando el archivo no trae
+    esas columnas. `progreso(resultado)` se llama después de cada lote.
+    """
+    resultado = ResultadoImportacion()
+    filas = iter(filas)
+    while True:
+        bloque = list(islice(filas, lote))
+        if not bloque:
+            break
+        resultado.filas += len(bloque)
+        _importar_lote(bloque, resultado, clientes, pasajeros)
+        if progreso:
+            progreso(resultado)
+    resultado.errores.sort()
+    return resultado
@@ -0,0 +1,283 @@
+"""
+Instrumentación por request: consultas SQL, tiempo en la base, consultas
+repetidas (N+1), tiempo de serialización y tamaño de la respuesta.
+
+Es opcional: con TR4CKING_INSTRUMENTACION = False el middleware se descarta
+al arrancar y no cuesta nada. Activada, cada request:
+
+- responde con Server-Timing (db, ser, total) y X-Consultas-SQL;
+- deja una línea en el logger 'tr4cking.instrumentacion' (los datos van
+  como JSON en el mensaje y en `extra`); las de N+1 como warning;
+- suma a histogramas por ruta que se guardan en el cache (compartidos por
+  todos los procesos, por una semana) y se consultan en
+  GET /api/instrumentacion/ (solo staff; DELETE los reinicia).
+
+Las consultas se miden con un execute_wrapper, así que no hace falta DEBUG.
+Dos consultas son "la misma" si su SQL sin parámetros es igual: un mismo
+SELECT repetido muchas veces en un request suele ser un N+1.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .cache_catalogos import cache_compartido
+
+logger = logging.getLogger('tr4cking.instrumentacion')
+
+PREFIJO = 'tr4cking:instrumentacion'
+
+# Límites superiores de cada barra de los histogramas (la última es "más")
+LIMITES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100)
+
+# Vida de los contadores en el cache, desde el primer request de cada ruta
+DURACION = 7 * 24 * 3600
+
+# Sumas por ruta, en enteros porque el cache solo incrementa enteros
+SUMAS = ('requests', 'n_mas_1', 'total_us', 'sql_us', 'serializacion_us', 'consultas', 'bytes')
+
+_medicion = ContextVar('tr4cking_medicion', default=None)
+
+
+class Medicion:
+    """Lo que va sumando un request mientras se atiende."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.sql = 0.0
+        self.serializacion = 0.0
+        self.profundidad = 0
+        self.plantillas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - inicio
+            self.consultas += 1
+            self.plantillas[sql] += 1
+
+    def repetidas(self, umbral):
+        """[(sql, veces)] de las consultas que se repiten `umbral` veces o más."""
+        return [(sql, veces) for sql, veces in self.plantillas.most_common() if veces >= umbral]
+
+
+@contextmanager
+def _serializando(medicion):
+    # Solo cuenta el serializer de más afuera: los anidados ya están dentro
+    medicion.profundidad += 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.profundidad -= 1
+        if not medicion.profundidad:
+            medicion.serializacion += time.perf_counter() - inicio
+
+
+def serializando():
+    """Contexto que suma su duración al tiempo de serialización del request."""
+    medicion = _medicion.get()
+    return nullcontext() if medicion is None else _serializando(medicion)
+
+
+def _barra(valor, limites):
+    for limite in limites:
+        if valor <= limite:
+            return str(limite)
+    return 'mas'
+
+
+def _ruta(request):
+    match = getattr(request, 'resolver_match', None)
+    nombre = (match.view_name or match.route) if match else '(sin ruta)'
+    return f'{request.method} {nombre}'
+
+
+# -----------------------------------------------
+# Histogramas en el cache
+# -----------------------------------------------
+# Cada proceso acumula en memoria y vuelca con incr() cada tantos segundos.
+# Las rutas se numeran con un contador del cache para poder listarlas sin
+# leer y reescribir una lista compartida. Todas las claves llevan la época,
+# que reiniciar() incrementa para empezar de cero.
+_pendiente = Counter()
+_rutas_registradas = set()
+_candado = threading.Lock()
+_ultimo_volcado = [time.monotonic()]
+
+
+def _epoca():
+    clave = f'{PREFIJO}:epoca'
+    epoca = cache_compartido().get(clave)
+    if epoca is None:
+        cache_compartido().add(clave, time.time_ns(), None)
+        epoca = cache_compartido().get(clave)
+    return epoca
+
+
+def _clave(epoca, ruta, nombre):
+    # Las rutas tienen espacios y caracteres que memcached no acepta en claves
+    return f'{PREFIJO}:{epoca}:{hashlib.md5(ruta.encode()).hexdigest()}:{nombre}'
+
+
+def _registrar_ruta(epoca, ruta):
+    if (epoca, ruta) in _rutas_registradas:
+        return
+    if cache_compartido().get(_clave(epoca, ruta, 'id')) is None:
+        cache_compartido().add(f'{PREFIJO}:{epoca}:rutas', 0, DURACION)
+        numero = cache_compartido().incr(f'{PREFIJO}:{epoca}:rutas')
+        if cache_compartido().add(_clave(epoca, ruta, 'id'), numero, DURACION):
+            cache_compartido().set(f'{PREFIJO}:{epoca}:ruta:{numero}', ruta, DURACION)
+    _rutas_registradas.add((epoca, ruta))
+
+
+def _incrementar(clave, valor):
+    try:
+        cache_compartido().incr(clave, valor)
+    except ValueError:
+        if not cache_compartido().add(clave, valor, DURACION):
+            cache_compartido().incr(clave, valor)
+
+
+def volcar():
+    """Pasa al cache lo acumulado en este proceso."""
+    with _candado:
+        pendiente = dict(_pendiente)
+        _pendiente.clear()
+        _ultimo_volcado[0] = time.monotonic()
+    if not pendiente:
+        return
+    epoca = _epoca()
+    for ruta in {ruta for ruta, _ in pendiente}:
+        _registrar_ruta(epoca, ruta)
+    for (ruta, clave), valor in pendiente.items():
+        _incrementar(_clave(epoca, ruta, clave), valor)
+
+
+def _acumular(ruta, datos):
+    with _candado:
+        for suma in SUMAS:
+            _pendiente[ruta, suma] += datos[suma]
+        _pendiente[ruta, f"ms:{_barra(datos['total_us'] / 1000, LIMITES_MS)}"] += 1
+        _pendiente[ruta, f"consultas:{_barra(datos['consultas'], LIMITES_CONSULTAS)}"] += 1
+        vencido = time.monotonic() - _ultimo_volcado[0] >= getattr(settings, 'TR4CKING_INSTRUMENTACION_VOLCADO_SEGUNDOS', 10)
+    if vencido:
+        volcar()
+
+
+def histogramas():
+    """{ruta: {sumas, promedios y barras de duración y consultas}} de todos los procesos."""
+    volcar()
+    epoca = _epoca()
+    cantidad = cache_compartido().get(f'{PREFIJO}:{epoca}:rutas') or 0
+    rutas = cache_compartido().get_many([f'{PREFIJO}:{epoca}:ruta:{numero}' for numero in range(1, cantidad + 1)])
+    barras_ms = [f'ms:{_barra(limite, LIMITES_MS)}' for limite in LIMITES_MS] + ['ms:mas']
+    barras_consultas = [f'consultas:{_barra(limite, LIMITES_CONSULTAS)}' for limite in LIMITES_CONSULTAS] + ['consultas:mas']
+    resultado = {}
+    for ruta in sorted(rutas.values()):
+        claves = [*SUMAS, *barras_ms, *barras_consultas]
+        guardados = cache_compartido().get_many([_clave(epoca, ruta, clave) for clave in claves])
+        valores = {clave: guardados.get(_clave(epoca, ruta, clave), 0) for clave in claves}
+        requests = valores['requests'] or 1
+        resultado[ruta] = {
+            'requests': valores['requests'],
+            'n_mas_1': valores['n_mas_1'],
+            'promedio_ms': round(valores['total_us'] / requests / 1000, 2),
+            'promedio_sql_ms': round(valores['sql_us'] / requests / 1000, 2),
+            'promedio_serializacion_ms': round(valores['serializacion_us'] / requests / 1000, 2),
+            'promedio_consultas': round(valores['consultas'] / requests, 2),
+            'promedio_bytes': round(valores['bytes'] / requests),
+            'duracion_ms': {clave[3:]: valores[clave] for clave in barras_ms},
+            'consultas': {clave[10:]: valores[clave] for clave in barras_consultas},
+        }
+    return resultado
+
+
+def reiniciar():
+    """Descarta los histogramas acumulados (las claves viejas expiran solas)."""
+    with _candado:
+        _pendiente.clear()
+    try:
+        cache_compartido().incr(f'{PREFIJO}:epoca')
+    except ValueError:
+        cache_compartido().set(f'{PREFIJO}:epoca', time.time_ns(), None)
+
+
+# -----------------------------------------------
+# Middleware
+# -----------------------------------------------
+def activa():
+    return getattr(settings, 'TR4CKING_INSTRUMENTACION', False)
+
+
+class InstrumentacionMiddleware:
+    def __init__(self, get_response):
+        if not activa():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.umbral = getattr(settings, 'TR4CKING_INSTRUMENTACION_UMBRAL_N_MAS_1', 5)
+
+    def __call__(self, request):
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        try:
+            with connection.execute_wrapper(medicion):
+                response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        total = time.perf_counter() - medicion.inicio
+
+        repetidas = medicion.repetidas(self.umbral)
+        datos = {
+            'requests': 1,
+            'n_mas_1': int(bool(repetidas)),
+            'total_us': round(total * 1e6),
+            'sql_us': round(medicion.sql * 1e6),
+            'serializacion_us': round(medicion.serializacion * 1e6),
+            'consultas': medicion.consultas,
+            # Las respuestas en streaming no tienen tamaño hasta terminar
+            'bytes': 0 if response.streaming else len(response.content),
+        }
+        ruta = _ruta(request)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={medicion.sql * 1000:.1f};desc="{medicion.consultas} consultas"',
+            f'ser;dur={medicion.serializacion * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        response['X-Consultas-SQL'] = str(medicion.consultas)
+
+        registro = {
+            'ruta': ruta,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': round(total * 1000, 1),
+            'sql_ms': round(medicion.sql * 1000, 1),
+            'serializacion_ms': round(medicion.serializacion * 1000, 1),
+            'consultas': medicion.consultas,
+            'bytes': None if response.streaming else datos['bytes'],
+        }
+        if repetidas:
+            registro['repetidas'] = [{'sql': sql[:300], 'veces': veces} for sql, veces in repetidas[:3]]
+            logger.warning('N+1 %s', json.dumps(registro, ensure_ascii=False), extra={'instrumentacion': registro})
+        else:
+            logger.info('%s', json.dumps(registro, ensure_ascii=False), extra={'instrumentacion': registro})
+
+        try:
+            _acumular(ruta, datos)
+        except Exception:
+            # Un cache caído no puede tirar el request
+            logger.exception('No se pudieron guardar los histogramas de %s', ruta)
+        return response
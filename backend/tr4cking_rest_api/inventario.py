@@ -0,0 +1,285 @@
+"""
+Inventario de asientos por viaje.
+
+Cada Viaje tiene una fila AsientoViaje por asiento de su bus. Las operaciones
+de retener / confirmar / liberar bloquean solo las filas del viaje afectado,
+así que las ventas del mismo bus en fechas distintas no compiten entre sí.
+
+La ocupación se lleva por tramo con máscaras de bits (ver
+TramoRuta.mascara): un asiento está libre para las paradas i..j si ninguno
+de esos bits está vendido ni retenido, lo que se resuelve con un AND sobre
+la fila del asiento sin leer los pasajes.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, ExpressionWrapper, F, Q, Value, When
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from .models import Asiento, AsientoViaje, Pasaje, Reserva, Viaje
+from .tramos import MASCARA_VIAJE, mascara_de, resolver_tramo
+
+
+class AsientoNoDisponible(Exception):
+    """
+    Uno o más asientos pedidos no se pueden tomar. `conflictos` mapea cada
+    asiento (id) al motivo: 'Ocupado', 'Reservado', 'En proceso' (otra venta
+    lo tiene bloqueado), 'Duplicado' o 'No pertenece al viaje'.
+    """
+
+    def __init__(self, conflictos):
+        self.conflictos = dict(sorted(conflictos.items()))
+        super().__init__(f"Asientos no disponibles: {list(self.conflictos)}")
+
+    def como_lista(self):
+        return [{'asiento': asiento, 'motivo': motivo} for asiento, motivo in self.conflictos.items()]
+
+
+def minutos_retencion():
+    return getattr(settings, 'TR4CKING_RETENCION_ASIENTO_MINUTOS', 10)
+
+
+def _sin_bits(campo, mascara):
+    if mascara == MASCARA_VIAJE:
+        return Q(**{campo: 0})
+    # `mascara` puede ser un entero o una expresión (OuterRef en búsquedas)
+    bits = ExpressionWrapper(F(campo).bitand(mascara), output_field=BigIntegerField())
+    return Q(Exact(bits, 0))
+
+
+def filtro_libre(ahora=None, mascara=MASCARA_VIAJE):
+    """Q para filas libres en los tramos de `mascara`: sin vender y sin retención vigente."""
+    ahora = ahora or timezone.now()
+    return _sin_bits('tramos_ocupados', mascara) & (
+        _sin_bits('tramos_retenidos', mascara)
+        | Q(retenido_hasta__lt=ahora)
+        | Q(retenido_hasta__isnull=True)
+    )
+
+
+def mascara_pasaje(pasaje):
+    """Tramos que ocupa el pasaje; sin origen/destino válidos, todo el viaje."""
+    mascara = mascara_de(pasaje.viaje.ruta_id, pasaje.origen_id, pasaje.destino_id)
+    return MASCARA_VIAJE if mascara is None else mascara
+
+
+def generar_inventario(viaje):
+    """
+    Crea las filas faltantes del inventario de un viaje a partir de los
+    asientos de su bus. Es idempotente; si el viaje cambió de bus, descarta
+    las filas libres del bus anterior.
+    """
+    AsientoViaje.objects.filter(viaje=viaje, estado='Disponible').exclude(
+        asiento__bus_id=viaje.bus_id
+    ).delete()
+    asientos = Asiento.objects.filter(bus_id=viaje.bus_id).values_list('pk', flat=True)
+    AsientoViaje.objects.bulk_create(
+        [AsientoViaje(viaje=viaje, asiento_id=asiento_id) for asiento_id in asientos],
+        ignore_conflicts=True,
+    )
+
+
+def agregar_asientos_a_viajes(bus, asientos):
+    """Suma asientos (ids) nuevos del bus al inventario de sus viajes pendientes."""
+    viajes = Viaje.objects.filter(bus=bus, fecha__gte=timezone.localdate()).values_list('pk', flat=True)
+    AsientoViaje.objects.bulk_create(
+        [AsientoViaje(viaje_id=viaje_id, asiento_id=asiento_id) for viaje_id in viajes for asiento_id in asientos],
+        ignore_conflicts=True,
+    )
+
+
+def asientos_disponibles(viaje, mascara=MASCARA_VIAJE):
+    """Filas libres del viaje para los tramos de `mascara`."""
+    return AsientoViaje.objects.filter(viaje=viaje).filter(filtro_libre(mascara=mascara))
+
+
+def _bloquear(viaje, asientos, skip_locked=False):
+    """
+    Bloquea (SELECT ... FOR UPDATE) las filas pedidas del viaje. Devuelve las
+    filas y un dict de conflictos para los asientos que no se obtuvieron.
+    Con `skip_locked` no espera a otras ventas: sus filas se informan como
+    'En proceso'.
+    """
+    asientos = set(asientos)
+    filas = list(
+        AsientoViaje.objects.select_for_update(skip_locked=skip_locked)
+        .filter(viaje=viaje, asiento_id__in=asientos)
+        .order_by('asiento_id')
+    )
+    faltantes = asientos - {fila.asiento_id for fila in filas}
+    conflictos = dict.fromkeys(faltantes, 'No pertenece al viaje')
+    if faltantes and skip_locked:
+        bloqueados = AsientoViaje.objects.filter(viaje=viaje, asiento_id__in=faltantes)
+        conflictos.update(dict.fromkeys(bloqueados.values_list('asiento_id', flat=True), 'En proceso'))
+    return filas, conflictos
+
+
+def _motivo(fila, mascara):
+    return 'Ocupado' if fila.tramos_ocupados & mascara else 'Reservado'
+
+
+def _guardar(filas):
+    for fila in filas:
+        fila.estado = fila.calcular_estado()
+    AsientoViaje.objects.bulk_update(
+        filas, ['estado', 'tramos_ocupados', 'tramos_retenidos', 'retenido_hasta', 'reserva']
+    )
+
+
+def _ocupar(filas, mascaras_por_asiento, reserva_id, ahora):
+    """
+    Marca vendidos los tramos pedidos en cada fila. La retención de la
+    misma reserva (o una vencida) se descarta; la de otra reserva sobre
+    tramos distintos se conserva.
+    """
+    for fila in filas:
+        fila.tramos_ocupados |= mascaras_por_asiento[fila.asiento_id]
+        if not fila.retencion_vigente(ahora) or fila.reserva_id == reserva_id:
+            fila.tramos_retenidos = 0
+            fila.retenido_hasta = None
+            fila.reserva_id = None
+    _guardar(filas)
+
+
+def retener_asientos(viaje, asientos, reserva, minutos=None, mascara=MASCARA_VIAJE):
+    """
+    Retiene los tramos de `mascara` de los asientos (ids) del viaje para la
+    reserva durante `minutos`. Es todo o nada: si alguno no está libre se
+    lanza AsientoNoDisponible y no se retiene ninguno. Cada fila guarda una
+    sola retención, así que un asiento retenido por otra reserva no se
+    puede retener aunque sea para otros tramos. Devuelve la fecha de
+    vencimiento de la retención.
+    """
+    reserva_id = getattr(reserva, 'pk', reserva)
+    ahora = timezone.now()
+    hasta = ahora + timedelta(minutes=minutos or minutos_retencion())
+    with transaction.atomic():
+        filas, conflictos = _bloquear(viaje, asientos)
+        conflictos.update({
+            fila.asiento_id: _motivo(fila, mascara) for fila in filas
+            if not fila.esta_libre(ahora, reserva_id, mascara)
+            or (fila.retencion_vigente(ahora) and fila.reserva_id != reserva_id)
+        })
+        if conflictos:
+            raise AsientoNoDisponible(conflictos)
+        for fila in filas:
+            fila.tramos_retenidos = mascara
+            fila.retenido_hasta = hasta
+            fila.reserva_id = reserva_id
+        _guardar(filas)
+    return hasta
+
+
+def confirmar_asientos(viaje, mascaras_por_asiento, reserva=None):
+    """
+    Vende los tramos de `mascaras_por_asiento` ({asiento_id: mascara}).
+    Acepta tramos libres o retenidos por la misma reserva.
+    """
+    reserva_id = getattr(reserva, 'pk', reserva)
+    ahora = timezone.now()
+    with transaction.atomic():
+        filas, conflictos = _bloquear(viaje, mascaras_por_asiento.keys())
+        conflictos.update({
+            fila.asiento_id: _motivo(fila, mascaras_por_asiento[fila.asiento_id]) for fila in filas
+            if not fila.esta_libre(ahora, reserva_id, mascaras_por_asiento[fila.asiento_id])
+        })
+        if conflictos:
+            raise AsientoNoDisponible(conflictos)
+        _ocupar(filas, mascaras_por_asiento, reserva_id, ahora)
+
+
+def desocupar_asientos(viaje, mascaras_por_asiento):
+    """Devuelve a la venta los tramos de `mascaras_por_asiento` ({asiento_id: mascara})."""
+    with transaction.atomic():
+        filas, _ = _bloquear(viaje, mascaras_por_asiento.keys())
+        for fila in filas:
+            fila.tramos_ocupados &= ~mascaras_por_asiento[fila.asiento_id]
+        _guardar(filas)
+
+
+def liberar_asientos(viaje, asientos, reserva=None):
+    """
+    Anula las retenciones de los asientos (ids) del viaje. Con `reserva`,
+    solo las de esa reserva. Los tramos vendidos no se tocan.
+    """
+    filas = AsientoViaje.objects.filter(viaje=viaje, asiento_id__in=list(asientos)).exclude(tramos_retenidos=0)
+    if reserva is not None:
+        filas = filas.filter(reserva_id=getattr(reserva, 'pk', reserva))
+    return filas.update(
+        tramos_retenidos=0, retenido_hasta=None, reserva=None,
+        estado=Case(When(tramos_ocupados=0, then=Value('Disponible')), default=Value('Ocupado')),
+    )
+
+
+def tramos_vendidos(viajes):
+    """{(viaje_id, asiento_id): bits de los tramos vendidos} según los pasajes."""
+    mascaras, ocupados = {}, defaultdict(int)
+    for viaje_id, asiento_id, ruta_id, origen_id, destino_id in Pasaje.objects.filter(
+        viaje__in=viajes
+    ).values_list('viaje_id', 'asiento_id', 'viaje__ruta_id', 'origen_id', 'destino_id'):
+        clave = (ruta_id, origen_id, destino_id)
+        if clave not in mascaras:
+            mascara = mascara_de(*clave)
+            mascaras[clave] = MASCARA_VIAJE if mascara is None else mascara
+        ocupados[(viaje_id, asiento_id)] |= mascaras[clave]
+    return ocupados
+
+
+def recalcular_ocupacion(viajes):
+    """
+    Rehace los tramos vendidos de los viajes a partir de sus pasajes. Se usa
+    cuando cambia la numeración de tramos de una ruta; las retenciones en
+    curso se descartan porque sus bits ya no corresponden.
+    """
+    ocupados = tramos_vendidos(viajes)
+    with transaction.atomic():
+        filas = list(AsientoViaje.objects.select_for_update().filter(viaje__in=viajes).order_by('pk'))
+        for fila in filas:
+            fila.tramos_ocupados = ocupados.get((fila.viaje_id, fila.asiento_id), 0)
+            fila.tramos_retenidos = 0
+            fila.retenido_hasta = None
+            fila.reserva_id = None
+            fila.estado = fila.calcular_estado()
+        AsientoViaje.objects.bulk_update(
+            filas, ['estado', 'tramos_ocupados', 'tramos_retenidos', 'retenido_hasta', 'reserva'], batch_size=500
+        )
+
+
+def reservar_asientos(viaje, pasajes, reserva=None, cliente=None, tramo=None):
+    """
+    Vende varios asientos del viaje en una sola transacción. `pasajes` es una
+    lista de pares (pasajero_id, asiento_id) y todos viajan en `tramo`
+    (TramoRuta; por defecto la ruta completa). Si no se indica `reserva` se
+    crea una para `cliente`. Los asientos se bloquean con SKIP LOCKED, así
+    que una venta concurrente del mismo asiento se informa como conflicto
+    en lugar de esperar. Devuelve la reserva y los pasajes creados.
+    """
+    viaje = viaje if isinstance(viaje, Viaje) else Viaje.objects.get(pk=viaje)
+    tramo = tramo or resolver_tramo(viaje.ruta_id)
+    mascara = tramo.mascara if tramo is not None else MASCARA_VIAJE
+    asientos = [asiento_id for _, asiento_id in pasajes]
+    duplicados = [asiento_id for asiento_id, veces in Counter(asientos).items() if veces > 1]
+    ahora = timezone.now()
+    with transaction.atomic():
+        filas, conflictos = _bloquear(viaje, asientos, skip_locked=True)
+        reserva_id = getattr(reserva, 'pk', reserva)
+        conflictos.update({
+            fila.asiento_id: _motivo(fila, mascara) for fila in filas
+            if not fila.esta_libre(ahora, reserva_id, mascara)
+        })
+        conflictos.update(dict.fromkeys(duplicados, 'Duplicado'))
+        if conflictos:
+            raise AsientoNoDisponible(conflictos)
+
+        if reserva is None:
+            reserva = Reserva.objects.create(cliente=cliente)
+        creados = Pasaje.objects.bulk_create([
+            Pasaje(viaje=viaje, reserva=reserva, pasajero_id=pasajero_id, asiento_id=asiento_id,
+                   origen_id=getattr(tramo, 'origen_id', None), destino_id=getattr(tramo, 'destino_id', None))
+            for pasajero_id, asiento_id in pasajes
+        ])
+        _ocupar(filas, dict.fromkeys(asientos, mascara), reserva.pk, ahora)
+    return reserva, creados
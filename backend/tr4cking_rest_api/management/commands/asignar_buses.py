@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tr4cking_rest_api.asignacion_buses import AsignacionInvalida, aplicar, proponer
+from tr4cking_rest_api.models import Empresa
+
+
+class Command(BaseCommand):
+    help = (
+        'Propone el bus de cada viaje del día con el mínimo de asientos vacíos, usando solo buses '
+        'activos. Sin --aplicar solo muestra la propuesta.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=date.fromisoformat, help='Fecha de los viajes (AAAA-MM-DD), por defecto mañana')
+        parser.add_argument('--empresa', type=int, help='Solo los viajes de esta empresa (id)')
+        parser.add_argument('--aplicar', action='store_true', help='Cambiar los buses, mover los pasajes y rehacer el inventario')
+
+    def handle(self, *args, **options):
+        fecha = options['fecha'] or timezone.localdate() + timedelta(days=1)
+        empresa = None
+        if options['empresa'] is not None:
+            empresa = Empresa.objects.filter(pk=options['empresa']).first()
+            if empresa is None:
+                raise CommandError(f"No existe la empresa {options['empresa']}")
+
+        try:
+            resultado = aplicar(fecha, empresa) if options['aplicar'] else proponer(fecha, empresa)
+        except AsignacionInvalida as e:
+            raise CommandError(str(e))
+
+        for fila in resultado['viajes']:
+            if fila['cambia']:
+                self.stdout.write(
+                    f"Viaje {fila['viaje']} ({fila['ruta']}): {fila['demanda']} vendidos, "
+                    f"{fila['placa_actual']} ({fila['capacidad_actual']}) -> {fila['placa']} ({fila['capacidad']})"
+                )
+            elif fila['motivo']:
+                self.stdout.write(self.style.WARNING(f"Viaje {fila['viaje']} ({fila['ruta']}): {fila['motivo']}"))
+        totales = resultado['totales']
+        self.stdout.write(self.style.SUCCESS(
+            f"{fecha}: {totales['viajes']} viajes, {totales['cambios']} cambios de bus "
+            f"{'aplicados' if options['aplicar'] else 'propuestos'}, asientos vacíos "
+            f"{totales['vacios_actual']} -> {totales['vacios']}"
+        ))
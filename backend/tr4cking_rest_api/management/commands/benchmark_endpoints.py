@@ -0,0 +1,293 @@
+import json
+import logging
+import math
+import time
+from datetime import date, timedelta
+from fnmatch import fnmatch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.fields import SkipField
+from tr4cking_rest_api.models import (
+    Caja, Cliente, Empleado, Pasajero, PuntoExpedicion, TramoRuta, Viaje
+)
+from tr4cking_rest_api.inventario import asientos_disponibles
+from tr4cking_rest_api.urls import router
+
+# Presupuestos por defecto; settings.TR4CKING_BENCHMARK_PRESUPUESTOS o
+# --presupuestos los reemplazan. Cada patrón (fnmatch sobre el nombre del
+# escenario) fija máximos de p50_ms, p95_ms, consultas y/o bytes.
+PRESUPUESTOS = {
+    '*': {'p95_ms': 500, 'consultas': 20},
+    '*:list': {'consultas': 8, 'bytes': 100000},
+    '*:retrieve': {'consultas': 8},
+    'users:create': {'p95_ms': 1500},
+    'reserva:reservar+emitir': {'consultas': 60},
+}
+
+
+class _Revertir(Exception):
+    pass
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano: el menor valor con al menos p% de las mediciones."""
+    ordenados = sorted(valores)
+    return ordenados[max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p95), consultas SQL y tamaño de respuesta de cada endpoint '
+        'del router (list, retrieve, create) y del flujo de venta contra los datos '
+        'cargados (ver populate_db). Guarda los resultados en JSON y falla si se '
+        'supera algún presupuesto o algún endpoint responde 5xx. Nada de lo que '
+        'crea queda guardado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20, help='Mediciones por escenario (más una de calentamiento)')
+        parser.add_argument('--page-size', type=int, default=50, help='Tamaño de página de los listados')
+        parser.add_argument('--endpoint', action='append', default=[],
+                            help='Limitar a estos prefijos del router o "reserva" (se puede repetir)')
+        parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto benchmark-<fecha>.json)')
+        parser.add_argument('--presupuestos', help='JSON {patrón: {p50_ms, p95_ms, consultas, bytes}}')
+        parser.add_argument('--poblar', action='store_true', help='Correr populate_db antes de medir')
+        parser.add_argument('--seed', type=int, default=0, help='Semilla para --poblar')
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1:
+            raise CommandError('--repeticiones debe ser mayor que cero')
+        if options['poblar']:
+            call_command('populate_db', seed=options['seed'], stdout=self.stdout)
+        presupuestos = self._presupuestos(options['presupuestos'])
+        self.repeticiones = options['repeticiones']
+        self.resultados = []
+
+        # Los 4xx/5xx esperables no se registran como errores en cada corrida
+        logger = logging.getLogger('django.request')
+        nivel = logger.level
+        logger.setLevel(logging.CRITICAL)
+        try:
+            # Todo corre en una transacción que se revierte al final y cada
+            # pedido en un savepoint que también se revierte: las mediciones
+            # de escritura no se acumulan ni dejan datos
+            with transaction.atomic():
+                self.client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+                self.client.force_login(get_user_model().objects.create_superuser(
+                    f'benchmark-{time.time_ns()}', 'benchmark@localhost', None
+                ))
+                for prefijo, viewset, basename in router.registry:
+                    if not options['endpoint'] or prefijo in options['endpoint']:
+                        self.medir_endpoint(prefijo, viewset, options['page_size'])
+                if not options['endpoint'] or 'reserva' in options['endpoint']:
+                    self.medir_reserva()
+                raise _Revertir
+        except _Revertir:
+            pass
+        finally:
+            logger.setLevel(nivel)
+
+        fallas = []
+        for resultado in self.resultados:
+            excedidos = self._excedidos(resultado, presupuestos)
+            resultado['excedidos'] = excedidos
+            linea = (
+                f"{resultado['escenario']:<36} {resultado['status']:>3}  p50 {resultado['p50_ms']:>8.1f} ms  "
+                f"p95 {resultado['p95_ms']:>8.1f} ms  {resultado['consultas']:>3} consultas  {resultado['bytes']:>8} B"
+            )
+            if excedidos:
+                fallas.append(resultado['escenario'])
+                self.stdout.write(self.style.ERROR(f"{linea}  excede {', '.join(excedidos)}"))
+            elif resultado['status'] >= 500:
+                # Un error del servidor no es una medición válida: falla igual que un presupuesto
+                fallas.append(resultado['escenario'])
+                self.stdout.write(self.style.ERROR(f'{linea}  {resultado.get("detalle", "")}'[:200]))
+            elif resultado['status'] >= 400:
+                self.stdout.write(self.style.WARNING(f'{linea}  {resultado.get("detalle", "")}'[:200]))
+            else:
+                self.stdout.write(linea)
+
+        salida = options['salida'] or f'benchmark-{timezone.now():%Y%m%d-%H%M%S}.json'
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            json.dump({
+                'fecha': timezone.now().isoformat(),
+                'base_de_datos': connection.vendor,
+                'repeticiones': self.repeticiones,
+                'page_size': options['page_size'],
+                'presupuestos': presupuestos,
+                'resultados': self.resultados,
+            }, archivo, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Resultados guardados en {salida}')
+
+        if fallas:
+            raise CommandError(f'Presupuesto excedido o error del servidor en: {", ".join(fallas)}')
+        self.stdout.write(self.style.SUCCESS(f'{len(self.resultados)} escenarios dentro del presupuesto'))
+
+    # -----------------------------------------------
+    # Medición
+    # -----------------------------------------------
+    def medir(self, escenario, pedido):
+        """
+        Corre `pedido()` (devuelve la respuesta) una vez para calentar y
+        `repeticiones` veces midiendo; cada corrida se deshace.
+        """
+        tiempos, consultas = [], 0
+        for corrida in range(self.repeticiones + 1):
+            with CaptureQueriesContext(connection) as capturadas:
+                try:
+                    with transaction.atomic():
+                        inicio = time.perf_counter()
+                        response = pedido()
+                        transcurrido = (time.perf_counter() - inicio) * 1000
+                        raise _Revertir
+                except _Revertir:
+                    pass
+            if corrida:
+                tiempos.append(transcurrido)
+                consultas = max(consultas, len(capturadas))
+        resultado = {
+            'escenario': escenario,
+            'metodo': response.request['REQUEST_METHOD'],
+            'url': response.request['PATH_INFO'],
+            'status': response.status_code,
+            'p50_ms': round(_percentil(tiempos, 50), 2),
+            'p95_ms': round(_percentil(tiempos, 95), 2),
+            'consultas': consultas,
+            'bytes': len(response.content),
+        }
+        if response.status_code >= 400:
+            resultado['detalle'] = response.content[:300].decode(errors='replace')
+        self.resultados.append(resultado)
+        return response
+
+    def medir_endpoint(self, prefijo, viewset, page_size):
+        url = f'/api/{prefijo}/'
+        listado = self.medir(f'{prefijo}:list', lambda: self.client.get(url, {'page_size': page_size}))
+
+        model = viewset.queryset.model
+        muestra = model._default_manager.order_by('-pk').first()
+        if muestra is None:
+            self.stdout.write(self.style.WARNING(f'{url} sin datos: se omiten retrieve y create'))
+            return
+        detalle = self.medir(f'{prefijo}:retrieve', lambda: self.client.get(f'{url}{muestra.pk}/'))
+        if listado.status_code >= 400 or detalle.status_code >= 400:
+            return
+
+        datos = self._datos_creacion(viewset, muestra)
+        self.medir(
+            f'{prefijo}:create',
+            lambda: self.client.post(url, json.dumps(datos, default=str), content_type='application/json'),
+        )
+
+    def _datos_creacion(self, viewset, muestra):
+        """Los campos escribibles de una fila existente, con sus campos únicos cambiados."""
+        model = type(muestra)
+        datos = {}
+        for nombre, campo in viewset.serializer_class().fields.items():
+            if campo.read_only:
+                continue
+            try:
+                valor = campo.get_attribute(muestra)
+            except (AttributeError, KeyError, ObjectDoesNotExist, SkipField):
+                continue
+            if valor is not None:
+                datos[nombre] = campo.to_representation(valor)
+        unicos = [[campo.name] for campo in model._meta.concrete_fields if campo.unique]
+        unicos += [list(grupo) for grupo in model._meta.unique_together]
+        for grupo in unicos:
+            for nombre in grupo:
+                campo = model._meta.get_field(nombre)
+                clave = campo.attname if campo.attname in datos else nombre
+                if clave not in datos or campo.is_relation:
+                    continue
+                if isinstance(campo, models.DateField):
+                    datos[clave] = str(date.fromisoformat(str(datos[clave])[:10]) + timedelta(days=3650))
+                elif isinstance(campo, models.IntegerField):
+                    datos[clave] = int(datos[clave]) + 10 ** 8
+                elif isinstance(campo, (models.CharField, models.TextField)):
+                    largo = campo.max_length or 100
+                    datos[clave] = f'{str(datos[clave])[:largo - 3]}-bm'
+                else:
+                    continue
+                break
+        return datos
+
+    def medir_reserva(self):
+        """Flujo de venta: búsqueda, mapa de asientos, retención, reserva y factura."""
+        viaje = Viaje.objects.filter(fecha__gt=timezone.localdate(), activo=True).order_by('fecha', 'pk').first()
+        tramo = viaje and TramoRuta.objects.filter(ruta_id=viaje.ruta_id).order_by('-cantidad_paradas').first()
+        libres = list(asientos_disponibles(viaje).values_list('asiento_id', flat=True)[:2]) if viaje else []
+        pasajero, cliente = Pasajero.objects.order_by('pk').first(), Cliente.objects.order_by('pk').first()
+        empleado = Empleado.objects.order_by('pk').first()
+        punto = tramo and PuntoExpedicion.objects.filter(parada_id=tramo.origen_id, activo=True).first()
+        if not (viaje and tramo and len(libres) == 2 and pasajero and cliente and empleado):
+            self.stdout.write(self.style.WARNING('Sin un viaje futuro con asientos libres y clientes: se omite el flujo de venta'))
+            return
+        caja = Caja.objects.create(nombre=f'benchmark-{time.time_ns()}', estado='Abierta',
+                                   fecha_creacion=timezone.localdate(), monto_inicial=0)
+
+        base = f'/api/viajes/{viaje.pk}/'
+        self.medir('reserva:buscar', lambda: self.client.get('/api/viajes/buscar/', {
+            'origen': tramo.origen_id, 'destino': tramo.destino_id, 'fecha': viaje.fecha.isoformat()
+        }))
+        self.medir('reserva:asientos', lambda: self.client.get(f'{base}asientos/', {
+            'origen': tramo.origen_id, 'destino': tramo.destino_id
+        }))
+
+        def retener():
+            reserva = self.client.post('/api/reservas/', {'cliente': cliente.pk}, content_type='application/json')
+            return self.client.post(f'{base}retener/', {
+                'asientos': libres, 'reserva': reserva.json().get('id_reserva'),
+                'origen': tramo.origen_id, 'destino': tramo.destino_id,
+            }, content_type='application/json')
+        self.medir('reserva:retener', retener)
+
+        def reservar():
+            return self.client.post(f'{base}reservar/', {
+                'cliente': cliente.pk, 'origen': tramo.origen_id, 'destino': tramo.destino_id,
+                'pasajes': [{'pasajero': pasajero.pk, 'asiento': asiento} for asiento in libres],
+            }, content_type='application/json')
+        self.medir('reserva:reservar', reservar)
+
+        if punto is None:
+            self.stdout.write(self.style.WARNING('Sin punto de expedición en el origen: se omite la factura'))
+            return
+
+        def emitir():
+            venta = reservar().json()
+            return self.client.post('/api/facturas/emitir/', {
+                'empleado': empleado.pk, 'parada': tramo.origen_id, 'cliente': cliente.pk, 'caja': caja.pk,
+                'timbrado': punto.timbrado_id, 'pasajes': [pasaje['id_pasaje'] for pasaje in venta['pasajes']],
+            }, content_type='application/json')
+        self.medir('reserva:reservar+emitir', emitir)
+
+    # -----------------------------------------------
+    # Presupuestos
+    # -----------------------------------------------
+    def _presupuestos(self, archivo):
+        if not archivo:
+            return getattr(settings, 'TR4CKING_BENCHMARK_PRESUPUESTOS', PRESUPUESTOS)
+        try:
+            with open(archivo, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo leer {archivo}: {e}')
+
+    def _excedidos(self, resultado, presupuestos):
+        limites = {}
+        for patron, valores in presupuestos.items():
+            if fnmatch(resultado['escenario'], patron):
+                limites.update(valores)  # El patrón más específico va después
+        return [
+            f'{metrica} {resultado[metrica]} > {maximo}'
+            for metrica, maximo in limites.items()
+            if metrica in resultado and resultado[metrica] > maximo
+        ]
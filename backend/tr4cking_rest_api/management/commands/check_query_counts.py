@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from tr4cking_rest_api.urls import router
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica que cada endpoint de listado haga la misma cantidad de consultas '
+        'SQL sin importar cuántas filas devuelve (detecta N+1)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=20,
+                            help='Tamaño de página a comparar contra una página de 1 fila')
+        parser.add_argument('--endpoint', action='append', default=[],
+                            help='Limitar a estos prefijos del router (se puede repetir)')
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST='localhost')
+        fallas = []
+
+        for prefijo, viewset, basename in router.registry:
+            if options['endpoint'] and prefijo not in options['endpoint']:
+                continue
+            url = f'/api/{prefijo}/'
+            # Primero la respuesta completa (todos los bloques anidados y sus
+            # precargas) y después sin los bloques, que usa otro plan
+            variantes, anidados = [{}], None
+            while variantes:
+                extra = variantes.pop(0)
+                conteos, filas = [], []
+                for page_size in (1, options['filas']):
+                    with CaptureQueriesContext(connection) as consultas:
+                        response = client.get(url, {'page_size': page_size, **extra})
+                    if response.status_code != 200:
+                        raise CommandError(f'{url} respondió {response.status_code}')
+                    data = response.json()
+                    data = data['results'] if isinstance(data, dict) else data
+                    filas.append(len(data))
+                    conteos.append(len(consultas))
+                if anidados is None:
+                    anidados = sorted({
+                        nombre for fila in data for nombre, valor in fila.items()
+                        if isinstance(valor, dict) or (isinstance(valor, list) and valor and isinstance(valor[0], dict))
+                    })
+                    if anidados:
+                        variantes.append({'omit': ','.join(anidados)})
+
+                destino = f'{url}?omit=...' if extra else url
+                linea = f'{destino:<40} consultas {conteos[0]:>3} -> {conteos[1]:>3}  (filas {filas[0]} -> {filas[1]})'
+                if conteos[0] != conteos[1]:
+                    fallas.append(destino)
+                    self.stdout.write(self.style.ERROR(linea))
+                elif filas[1] <= 1:
+                    self.stdout.write(self.style.WARNING(f'{linea}  sin datos suficientes'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(linea))
+
+        if fallas:
+            raise CommandError(f'Consultas por fila (N+1) en: {", ".join(fallas)}')
+        self.stdout.write(self.style.SUCCESS('Cantidad de consultas constante en todos los listados'))
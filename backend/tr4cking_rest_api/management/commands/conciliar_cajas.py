@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tr4cking_rest_api.cajas import conciliar
+from tr4cking_rest_api.models import CabeceraCaja
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica el saldo corriente de cada sesión de caja contra la suma de sus '
+        'movimientos y corrige las que no coinciden. Pensado para correr cada noche '
+        '(cron); sin fechas revisa las sesiones abiertas ayer y hoy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat, help='Fecha inicial de apertura (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Fecha final de apertura (AAAA-MM-DD), por defecto hoy')
+
+    def handle(self, *args, **options):
+        hasta = options['hasta'] or timezone.localdate()
+        desde = options['desde'] or hasta - timedelta(days=1)
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        corregidas = conciliar(CabeceraCaja.objects.filter(fecha_mov__date__range=(desde, hasta)))
+        for sesion, anterior in corregidas:
+            self.stdout.write(self.style.WARNING(
+                f'{sesion} ({sesion.fecha_mov:%Y-%m-%d %H:%M}): saldo {anterior} corregido a {sesion.monto_final}'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Cajas conciliadas del {desde} al {hasta} ({len(corregidas)} sesiones corregidas)'
+        ))
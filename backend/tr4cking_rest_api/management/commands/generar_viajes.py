@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tr4cking_rest_api.horarios import LOTE, generar_viajes
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea los viajes de los horarios activos para un período, con su inventario de asientos. '
+        'Se puede correr las veces que haga falta (cron): los viajes que ya existen se saltean.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat, help='Fecha inicial (AAAA-MM-DD), por defecto hoy')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument('--dias', type=int, default=90, help='Días a generar si no se indica --hasta (por defecto 90)')
+        parser.add_argument('--horario', type=int, action='append', help='Solo este horario (id); se puede repetir')
+        parser.add_argument('--lote', type=int, default=LOTE, help=f'Filas por INSERT (por defecto {LOTE})')
+
+    def handle(self, *args, **options):
+        desde = options['desde'] or timezone.localdate()
+        hasta = options['hasta'] or desde + timedelta(days=options['dias'] - 1)
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero')
+
+        def progreso(fecha, resultado):
+            self.stdout.write(f'Hasta {fecha}: {resultado.viajes_creados} viajes creados...')
+
+        resultado = generar_viajes(desde, hasta, horarios=options['horario'], lote=options['lote'], progreso=progreso)
+
+        for horario, fecha in resultado.sin_bus[:50]:
+            self.stdout.write(self.style.WARNING(f'Horario {horario}, {fecha}: sin bus activo libre'))
+        if len(resultado.sin_bus) > 50:
+            self.stdout.write(self.style.WARNING(f'... y {len(resultado.sin_bus) - 50} salidas más sin bus'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Del {desde} al {hasta}: {resultado.viajes_creados} viajes creados, '
+            f'{resultado.viajes_existentes} ya existían, {resultado.asientos_creados} asientos de inventario, '
+            f'{len(resultado.sin_bus)} salidas sin bus'
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from tr4cking_rest_api.importacion import LOTE, ArchivoInvalido, importar_personas, leer_filas
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa personas desde un CSV o XLSX (cedula, nombre, apellido, telefono, direccion '
+        'y opcionales razon_social, dv, cliente, pasajero), actualizando las que ya existen.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--clientes', action='store_true', help='Crear el cliente de cada persona importada')
+        parser.add_argument('--pasajeros', action='store_true', help='Crear el pasajero de cada persona importada')
+        parser.add_argument('--lote', type=int, default=LOTE, help=f'Filas por transacción (por defecto {LOTE})')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero')
+
+        def progreso(resultado):
+            self.stdout.write(f"{resultado.filas} filas procesadas...")
+
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_personas(
+                    leer_filas(archivo, options['archivo']),
+                    clientes=options['clientes'], pasajeros=options['pasajeros'],
+                    lote=options['lote'], progreso=progreso,
+                )
+        except (OSError, ArchivoInvalido) as e:
+            raise CommandError(str(e))
+
+        for fila, error in resultado.errores:
+            self.stdout.write(self.style.WARNING(f'Fila {fila}: {error}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.filas} filas: {resultado.personas_creadas} personas creadas, '
+            f'{resultado.personas_actualizadas} actualizadas, {resultado.clientes_creados} clientes y '
+            f'{resultado.pasajeros_creados} pasajeros creados, {len(resultado.errores)} con errores'
+        ))
@@ -1,201 +1,363 @@
-from django.core.management.base import BaseCommand
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from tr4cking_rest_api.models import (
-    Persona, Cliente, Localidad, Parada, 
-    Empresa, Bus, Viaje, Ruta, DetalleRuta
+    Persona, Cliente, Pasajero, Localidad, Parada, Empresa, Empleado, Bus, Asiento, Viaje, Ruta,
+    DetalleRuta, TramoRuta, AsientoViaje, Pasaje, Encomienda, EventoEncomienda, Timbrado, PuntoExpedicion,
+    CabeceraFactura, DetalleFactura, ALFABETO_SEGUIMIENTO
 )
-from django.contrib.auth.models import Group
-from datetime import date, timedelta
+from tr4cking_rest_api.asientos import sincronizar_asientos
+from tr4cking_rest_api.cache_catalogos import invalidar
+from tr4cking_rest_api.facturacion import tarifas_pasajes, totales
+from tr4cking_rest_api.numeracion import formatear
+from tr4cking_rest_api.tramos import reconstruir_tramos
+from tr4cking_rest_api import ventas_diarias
+
+LOCALIDADES = [
+    ('Asunción', -25.2867), ('Ciudad del Este', -25.5167), ('Encarnación', -27.3333),
+    ('Coronel Oviedo', -25.4444), ('Villarrica', -25.7500), ('Concepción', -23.4064),
+    ('Pedro Juan Caballero', -22.5472), ('Caaguazú', -25.4667), ('Pilar', -26.8667),
+    ('San Juan Bautista', -26.6694), ('Caacupé', -25.3861), ('Paraguarí', -25.6333),
+    ('Salto del Guairá', -24.0500), ('Filadelfia', -22.3500), ('San Pedro', -24.0917),
+]
+NOMBRES = ['Juan', 'María', 'Carlos', 'Ana', 'Luis', 'Rosa', 'Pedro', 'Lucía', 'Jorge', 'Carmen', 'Diego', 'Laura']
+APELLIDOS = ['Pérez', 'González', 'López', 'Benítez', 'Martínez', 'Giménez', 'Ramírez', 'Vera', 'Duarte', 'Acosta']
+MARCAS = [('Mercedes Benz', 'O500'), ('Scania', 'K410'), ('Volvo', 'B420R'), ('Marcopolo', 'G7')]
+
+# Los pasajes vendidos de viajes ya realizados se facturan
+ESTADO_FACTURA = 'Emitida'
+
 
 class Command(BaseCommand):
-    help = 'Populate database with sample data'
-
-    def handle(self, *args, **kwargs):
-        self.stdout.write('Creando datos de prueba...')
-
-        # Crear empresas
-        empresas_data = [
-            {
-                'nombre': 'NSA Transportes',
-                'ruc': '8000123-0',
-                'telefono': '021555123',
-                'email': 'nsa@example.com',
-                'direccion_legal': 'Avda. Artigas 1234'
-            },
-            {
-                'nombre': 'Nuestra Señora de la Asunción',
-                'ruc': '8000456-0',
-                'telefono': '021555456',
-                'email': 'nsa2@example.com',
-                'direccion_legal': 'Avda. Mcal. López 2345'
-            },
-        ]
-        empresas = []
-        for data in empresas_data:
-            empresa, created = Empresa.objects.get_or_create(
-                ruc=data['ruc'],
-                defaults=data
-            )
-            empresas.append(empresa)
-        self.stdout.write(self.style.SUCCESS(f'Creadas {len(empresas)} empresas'))
-
-        # Crear localidades
-        localidades_data = [
-            {'nombre': 'Asunción', 'coordenadas': -25.2867},
-            {'nombre': 'Ciudad del Este', 'coordenadas': -25.5167},
-            {'nombre': 'Encarnación', 'coordenadas': -27.3333},
-            {'nombre': 'Coronel Oviedo', 'coordenadas': -25.4444},
-            {'nombre': 'Villarrica', 'coordenadas': -25.7500},
-        ]
-        localidades = []
-        for data in localidades_data:
-            localidad, created = Localidad.objects.get_or_create(
-                nombre=data['nombre'],
-                defaults=data
-            )
-            localidades.append(localidad)
-        self.stdout.write(self.style.SUCCESS(f'Creadas {len(localidades)} localidades'))
-
-        # Crear paradas para cada localidad
-        paradas = []
-        for localidad in localidades:
-            paradas_localidad = [
-                {
-                    'localidad': localidad,
-                    'nombre': f'Terminal de Ómnibus {localidad.nombre}',
-                    'direccion': f'Terminal {localidad.nombre}',
-                    'coordenadas': localidad.coordenadas
-                },
-                {
-                    'localidad': localidad,
-                    'nombre': f'Parada Centro {localidad.nombre}',
-                    'direccion': f'Centro {localidad.nombre}',
-                    'coordenadas': localidad.coordenadas + 0.01
-                }
-            ]
-            for data in paradas_localidad:
-                parada, created = Parada.objects.get_or_create(
-                    nombre=data['nombre'],
-                    localidad=data['localidad'],
-                    defaults=data
-                )
-                paradas.append(parada)
-        self.stdout.write(self.style.SUCCESS(f'Creadas {len(paradas)} paradas'))
-
-        # Crear buses para cada empresa
-        buses = []
-        placas_base = ['ABC', 'XYZ', 'DEF']
-        for i, empresa in enumerate(empresas):
-            for j in range(3):
-                placa = f'{placas_base[i]}{j+1}23'
-                bus_data = {
-                    'placa': placa,
-                    'marca': 'Mercedes Benz',
-                    'modelo': f'O50{j}',
-                    'capacidad': 40,
-                    'estado': 'Activo',
-                    'empresa': empresa
-                }
-                bus, created = Bus.objects.get_or_create(
-                    placa=placa,
-                    defaults=bus_data
+    help = (
+        'Genera datos de prueba con bulk_create por lotes. Sin opciones crea un set chico; '
+        'con --dias y --pasajes-por-viaje grandes sirve para medir consultas y endpoints '
+        'con volúmenes de producción. La misma --seed genera siempre los mismos datos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresas', type=int, default=2)
+        parser.add_argument('--buses', type=int, default=3, help='Buses por empresa; cada bus hace un viaje por día')
+        parser.add_argument('--rutas', type=int, default=3)
+        parser.add_argument('--dias', type=int, default=3, help='Días de historia hasta hoy, con pasajes facturados')
+        parser.add_argument('--dias-futuros', type=int, default=7, help='Días de viajes programados desde mañana')
+        parser.add_argument('--pasajes-por-viaje', type=int, default=10)
+        parser.add_argument('--encomiendas-por-viaje', type=int, default=1)
+        parser.add_argument('--personas', type=int, default=500, help='Personas (cliente y pasajero) del padrón')
+        parser.add_argument('--capacidad', type=int, default=40)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por INSERT')
+
+    def handle(self, *args, **options):
+        for opcion in ('empresas', 'buses', 'rutas', 'personas', 'capacidad', 'lote'):
+            if options[opcion] < 1:
+                raise CommandError(f'--{opcion.replace("_", "-")} debe ser mayor que cero')
+        self.azar = random.Random(options['seed'])
+        self.seed = options['seed']
+        self.lote = options['lote']
+        if Timbrado.objects.filter(numero_timbrado=self._timbrado()).exists():
+            raise CommandError(f'Ya hay datos generados con --seed {self.seed}; use otra semilla')
+
+        inicio = timezone.now()
+        hoy = timezone.localdate()
+        desde, hasta = hoy - timedelta(days=options['dias'] - 1), hoy + timedelta(days=options['dias_futuros'])
+
+        with transaction.atomic():
+            paradas = self.crear_paradas()
+            empresas, empleados = self.crear_empresas(options['empresas'])
+            buses = self.crear_buses(empresas, options['buses'], options['capacidad'])
+            rutas = self.crear_rutas(paradas, options['rutas'])
+            clientes, pasajeros = self.crear_personas(options['personas'])
+            puntos = self.crear_puntos(paradas, desde, hasta)
+
+        self.asientos = {
+            bus_id: list(Asiento.objects.filter(bus_id=bus_id).order_by('numero_asiento'))
+            for bus_id in (bus.pk for bus in buses)
+        }
+        self.tramos = {ruta.pk: list(TramoRuta.objects.filter(ruta=ruta).order_by('pk')) for ruta in rutas}
+        self.clientes_por_cedula = {cliente.cedula_id: cliente for cliente in clientes}
+        totales_generados = dict.fromkeys(('viajes', 'pasajes', 'facturas', 'encomiendas'), 0)
+        dia = desde
+        while dia <= hasta:
+            # Un día por transacción: el avance queda guardado y los locks duran poco
+            with transaction.atomic():
+                generado = self.generar_dia(
+                    dia, hoy, buses, rutas, clientes, pasajeros, empleados, puntos,
+                    options['pasajes_por_viaje'], options['encomiendas_por_viaje'],
                 )
-                buses.append(bus)
-        self.stdout.write(self.style.SUCCESS(f'Creados {len(buses)} buses'))
-
-        # Crear personas y clientes
-        personas_data = [
-            {'cedula': 1234567, 'nombre': 'Juan', 'apellido': 'Pérez', 'telefono': '0991234567', 'direccion': 'Calle 1'},
-            {'cedula': 2345678, 'nombre': 'María', 'apellido': 'González', 'telefono': '0992345678', 'direccion': 'Calle 2'},
-            {'cedula': 3456789, 'nombre': 'Carlos', 'apellido': 'López', 'telefono': '0993456789', 'direccion': 'Calle 3'},
-        ]
-        
-        for data in personas_data:
-            persona, created = Persona.objects.get_or_create(
-                cedula=data['cedula'],
-                defaults=data
+            for clave, cantidad in generado.items():
+                totales_generados[clave] += cantidad
+            if dia.day == 1 or dia == hasta:
+                self.stdout.write(f'{dia}: {totales_generados}')
+            dia += timedelta(days=1)
+        # Las encomiendas de los viajes futuros se registran hoy
+        ventas_diarias.recalcular(hoy, hoy)
+
+        PuntoExpedicion.objects.bulk_update(puntos.values(), ['numero_actual'])
+        # bulk_create no dispara las señales que invalidan el cache de catálogos
+        for modelo in (Empresa, Localidad, Parada, Ruta, DetalleRuta):
+            invalidar(modelo)
+
+        segundos = (timezone.now() - inicio).total_seconds()
+        self.stdout.write(self.style.SUCCESS(
+            f'Base de datos poblada en {segundos:.0f} s: {len(empresas)} empresas, {len(buses)} buses, '
+            f'{len(rutas)} rutas, {totales_generados["viajes"]} viajes, {totales_generados["pasajes"]} pasajes, '
+            f'{totales_generados["facturas"]} facturas y {totales_generados["encomiendas"]} encomiendas'
+        ))
+
+    # -----------------------------------------------
+    # Catálogos
+    # -----------------------------------------------
+    def _timbrado(self):
+        return f'9{self.seed:07d}'
+
+    def crear_paradas(self):
+        existentes = {localidad.nombre: localidad for localidad in Localidad.objects.filter(
+            nombre__in=[nombre for nombre, _ in LOCALIDADES]
+        )}
+        Localidad.objects.bulk_create([
+            Localidad(nombre=nombre, coordenadas=coordenadas)
+            for nombre, coordenadas in LOCALIDADES if nombre not in existentes
+        ])
+        localidades = Localidad.objects.filter(nombre__in=[nombre for nombre, _ in LOCALIDADES])
+
+        terminales = {parada.localidad_id: parada for parada in Parada.objects.filter(
+            localidad__in=localidades, nombre__startswith='Terminal de Ómnibus'
+        )}
+        Parada.objects.bulk_create([
+            Parada(
+                localidad=localidad, nombre=f'Terminal de Ómnibus {localidad.nombre}',
+                direccion=f'Terminal {localidad.nombre}', coordenadas=localidad.coordenadas,
+            )
+            for localidad in localidades if localidad.pk not in terminales
+        ])
+        paradas = list(Parada.objects.filter(
+            localidad__in=localidades, nombre__startswith='Terminal de Ómnibus'
+        ).select_related('localidad').order_by('pk'))
+        self.stdout.write(self.style.SUCCESS(f'{len(paradas)} paradas'))
+        return paradas
+
+    def crear_empresas(self, cantidad):
+        empresas = Empresa.objects.bulk_create([
+            Empresa(
+                nombre=f'Transportes {self.azar.choice(APELLIDOS)} {self.seed}-{i}', ruc=f'8{self.seed:03d}{i:04d}-{i % 10}',
+                telefono=f'021{self.azar.randint(100000, 999999)}', direccion_legal=f'Avda. Artigas {i + 1}',
             )
-            # Crear cliente para cada persona
-            cliente_data = {
-                'cedula': persona,
-                'razon_social': f"{persona.nombre} {persona.apellido}",
-                'dv': str(persona.cedula)[-1]
-            }
-            cliente, created = Cliente.objects.get_or_create(
-                cedula=persona,
-                defaults=cliente_data
+            for i in range(1, cantidad + 1)
+        ], batch_size=self.lote)
+        personas = Persona.objects.bulk_create([
+            Persona(
+                cedula=self._cedula(-empresa_indice), nombre=self.azar.choice(NOMBRES),
+                apellido=self.azar.choice(APELLIDOS), telefono='0981000000', direccion='Oficina central',
             )
-        self.stdout.write(self.style.SUCCESS(f'Creadas {len(personas_data)} personas con sus clientes'))
-
-        # Crear rutas
-        rutas_data = [
-            {
-                'nombre': 'Asunción - Ciudad del Este',
-                'activo': True
-            },
-            {
-                'nombre': 'Asunción - Encarnación',
-                'activo': True
-            },
-            {
-                'nombre': 'Ciudad del Este - Encarnación',
-                'activo': True
-            }
-        ]
-        rutas = []
-        for data in rutas_data:
-            ruta, created = Ruta.objects.get_or_create(
-                nombre=data['nombre'],
-                defaults=data
+            for empresa_indice in range(1, cantidad + 1)
+        ], batch_size=self.lote)
+        empleados = Empleado.objects.bulk_create([
+            Empleado(cedula=persona, empresa=empresa, cargo='Cajero', fecha_ingreso=timezone.localdate())
+            for empresa, persona in zip(empresas, personas)
+        ], batch_size=self.lote)
+        self.stdout.write(self.style.SUCCESS(f'{len(empresas)} empresas'))
+        return empresas, {empleado.empresa_id: empleado for empleado in empleados}
+
+    def crear_buses(self, empresas, por_empresa, capacidad):
+        buses = Bus.objects.bulk_create([
+            Bus(
+                placa=f'S{self.seed}E{empresa.pk}B{i:04d}', marca=marca, modelo=modelo,
+                capacidad=capacidad, estado='Activo', empresa=empresa,
             )
-            rutas.append(ruta)
+            for empresa in empresas
+            for i, (marca, modelo) in enumerate(self.azar.choice(MARCAS) for _ in range(por_empresa))
+        ], batch_size=self.lote)
+        # Sin señal post_save: los asientos se generan aparte (aún no hay viajes)
+        for bus in buses:
+            sincronizar_asientos(bus)
+        self.stdout.write(self.style.SUCCESS(f'{len(buses)} buses con {capacidad} asientos'))
+        return buses
 
-        # Crear detalles de ruta
+    def crear_rutas(self, paradas, cantidad):
+        usados = set(Ruta.objects.values_list('nombre', flat=True))
+        rutas, recorridos = [], []
+        for _ in range(cantidad):
+            recorrido = self.azar.sample(paradas, self.azar.randint(2, min(6, len(paradas))))
+            base = f'{recorrido[0].localidad.nombre} - {recorrido[-1].localidad.nombre}'
+            nombre, numero = base, 1
+            while nombre in usados:
+                numero += 1
+                nombre = f'{base} {numero}'
+            usados.add(nombre)
+            rutas.append(Ruta(nombre=nombre, precio_base=Decimal(40000 * (len(recorrido) - 1) + 10000 * self.azar.randint(0, 5))))
+            recorridos.append(recorrido)
+        rutas = Ruta.objects.bulk_create(rutas, batch_size=self.lote)
+
+        detalles = []
+        for ruta, recorrido in zip(rutas, recorridos):
+            hora = self.azar.randint(5, 23 - 2 * len(recorrido))
+            for orden, parada in enumerate(recorrido, start=1):
+                detalles.append(DetalleRuta(ruta=ruta, parada=parada, orden=orden, hora_salida=time(hora, 0)))
+                hora += 2
+        DetalleRuta.objects.bulk_create(detalles, batch_size=self.lote)
+        # Sin señales de DetalleRuta: los tramos se materializan a mano
         for ruta in rutas:
-            # Obtener paradas según la ruta
-            origen, destino = ruta.nombre.split(' - ')
-            parada_origen = Parada.objects.filter(localidad__nombre=origen).first()
-            parada_destino = Parada.objects.filter(localidad__nombre=destino).first()
-            
-            if parada_origen and parada_destino:
-                # Crear detalle ruta origen
-                DetalleRuta.objects.get_or_create(
-                    ruta=ruta,
-                    parada=parada_origen,
-                    defaults={
-                        'orden': 1,
-                        'hora_salida': '08:00'
-                    }
-                )
-                # Crear detalle ruta destino
-                DetalleRuta.objects.get_or_create(
-                    ruta=ruta,
-                    parada=parada_destino,
-                    defaults={
-                        'orden': 2,
-                        'hora_salida': '12:00'
-                    }
+            reconstruir_tramos(ruta.pk)
+        self.stdout.write(self.style.SUCCESS(f'{len(rutas)} rutas con sus tramos'))
+        return rutas
+
+    def _cedula(self, i):
+        # Rango propio de cada semilla para no chocar con datos reales ni con otras semillas
+        return 90_000_000_000 + self.seed * 100_000_000 + 1_000_000 + i
+
+    def crear_personas(self, cantidad):
+        personas = [
+            Persona(
+                cedula=self._cedula(i), nombre=self.azar.choice(NOMBRES), apellido=self.azar.choice(APELLIDOS),
+                telefono=f'09{self.azar.randint(71, 99)}{self.azar.randint(100000, 999999)}', direccion=f'Calle {i}',
+            )
+            for i in range(1, cantidad + 1)
+        ]
+        Persona.objects.bulk_create(personas, batch_size=self.lote)
+        clientes = Cliente.objects.bulk_create([
+            Cliente(cedula=persona, razon_social=f'{persona.nombre} {persona.apellido}', dv=str(persona.cedula)[-1])
+            for persona in personas
+        ], batch_size=self.lote)
+        pasajeros = Pasajero.objects.bulk_create([Pasajero(cedula=persona) for persona in personas], batch_size=self.lote)
+        self.stdout.write(self.style.SUCCESS(f'{len(personas)} personas con sus clientes y pasajeros'))
+        return clientes, pasajeros
+
+    def crear_puntos(self, paradas, desde, hasta):
+        timbrado = Timbrado.objects.create(
+            numero_timbrado=self._timbrado(), fecha_inicio=desde, fecha_fin=hasta + timedelta(days=365),
+        )
+        puntos = PuntoExpedicion.objects.bulk_create([
+            PuntoExpedicion(timbrado=timbrado, parada=parada, establecimiento=f'{i:03d}', punto_expedicion='001')
+            for i, parada in enumerate(paradas, start=1)
+        ])
+        return {punto.parada_id: punto for punto in puntos}
+
+    # -----------------------------------------------
+    # Movimiento diario
+    # -----------------------------------------------
+    def generar_dia(self, dia, hoy, buses, rutas, clientes, pasajeros, empleados, puntos,
+                    pasajes_por_viaje, encomiendas_por_viaje):
+        # Cada bus hace un viaje por día (único por bus y fecha)
+        viajes = Viaje.objects.bulk_create([
+            Viaje(bus=bus, ruta=rutas[(i + dia.toordinal()) % len(rutas)], fecha=dia)
+            for i, bus in enumerate(buses)
+        ], batch_size=self.lote)
+
+        pasajes, inventario = [], []
+        for viaje in viajes:
+            asientos = self.asientos[viaje.bus_id]
+            ocupacion = {}
+            for asiento in self.azar.sample(asientos, min(pasajes_por_viaje, len(asientos))):
+                tramo = self._tramo(viaje.ruta_id)
+                ocupacion[asiento.pk] = tramo.mascara
+                pasajes.append(Pasaje(
+                    viaje=viaje, asiento=asiento, pasajero=self.azar.choice(pasajeros),
+                    origen_id=tramo.origen_id, destino_id=tramo.destino_id,
+                ))
+            # Inventario con la ocupación ya calculada, sin pasar por la señal de Pasaje
+            inventario.extend(
+                AsientoViaje(
+                    viaje=viaje, asiento=asiento, tramos_ocupados=ocupacion.get(asiento.pk, 0),
+                    estado='Ocupado' if asiento.pk in ocupacion else 'Disponible',
                 )
+                for asiento in asientos
+            )
+        AsientoViaje.objects.bulk_create(inventario, batch_size=self.lote)
+        Pasaje.objects.bulk_create(pasajes, batch_size=self.lote)
+
+        encomiendas = Encomienda.objects.bulk_create([
+            self._encomienda(viaje, clientes)
+            for viaje in viajes for _ in range(encomiendas_por_viaje)
+        ], batch_size=self.lote)
+        momento = timezone.make_aware(datetime.combine(min(dia, hoy), time(12)))
+        Encomienda.objects.filter(pk__in=[encomienda.pk for encomienda in encomiendas]).update(
+            fecha_creacion=momento, fecha_actualizacion=momento
+        )
+        self.seguir(dia, hoy, encomiendas, momento)
+
+        facturas = self.facturar(dia, pasajes, empleados, puntos) if dia <= hoy else 0
+        if dia < hoy:
+            # Sin señales de DetalleFactura/Encomienda: el resumen del día se rehace entero
+            ventas_diarias.recalcular(dia, dia)
+        return {'viajes': len(viajes), 'pasajes': len(pasajes), 'facturas': facturas, 'encomiendas': len(encomiendas)}
+
+    def _tramo(self, ruta_id):
+        # La mayoría viaja de punta a punta
+        tramos = self.tramos[ruta_id]
+        if self.azar.random() < 0.6:
+            return max(tramos, key=lambda tramo: tramo.cantidad_paradas)
+        return self.azar.choice(tramos)
 
-        self.stdout.write(self.style.SUCCESS(f'Creadas {len(rutas)} rutas con sus detalles'))
-
-        # Modificar la creación de viajes para incluir rutas
-        fecha_base = date.today()
-        for ruta in rutas[:2]:  # Solo las primeras dos rutas
-            for bus in buses[:2]:  # Los primeros dos buses
-                for i in range(3):  # 3 viajes por combinación ruta-bus
-                    fecha_viaje = fecha_base + timedelta(days=i)
-                    viaje_data = {
-                        'bus': bus,
-                        'ruta': ruta,  # Agregamos la ruta al viaje
-                        'fecha': fecha_viaje
-                    }
-                    viaje, created = Viaje.objects.get_or_create(
-                        bus=bus,
-                        ruta=ruta,
-                        fecha=fecha_viaje,
-                        defaults=viaje_data
-                    )
-
-        self.stdout.write(self.style.SUCCESS('Viajes creados exitosamente'))
-
-        self.stdout.write(self.style.SUCCESS('Base de datos poblada exitosamente'))
\ No newline at end of file
+    def _encomienda(self, viaje, clientes):
+        tramo = self._tramo(viaje.ruta_id)
+        tipo = self.azar.choice(['sobre', 'paquete', 'ambos'])
+        cliente = self.azar.choice(clientes)
+        return Encomienda(
+            viaje=viaje, cliente=cliente, origen_id=tramo.origen_id, destino_id=tramo.destino_id,
+            flete=Decimal(self.azar.randint(15, 80) * 1000), remitente=cliente.razon_social,
+            ruc_ci=str(cliente.cedula_id), numero_contacto='0981000000', tipo_envio=tipo,
+            cantidad_sobre=self.azar.randint(1, 3) if tipo != 'paquete' else 0,
+            cantidad_paquete=self.azar.randint(1, 3) if tipo != 'sobre' else 0,
+            codigo_seguimiento=''.join(self.azar.choices(ALFABETO_SEGUIMIENTO, k=10)),
+        )
+
+    def seguir(self, dia, hoy, encomiendas, momento):
+        """
+        Eventos de seguimiento sin pasar por la señal de Encomienda: las de
+        viajes pasados ya se entregaron, las demás siguen en el origen.
+        """
+        eventos = []
+        for encomienda in encomiendas:
+            eventos.append(EventoEncomienda(
+                encomienda=encomienda, tipo='Recibida', fecha=momento, parada_id=encomienda.origen_id
+            ))
+            if dia < hoy:
+                eventos += [
+                    EventoEncomienda(encomienda=encomienda, tipo='Cargada', fecha=momento + timedelta(hours=1),
+                                     parada_id=encomienda.origen_id, viaje=encomienda.viaje),
+                    EventoEncomienda(encomienda=encomienda, tipo='Llegada', fecha=momento + timedelta(hours=6),
+                                     parada_id=encomienda.destino_id, viaje=encomienda.viaje),
+                    EventoEncomienda(encomienda=encomienda, tipo='Entregada', fecha=momento + timedelta(hours=8),
+                                     parada_id=encomienda.destino_id),
+                ]
+        EventoEncomienda.objects.bulk_create(eventos, batch_size=self.lote)
+        pks = [encomienda.pk for encomienda in encomiendas]
+        if dia < hoy:
+            Encomienda.objects.filter(pk__in=pks).update(
+                estado='Entregada', ubicacion=F('destino'), fecha_estado=momento + timedelta(hours=8)
+            )
+        else:
+            Encomienda.objects.filter(pk__in=pks).update(
+                estado='Recibida', ubicacion=F('origen'), fecha_estado=momento
+            )
+
+    def facturar(self, dia, pasajes, empleados, puntos):
+        """Una factura por pasaje, emitida en la parada de origen."""
+        precios = tarifas_pasajes(pasajes)
+        facturas, lineas = [], []
+        for pasaje in pasajes:
+            punto = puntos[pasaje.origen_id]
+            punto.numero_actual += 1
+            linea = DetalleFactura(
+                pasaje=pasaje, cantidad=1, precio_unitario=precios[pasaje.pk], subtotal=precios[pasaje.pk],
+                iva_porcentaje=10, descripcion=f'Pasaje {pasaje.viaje.ruta.nombre} - Asiento {pasaje.asiento.numero_asiento}'[:100],
+            )
+            facturas.append(CabeceraFactura(
+                cliente=self.clientes_por_cedula[pasaje.pasajero.cedula_id], empleado=empleados[pasaje.viaje.bus.empresa_id],
+                timbrado_id=punto.timbrado_id, parada_id=punto.parada_id, punto_expedicion=punto,
+                numero_factura=formatear(punto, punto.numero_actual), estado=ESTADO_FACTURA, **totales([linea]),
+            ))
+            lineas.append(linea)
+        facturas = CabeceraFactura.objects.bulk_create(facturas, batch_size=self.lote)
+        # fecha_factura es auto_now_add: se corrige al día del viaje
+        CabeceraFactura.objects.filter(pk__in=[factura.pk for factura in facturas]).update(fecha_factura=dia)
+        for factura, linea in zip(facturas, lineas):
+            linea.factura = factura
+        DetalleFactura.objects.bulk_create(lineas, batch_size=self.lote)
+        return len(facturas)
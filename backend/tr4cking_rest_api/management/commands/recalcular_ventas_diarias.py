@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tr4cking_rest_api.ventas_diarias import dias, recalcular
+
+
+class Command(BaseCommand):
+    help = (
+        'Concilia el resumen de ventas diarias con las facturas y encomiendas. '
+        'Pensado para correr cada noche (cron); sin fechas revisa ayer y hoy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat, help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Fecha final (AAAA-MM-DD), por defecto hoy')
+
+    def handle(self, *args, **options):
+        hasta = options['hasta'] or timezone.localdate()
+        desde = options['desde'] or hasta - timedelta(days=1)
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta')
+
+        corregidas = 0
+        # Un día por transacción para no bloquear el resumen entero
+        for dia in dias(desde, hasta):
+            creadas, modificadas, eliminadas = recalcular(dia, dia)
+            if creadas or modificadas or eliminadas:
+                corregidas += creadas + modificadas + eliminadas
+                self.stdout.write(self.style.WARNING(
+                    f'{dia}: {creadas} creadas, {modificadas} corregidas, {eliminadas} eliminadas'
+                ))
+        self.stdout.write(self.style.SUCCESS(f'Ventas diarias conciliadas del {desde} al {hasta} ({corregidas} celdas ajustadas)'))
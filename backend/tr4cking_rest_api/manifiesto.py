@@ -0,0 +1,185 @@
+"""
+Manifiesto de carga de un viaje: pasajeros y encomiendas parada por parada,
+en el orden de DetalleRuta, con lo que va a bordo después de cada parada.
+
+Son tres consultas sin importar el tamaño del viaje: las paradas de la
+ruta, los pasajes (una fila por pasajero) y las encomiendas ya sumadas por
+origen y destino. El detalle de cada encomienda solo se lee para exportar.
+"""
+from django.db.models import Count, Sum
+
+from .models import DetalleRuta, Encomienda, Pasaje
+
+COLUMNAS_CSV = (
+    'orden', 'parada', 'tipo', 'asiento', 'codigo', 'nombre', 'documento',
+    'origen', 'destino', 'sobres', 'paquetes',
+)
+
+
+def _vacio():
+    return {'encomiendas': 0, 'sobres': 0, 'paquetes': 0}
+
+
+def _por_destino(encomiendas):
+    grupos = {}
+    for encomienda in encomiendas:
+        grupos.setdefault(encomienda['destino_id'], []).append(encomienda)
+    return grupos
+
+
+def _sumar(total, fila):
+    for clave in total:
+        total[clave] += fila[clave] or 0
+
+
+def manifiesto(viaje):
+    """
+    {'viaje', 'paradas': [...], 'totales'}. Cada parada lleva los pasajeros
+    que suben, cuántos bajan, las encomiendas a cargar y a descargar y lo
+    que queda a bordo al salir. Los pasajes sin origen/destino recorren la
+    ruta completa.
+    """
+    detalles = list(
+        DetalleRuta.objects.filter(ruta_id=viaje.ruta_id).select_related('parada').order_by('orden')
+    )
+    posiciones = {detalle.parada_id: i for i, detalle in enumerate(detalles)}
+    ultima = len(detalles) - 1
+
+    paradas = [{
+        'parada': detalle.parada_id,
+        'nombre': detalle.parada.nombre,
+        'orden': detalle.orden,
+        'hora_salida': detalle.hora_salida,
+        'suben': [],
+        'bajan': 0,
+        'cargar': _vacio(),
+        'descargar': _vacio(),
+    } for detalle in detalles]
+
+    pasajes = (
+        Pasaje.objects.filter(viaje=viaje)
+        .order_by('asiento__numero_asiento')
+        .values('id_pasaje', 'origen_id', 'destino_id', 'asiento__numero_asiento',
+                'pasajero__cedula_id', 'pasajero__cedula__nombre', 'pasajero__cedula__apellido')
+    )
+    for pasaje in pasajes if paradas else ():
+        subida = posiciones.get(pasaje['origen_id'], 0)
+        bajada = posiciones.get(pasaje['destino_id'], ultima)
+        paradas[subida]['suben'].append({
+            'pasaje': pasaje['id_pasaje'],
+            'asiento': pasaje['asiento__numero_asiento'],
+            'cedula': pasaje['pasajero__cedula_id'],
+            'nombre': f"{pasaje['pasajero__cedula__nombre']} {pasaje['pasajero__cedula__apellido']}",
+            'destino': paradas[bajada]['nombre'],
+        })
+        paradas[bajada]['bajan'] += 1
+
+    encomiendas = (
+        Encomienda.objects.filter(viaje=viaje).order_by()
+        .values('origen_id', 'destino_id')
+        .annotate(encomiendas=Count('pk'), sobres=Sum('cantidad_sobre'), paquetes=Sum('cantidad_paquete'))
+    )
+    for grupo in encomiendas:
+        if grupo['origen_id'] in posiciones:
+            _sumar(paradas[posiciones[grupo['origen_id']]]['cargar'], grupo)
+        if grupo['destino_id'] in posiciones:
+            _sumar(paradas[posiciones[grupo['destino_id']]]['descargar'], grupo)
+
+    capacidad = viaje.bus.capacidad
+    a_bordo, carga = 0, _vacio()
+    for parada in paradas:
+        a_bordo += len(parada['suben']) - parada['bajan']
+        for clave in carga:
+            carga[clave] += parada['cargar'][clave] - parada['descargar'][clave]
+        parada['a_bordo'] = {'pasajeros': a_bordo, 'asientos_libres': capacidad - a_bordo, **carga}
+
+    return {
+        'viaje': {
+            'id_viaje': viaje.pk,
+            'fecha': viaje.fecha,
+            'ruta': viaje.ruta.nombre,
+            'bus': viaje.bus.placa,
+            'capacidad': capacidad,
+        },
+        'paradas': paradas,
+        'totales': {
+            'pasajeros': sum(len(parada['suben']) for parada in paradas),
+            'max_a_bordo': max((parada['a_bordo']['pasajeros'] for parada in paradas), default=0),
+            **{clave: sum(parada['cargar'][clave] for parada in paradas) for clave in _vacio()},
+        },
+    }
+
+
+def detalle_encomiendas(viaje):
+    """Encomiendas del viaje, una por fila, ordenadas para cargar por destino."""
+    return (
+        Encomienda.objects.filter(viaje=viaje)
+        .order_by('destino_id', 'id_encomienda')
+        .values('codigo_seguimiento', 'remitente', 'ruc_ci', 'origen_id', 'destino_id',
+                'cantidad_sobre', 'cantidad_paquete', 'descripcion')
+    )
+
+
+def filas(datos, encomiendas):
+    """
+    Filas del CSV: los pasajeros en la parada donde suben y las encomiendas
+    agrupadas en la parada donde se descargan.
+    """
+    nombres = {parada['parada']: parada['nombre'] for parada in datos['paradas']}
+    por_destino = _por_destino(encomiendas)
+    for parada in datos['paradas']:
+        for pasajero in parada['suben']:
+            yield {
+                'orden': parada['orden'], 'parada': parada['nombre'], 'tipo': 'pasajero',
+                'asiento': pasajero['asiento'], 'codigo': pasajero['pasaje'], 'nombre': pasajero['nombre'],
+                'documento': pasajero['cedula'], 'origen': parada['nombre'], 'destino': pasajero['destino'],
+                'sobres': '', 'paquetes': '',
+            }
+        for encomienda in por_destino.get(parada['parada'], ()):
+            yield {
+                'orden': parada['orden'], 'parada': parada['nombre'], 'tipo': 'encomienda',
+                'asiento': '', 'codigo': encomienda['codigo_seguimiento'], 'nombre': encomienda['remitente'],
+                'documento': encomienda['ruc_ci'], 'origen': nombres.get(encomienda['origen_id'], ''),
+                'destino': parada['nombre'], 'sobres': encomienda['cantidad_sobre'],
+                'paquetes': encomienda['cantidad_paquete'],
+            }
+
+
+def lineas(datos, encomiendas):
+    """Texto del manifiesto impreso, parada por parada."""
+    viaje = datos['viaje']
+    nombres = {parada['parada']: parada['nombre'] for parada in datos['paradas']}
+    por_destino = _por_destino(encomiendas)
+
+    yield f"MANIFIESTO - Viaje {viaje['id_viaje']} - {viaje['ruta']}"
+    yield f"Fecha {viaje['fecha']:%d/%m/%Y}   Bus {viaje['bus']}   Capacidad {viaje['capacidad']} asientos"
+    yield '=' * 96
+    for parada in datos['paradas']:
+        hora = f" {parada['hora_salida']:%H:%M}" if parada['hora_salida'] else ''
+        a_bordo = parada['a_bordo']
+        yield ''
+        yield f"{parada['orden']:>3}. {parada['nombre']}{hora}"
+        yield (
+            f"     Suben {len(parada['suben'])}  Bajan {parada['bajan']}  "
+            f"Cargar {parada['cargar']['sobres']} sobres / {parada['cargar']['paquetes']} paquetes  "
+            f"Descargar {parada['descargar']['sobres']} sobres / {parada['descargar']['paquetes']} paquetes"
+        )
+        yield (
+            f"     A bordo al salir: {a_bordo['pasajeros']} pasajeros ({a_bordo['asientos_libres']} libres), "
+            f"{a_bordo['sobres']} sobres, {a_bordo['paquetes']} paquetes"
+        )
+        for pasajero in parada['suben']:
+            yield f"       Asiento {pasajero['asiento']:>3}  {pasajero['cedula']:>10}  {pasajero['nombre'][:40]:<40} -> {pasajero['destino']}"
+        for encomienda in por_destino.get(parada['parada'], ()):
+            yield (
+                f"       Descargar {encomienda['codigo_seguimiento']}  {encomienda['remitente'][:30]:<30} "
+                f"de {nombres.get(encomienda['origen_id'], '?')[:20]:<20} "
+                f"S:{encomienda['cantidad_sobre']} P:{encomienda['cantidad_paquete']}"
+            )
+    totales = datos['totales']
+    yield ''
+    yield '=' * 96
+    yield (
+        f"Total: {totales['pasajeros']} pasajeros (máximo a bordo {totales['max_a_bordo']}), "
+        f"{totales['encomiendas']} encomiendas, {totales['sobres']} sobres, {totales['paquetes']} paquetes"
+    )
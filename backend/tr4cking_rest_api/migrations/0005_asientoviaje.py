@@ -0,0 +1,62 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_inventario(apps, schema_editor):
+    Viaje = apps.get_model('tr4cking_rest_api', 'Viaje')
+    Asiento = apps.get_model('tr4cking_rest_api', 'Asiento')
+    Pasaje = apps.get_model('tr4cking_rest_api', 'Pasaje')
+    AsientoViaje = apps.get_model('tr4cking_rest_api', 'AsientoViaje')
+
+    asientos_por_bus = {}
+    for asiento_id, bus_id in Asiento.objects.values_list('pk', 'bus_id'):
+        asientos_por_bus.setdefault(bus_id, []).append(asiento_id)
+    vendidos = {
+        (viaje_id, asiento_id): (pasaje_id, reserva_id)
+        for pasaje_id, viaje_id, asiento_id, reserva_id
+        in Pasaje.objects.values_list('pk', 'viaje_id', 'asiento_id', 'reserva_id')
+    }
+
+    filas = []
+    for viaje_id, bus_id in Viaje.objects.values_list('pk', 'bus_id').iterator():
+        for asiento_id in asientos_por_bus.get(bus_id, []):
+            pasaje_id, reserva_id = vendidos.get((viaje_id, asiento_id), (None, None))
+            filas.append(AsientoViaje(
+                viaje_id=viaje_id,
+                asiento_id=asiento_id,
+                estado='Ocupado' if pasaje_id else 'Disponible',
+                pasaje_id=pasaje_id,
+                reserva_id=reserva_id,
+            ))
+    AsientoViaje.objects.bulk_create(filas, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0004_caja_timbrado_tipodocumento_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsientoViaje',
+            fields=[
+                ('id_asiento_viaje', models.BigAutoField(primary_key=True, serialize=False)),
+                ('estado', models.CharField(choices=[('Disponible', 'Disponible'), ('Reservado', 'Reservado'), ('Ocupado', 'Ocupado')], default='Disponible', max_length=20)),
+                ('retenido_hasta', models.DateTimeField(blank=True, null=True)),
+                ('asiento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tr4cking_rest_api.asiento')),
+                ('pasaje', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tr4cking_rest_api.pasaje')),
+                ('reserva', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tr4cking_rest_api.reserva')),
+                ('viaje', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventario', to='tr4cking_rest_api.viaje')),
+            ],
+            options={
+                'verbose_name': 'Asiento por Viaje',
+                'verbose_name_plural': 'Asientos por Viaje',
+                'indexes': [models.Index(fields=['viaje', 'estado'], name='asientoviaje_viaje_estado')],
+                'unique_together': {('viaje', 'asiento')},
+            },
+        ),
+        migrations.RunPython(poblar_inventario, migrations.RunPython.noop),
+    ]
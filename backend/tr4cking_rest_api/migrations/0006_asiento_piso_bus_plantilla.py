@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0005_asientoviaje'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asiento',
+            name='piso',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='bus',
+            name='plantilla_asientos',
+            field=models.CharField(default='estandar', help_text='Plantilla de distribución de asientos (settings.TR4CKING_PLANTILLAS_ASIENTOS)', max_length=30),
+        ),
+    ]
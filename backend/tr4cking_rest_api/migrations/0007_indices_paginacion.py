@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0006_asiento_piso_bus_plantilla'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cabeceracaja',
+            name='fecha_mov',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='cabecerafactura',
+            name='fecha_factura',
+            field=models.DateField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='detallecaja',
+            name='fecha_transaccion',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='encomienda',
+            name='fecha_creacion',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='historialfactura',
+            name='fecha_cambio',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='fecha_reserva',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='viaje',
+            name='fecha',
+            field=models.DateField(db_index=True),
+        ),
+    ]
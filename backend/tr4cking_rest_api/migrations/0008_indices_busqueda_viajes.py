@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0007_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='viaje',
+            name='fecha',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='detalleruta',
+            index=models.Index(fields=['parada', 'ruta', 'orden'], name='detalleruta_parada_ruta_orden'),
+        ),
+        migrations.AddIndex(
+            model_name='viaje',
+            index=models.Index(fields=['fecha', 'activo', 'ruta'], name='viaje_fecha_activo_ruta'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_tramos(apps, schema_editor):
+    DetalleRuta = apps.get_model('tr4cking_rest_api', 'DetalleRuta')
+    TramoRuta = apps.get_model('tr4cking_rest_api', 'TramoRuta')
+    paradas_por_ruta = {}
+    for ruta_id, parada_id, hora_salida in (
+        DetalleRuta.objects.order_by('ruta_id', 'orden').values_list('ruta_id', 'parada_id', 'hora_salida')
+    ):
+        paradas_por_ruta.setdefault(ruta_id, []).append((parada_id, hora_salida))
+
+    tramos = []
+    for ruta_id, paradas in paradas_por_ruta.items():
+        for i, (origen, salida) in enumerate(paradas):
+            for j in range(i + 1, len(paradas)):
+                destino, llegada = paradas[j]
+                tramos.append(TramoRuta(
+                    ruta_id=ruta_id, origen_id=origen, destino_id=destino,
+                    posicion_origen=i, posicion_destino=j, cantidad_paradas=j - i,
+                    hora_salida=salida, hora_llegada=llegada,
+                ))
+    TramoRuta.objects.bulk_create(tramos, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0008_indices_busqueda_viajes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pasaje',
+            name='destino',
+            field=models.ForeignKey(blank=True, help_text='Vacío: hasta la última parada de la ruta', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='destino_pasaje', to='tr4cking_rest_api.parada'),
+        ),
+        migrations.AddField(
+            model_name='pasaje',
+            name='origen',
+            field=models.ForeignKey(blank=True, help_text='Vacío: desde la primera parada de la ruta', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='origen_pasaje', to='tr4cking_rest_api.parada'),
+        ),
+        migrations.CreateModel(
+            name='TramoRuta',
+            fields=[
+                ('id_tramo', models.BigAutoField(primary_key=True, serialize=False)),
+                ('posicion_origen', models.PositiveSmallIntegerField()),
+                ('posicion_destino', models.PositiveSmallIntegerField()),
+                ('cantidad_paradas', models.PositiveSmallIntegerField(help_text='Paradas recorridas entre origen y destino')),
+                ('hora_salida', models.TimeField(blank=True, null=True)),
+                ('hora_llegada', models.TimeField(blank=True, null=True)),
+                ('destino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tramos_destino', to='tr4cking_rest_api.parada')),
+                ('origen', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tramos_origen', to='tr4cking_rest_api.parada')),
+                ('ruta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tramos', to='tr4cking_rest_api.ruta')),
+            ],
+            options={
+                'verbose_name': 'Tramo de Ruta',
+                'verbose_name_plural': 'Tramos de Rutas',
+                'indexes': [models.Index(fields=['origen', 'destino', 'ruta'], name='tramoruta_origen_destino_ruta')],
+                'unique_together': {('ruta', 'origen', 'destino')},
+            },
+        ),
+        migrations.RunPython(poblar_tramos, migrations.RunPython.noop),
+    ]
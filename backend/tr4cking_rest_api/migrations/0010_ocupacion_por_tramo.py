@@ -0,0 +1,67 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+def poblar_mascaras(apps, schema_editor):
+    TramoRuta = apps.get_model('tr4cking_rest_api', 'TramoRuta')
+    AsientoViaje = apps.get_model('tr4cking_rest_api', 'AsientoViaje')
+    Pasaje = apps.get_model('tr4cking_rest_api', 'Pasaje')
+
+    tramos = list(TramoRuta.objects.all())
+    completos = {}
+    for tramo in tramos:
+        i, j = tramo.posicion_origen, tramo.posicion_destino
+        tramo.mascara = ((1 << (j - i)) - 1) << i
+        if i == 0 and j >= completos.get(tramo.ruta_id, (None, 0))[1]:
+            completos[tramo.ruta_id] = (tramo, j)
+    TramoRuta.objects.bulk_update(tramos, ['mascara'], batch_size=1000)
+    por_par = {(tramo.ruta_id, tramo.origen_id, tramo.destino_id): tramo.mascara for tramo in tramos}
+    por_ruta = {ruta_id: tramo.mascara for ruta_id, (tramo, _) in completos.items()}
+
+    # Pasajes anteriores: sin origen/destino ocupan la ruta completa
+    ocupados = {}
+    for viaje_id, asiento_id, ruta_id, origen_id, destino_id in Pasaje.objects.values_list(
+        'viaje_id', 'asiento_id', 'viaje__ruta_id', 'origen_id', 'destino_id'
+    ):
+        mascara = por_par.get((ruta_id, origen_id, destino_id)) or por_ruta.get(ruta_id, -1)
+        ocupados[(viaje_id, asiento_id)] = ocupados.get((viaje_id, asiento_id), 0) | mascara
+
+    filas = list(AsientoViaje.objects.exclude(estado='Disponible').select_related('viaje'))
+    for fila in filas:
+        completo = por_ruta.get(fila.viaje.ruta_id, -1)
+        if fila.estado == 'Reservado':
+            fila.tramos_retenidos = completo
+        else:
+            fila.tramos_ocupados = ocupados.get((fila.viaje_id, fila.asiento_id), completo)
+    AsientoViaje.objects.bulk_update(filas, ['tramos_ocupados', 'tramos_retenidos'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0009_tramoruta_pasaje_origen_destino'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asientoviaje',
+            name='tramos_ocupados',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='asientoviaje',
+            name='tramos_retenidos',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tramoruta',
+            name='mascara',
+            field=models.BigIntegerField(default=0, help_text='Bits de los tramos elementales recorridos'),
+        ),
+        migrations.RunPython(poblar_mascaras, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='asientoviaje',
+            name='pasaje',
+        ),
+    ]
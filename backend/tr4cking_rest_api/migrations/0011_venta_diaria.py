@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0010_ocupacion_por_tramo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=80, unique=True)),
+                ('fecha', models.DateField()),
+                ('pasajes_vendidos', models.IntegerField(default=0)),
+                ('encomiendas', models.IntegerField(default=0)),
+                ('monto_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('monto_exenta', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('monto_iva_5', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('monto_iva_10', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('empresa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tr4cking_rest_api.empresa')),
+                ('parada', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tr4cking_rest_api.parada')),
+                ('ruta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tr4cking_rest_api.ruta')),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria',
+                'verbose_name_plural': 'Ventas Diarias',
+                'indexes': [models.Index(fields=['fecha', 'empresa'], name='ventadiaria_fecha_empresa')],
+            },
+        ),
+    ]
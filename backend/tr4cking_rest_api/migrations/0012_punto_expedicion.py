@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0011_venta_diaria'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cabecerafactura',
+            name='numero_factura',
+            field=models.TextField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cabecerafactura',
+            unique_together={('timbrado', 'numero_factura')},
+        ),
+        migrations.CreateModel(
+            name='PuntoExpedicion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('establecimiento', models.CharField(help_text='Código de 3 dígitos, p. ej. 001', max_length=3)),
+                ('punto_expedicion', models.CharField(help_text='Código de 3 dígitos, p. ej. 001', max_length=3)),
+                ('numero_actual', models.PositiveIntegerField(default=0, help_text='Último número emitido')),
+                ('numero_hasta', models.PositiveIntegerField(default=9999999, help_text='Último número autorizado')),
+                ('activo', models.BooleanField(default=True)),
+                ('caja', models.ForeignKey(blank=True, help_text='Vacío: punto compartido por las cajas de la parada', null=True, on_delete=django.db.models.deletion.SET_NULL, to='tr4cking_rest_api.caja')),
+                ('parada', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tr4cking_rest_api.parada')),
+                ('timbrado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='puntos_expedicion', to='tr4cking_rest_api.timbrado')),
+            ],
+            options={
+                'verbose_name': 'Punto de Expedición',
+                'verbose_name_plural': 'Puntos de Expedición',
+                'unique_together': {('timbrado', 'establecimiento', 'punto_expedicion')},
+            },
+        ),
+        migrations.AddField(
+            model_name='cabecerafactura',
+            name='punto_expedicion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='tr4cking_rest_api.puntoexpedicion'),
+        ),
+    ]
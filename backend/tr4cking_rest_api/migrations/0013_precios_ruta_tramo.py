@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0012_punto_expedicion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ruta',
+            name='precio_base',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Precio del recorrido completo', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='tramoruta',
+            name='precio',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Vacío: precio base de la ruta prorrateado por tramos', max_digits=12, null=True),
+        ),
+    ]
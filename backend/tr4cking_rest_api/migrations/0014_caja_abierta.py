@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0013_precios_ruta_tramo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cabeceracaja',
+            index=models.Index(fields=['empleado', 'fecha_mov'], name='cabeceracaja_empleado_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='caja',
+            index=models.Index(condition=models.Q(('estado', 'Abierta')), fields=['estado'], name='caja_abierta'),
+        ),
+    ]
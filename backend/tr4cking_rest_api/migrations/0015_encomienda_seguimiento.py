@@ -0,0 +1,126 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:04
+
+import django.db.models.deletion
+import tr4cking_rest_api.models
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def poblar_seguimiento(apps, schema_editor):
+    Encomienda = apps.get_model('tr4cking_rest_api', 'Encomienda')
+    EventoEncomienda = apps.get_model('tr4cking_rest_api', 'EventoEncomienda')
+
+    # Hasta ahora el estado se deducía de la fecha del viaje: las de viajes
+    # pasados se dan por entregadas en destino, las demás por recibidas
+    hoy = timezone.localdate()
+    codigos = set()
+    ultimo = 0
+    while True:
+        lote = list(
+            Encomienda.objects.filter(pk__gt=ultimo).order_by('pk')
+            .select_related('viaje').only('pk', 'origen_id', 'destino_id', 'viaje__fecha',
+                                          'fecha_creacion', 'fecha_actualizacion')[:5000]
+        )
+        if not lote:
+            break
+        ultimo = lote[-1].pk
+        eventos = []
+        for encomienda in lote:
+            codigo = tr4cking_rest_api.models.generar_codigo_seguimiento()
+            while codigo in codigos:
+                codigo = tr4cking_rest_api.models.generar_codigo_seguimiento()
+            codigos.add(codigo)
+            encomienda.codigo_seguimiento = codigo
+            eventos.append(EventoEncomienda(
+                encomienda=encomienda, tipo='Recibida', fecha=encomienda.fecha_creacion, parada_id=encomienda.origen_id
+            ))
+            if encomienda.viaje.fecha < hoy:
+                encomienda.estado, encomienda.ubicacion_id = 'Entregada', encomienda.destino_id
+                encomienda.fecha_estado = encomienda.fecha_actualizacion
+                eventos.append(EventoEncomienda(
+                    encomienda=encomienda, tipo='Entregada', fecha=encomienda.fecha_actualizacion,
+                    parada_id=encomienda.destino_id, viaje_id=encomienda.viaje_id,
+                ))
+            else:
+                encomienda.estado, encomienda.ubicacion_id = 'Recibida', encomienda.origen_id
+                encomienda.fecha_estado = encomienda.fecha_creacion
+        Encomienda.objects.bulk_update(
+            lote, ['codigo_seguimiento', 'estado', 'ubicacion', 'fecha_estado'], batch_size=1000
+        )
+        EventoEncomienda.objects.bulk_create(eventos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0014_caja_abierta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoEncomienda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('Recibida', 'Recibida'), ('Cargada', 'Cargada'), ('Llegada', 'Llegada'), ('Entregada', 'Entregada')], max_length=20)),
+                ('fecha', models.DateTimeField()),
+                ('observaciones', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de Encomienda',
+                'verbose_name_plural': 'Eventos de Encomiendas',
+            },
+        ),
+        migrations.AddField(
+            model_name='encomienda',
+            name='codigo_seguimiento',
+            field=models.CharField(editable=False, max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='encomienda',
+            name='estado',
+            field=models.CharField(choices=[('Recibida', 'Recibida'), ('Cargada', 'Cargada'), ('Llegada', 'Llegada'), ('Entregada', 'Entregada')], default='Recibida', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='encomienda',
+            name='fecha_estado',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='encomienda',
+            name='ubicacion',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Parada del último evento de seguimiento', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='encomiendas_en_parada', to='tr4cking_rest_api.parada'),
+        ),
+        migrations.AddIndex(
+            model_name='encomienda',
+            index=models.Index(fields=['ruc_ci'], name='encomienda_ruc_ci'),
+        ),
+        migrations.AddIndex(
+            model_name='encomienda',
+            index=models.Index(fields=['numero_contacto'], name='encomienda_numero_contacto'),
+        ),
+        migrations.AddField(
+            model_name='eventoencomienda',
+            name='empleado',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tr4cking_rest_api.empleado'),
+        ),
+        migrations.AddField(
+            model_name='eventoencomienda',
+            name='encomienda',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='tr4cking_rest_api.encomienda'),
+        ),
+        migrations.AddField(
+            model_name='eventoencomienda',
+            name='parada',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tr4cking_rest_api.parada'),
+        ),
+        migrations.AddField(
+            model_name='eventoencomienda',
+            name='viaje',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tr4cking_rest_api.viaje'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoencomienda',
+            index=models.Index(fields=['encomienda', 'fecha'], name='eventoencomienda_fecha'),
+        ),
+        migrations.RunPython(poblar_seguimiento, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:04
+
+import tr4cking_rest_api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Aparte de 0015: en PostgreSQL no se puede alterar la tabla en la misma
+    # transacción que dejó pendientes los chequeos de claves foráneas
+
+    dependencies = [
+        ('tr4cking_rest_api', '0015_encomienda_seguimiento'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='encomienda',
+            name='codigo_seguimiento',
+            field=models.CharField(default=tr4cking_rest_api.models.generar_codigo_seguimiento, editable=False, max_length=10, unique=True),
+        ),
+    ]
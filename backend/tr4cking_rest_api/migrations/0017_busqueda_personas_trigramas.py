@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:10
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0016_encomienda_codigo_seguimiento_unico'),
+    ]
+
+    operations = [
+        # Los índices gin_trgm_ops necesitan la extensión pg_trgm
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['razon_social'], name='cliente_razon_social_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='persona',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nombre'], name='persona_nombre_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='persona',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['apellido'], name='persona_apellido_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0017_busqueda_personas_trigramas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Horario',
+            fields=[
+                ('id_horario', models.BigAutoField(primary_key=True, serialize=False)),
+                ('hora_salida', models.TimeField()),
+                ('dias_semana', models.CharField(default='1111111', help_text='Un carácter por día de lunes a domingo: 1 sale, 0 no (ej. 1111100)', max_length=7)),
+                ('vigente_desde', models.DateField()),
+                ('vigente_hasta', models.DateField(blank=True, help_text='Vacío: sin fecha de fin', null=True)),
+                ('activo', models.BooleanField(default=True)),
+                ('buses', models.ManyToManyField(help_text='Buses que pueden hacer el viaje, en orden de preferencia por id', related_name='horarios', to='tr4cking_rest_api.bus')),
+                ('ruta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horarios', to='tr4cking_rest_api.ruta')),
+            ],
+            options={
+                'verbose_name': 'Horario',
+                'verbose_name_plural': 'Horarios',
+            },
+        ),
+        migrations.AddField(
+            model_name='viaje',
+            name='horario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='viajes', to='tr4cking_rest_api.horario'),
+        ),
+        migrations.AddConstraint(
+            model_name='viaje',
+            constraint=models.UniqueConstraint(fields=('horario', 'fecha'), name='viaje_horario_fecha'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='horario',
+            unique_together={('ruta', 'hora_salida')},
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:40
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Coalesce, TruncDate
+
+CAMPOS = ('pasajes_vendidos', 'encomiendas', 'monto_total', 'monto_exenta', 'monto_iva_5', 'monto_iva_10')
+CENTIMOS = Decimal('0.01')
+
+
+def poblar_ventas_diarias(apps, schema_editor):
+    # Mismo cálculo que ventas_diarias.recalcular() sobre toda la historia: la
+    # tabla se creó vacía en 0011 y solo se llenaba con las ventas nuevas
+    DetalleFactura = apps.get_model('tr4cking_rest_api', 'DetalleFactura')
+    Encomienda = apps.get_model('tr4cking_rest_api', 'Encomienda')
+    VentaDiaria = apps.get_model('tr4cking_rest_api', 'VentaDiaria')
+
+    totales = {}
+
+    def celda(fila):
+        clave = '{}:{}:{}:{}'.format(
+            fila['fecha'].isoformat(), fila['empresa_id'] or 0, fila['ruta_id'] or 0, fila['parada_id'] or 0
+        )
+        if clave not in totales:
+            totales[clave] = {
+                'fecha': fila['fecha'], 'empresa_id': fila['empresa_id'], 'ruta_id': fila['ruta_id'],
+                'parada_id': fila['parada_id'], **dict.fromkeys(CAMPOS, 0),
+            }
+        return totales[clave]
+
+    lineas = DetalleFactura.objects.exclude(factura__estado='Anulada').values(
+        'pasaje', 'cantidad', 'subtotal', 'iva_porcentaje',
+        fecha=F('factura__fecha_factura'),
+        empresa_id=Coalesce('pasaje__viaje__bus__empresa', 'encomienda__viaje__bus__empresa'),
+        ruta_id=Coalesce('pasaje__viaje__ruta', 'encomienda__viaje__ruta'),
+        parada_id=F('factura__parada'),
+    )
+    for fila in lineas.iterator(chunk_size=2000):
+        actual, monto = celda(fila), fila['subtotal']
+        if fila['pasaje'] is not None:
+            actual['pasajes_vendidos'] += fila['cantidad']
+        actual['monto_total'] += monto
+        if fila['iva_porcentaje'] in (5, 10):
+            porcentaje = fila['iva_porcentaje']
+            actual[f'monto_iva_{porcentaje}'] += (monto * porcentaje / (100 + porcentaje)).quantize(CENTIMOS)
+        else:
+            actual['monto_exenta'] += monto
+
+    encomiendas = Encomienda.objects.values(
+        fecha=TruncDate('fecha_creacion'),
+        empresa_id=F('viaje__bus__empresa'),
+        ruta_id=F('viaje__ruta'),
+        parada_id=F('origen'),
+    )
+    for fila in encomiendas.iterator(chunk_size=2000):
+        celda(fila)['encomiendas'] += 1
+
+    # Las celdas que las señales ya cargaron se rehacen con el total completo
+    VentaDiaria.objects.all().delete()
+    VentaDiaria.objects.bulk_create(
+        [VentaDiaria(clave=clave, **valores) for clave, valores in totales.items()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tr4cking_rest_api', '0018_horario'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_ventas_diarias, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
+import secrets
+
 from django.conf import settings
 from django.contrib.auth.models import User, Group, Permission
+from django.contrib.postgres.indexes import GinIndex
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
@@ -25,6 +29,11 @@ class Persona(models.Model):
     class Meta:
         verbose_name = "Persona"
         verbose_name_plural = "Personas"
+        # Trigramas (pg_trgm): sirven a ILIKE '%texto%' y a la búsqueda por nombre
+        indexes = [
+            GinIndex(fields=['nombre'], name='persona_nombre_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['apellido'], name='persona_apellido_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
 
 class UsuarioPersona(models.Model):
@@ -70,6 +79,9 @@ class Cliente(models.Model):
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
+        indexes = [
+            GinIndex(fields=['razon_social'], name='cliente_razon_social_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
 # -----------------------------------------------
 # Pasajeros (nuevo)
@@ -173,6 +185,11 @@ class Bus(models.Model):
     capacidad = models.IntegerField()
     estado = models.CharField(max_length=20, choices=ESTADOS)
     empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE)
+    plantilla_asientos = models.CharField(
+        max_length=30,
+        default='estandar',
+        help_text="Plantilla de distribución de asientos (settings.TR4CKING_PLANTILLAS_ASIENTOS)"
+    )
 
     def __str__(self):
         return f"{self.empresa.nombre} - {self.placa} ({self.capacidad})"
@@ -195,6 +212,7 @@ class Asiento(models.Model):
     id_asiento = models.BigAutoField(primary_key=True)
     bus = models.ForeignKey(Bus, on_delete=models.CASCADE)
     numero_asiento = models.IntegerField()
+    piso = models.PositiveSmallIntegerField(default=1)
     estado = models.CharField(max_length=20, choices=ESTADOS_ASIENTO, default='Disponible')
     tipo_asiento = models.CharField(max_length=20, choices=TIPOS_ASIENTO, default='Semi-cama',blank=True, null=True)
 
@@ -213,6 +231,8 @@ class Ruta(models.Model):
     id_ruta = models.BigAutoField(primary_key=True)
     nombre = models.CharField(max_length=100, unique=True)
     activo = models.BooleanField(default=True)
+    precio_base = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                      help_text="Precio del recorrido completo")
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
     def __str__(self):
@@ -222,6 +242,11 @@ class Ruta(models.Model):
         verbose_name_plural = "Rutas"
 
 
+# Las máscaras de tramos (TramoRuta.mascara) tienen un bit por trayecto entre
+# paradas consecutivas en un BigInteger con signo: 63 bits, 64 paradas
+MAX_PARADAS_RUTA = 64
+
+
 class DetalleRuta(models.Model):
     ruta = models.ForeignKey(Ruta, on_delete=models.CASCADE)
     parada = models.ForeignKey(Parada, on_delete=models.CASCADE)
@@ -233,23 +258,97 @@ class DetalleRuta(models.Model):
         verbose_name_plural = "Detalles de Rutas"
         unique_together = [('ruta', 'parada')]
         ordering = ['orden']
+        indexes = [
+            models.Index(fields=['parada', 'ruta', 'orden'], name='detalleruta_parada_ruta_orden'),
+        ]
 
     def __str__(self):
         return f"{self.ruta} - {self.parada} ({self.hora_salida})"
-""""
+
+    def clean(self):
+        super().clean()
+        otras = DetalleRuta.objects.filter(ruta_id=self.ruta_id).exclude(pk=self.pk)
+        if self.ruta_id is not None and otras.count() >= MAX_PARADAS_RUTA:
+            raise ValidationError(f"Una ruta admite hasta {MAX_PARADAS_RUTA} paradas")
+
+
+class TramoRuta(models.Model):
+    """
+    Par ordenado (origen, destino) de paradas de una ruta, materializado a
+    partir de DetalleRuta. Las posiciones son el índice 0..n-1 de cada
+    parada dentro de la ruta, sin importar los huecos en `orden`.
+
+    `mascara` tiene un bit por tramo elemental recorrido: el bit k es el
+    trayecto entre las paradas k y k+1. Con un BigInteger alcanza para
+    rutas de hasta 64 paradas.
+    """
+    id_tramo = models.BigAutoField(primary_key=True)
+    ruta = models.ForeignKey(Ruta, on_delete=models.CASCADE, related_name='tramos')
+    origen = models.ForeignKey(Parada, on_delete=models.CASCADE, related_name='tramos_origen')
+    destino = models.ForeignKey(Parada, on_delete=models.CASCADE, related_name='tramos_destino')
+    posicion_origen = models.PositiveSmallIntegerField()
+    posicion_destino = models.PositiveSmallIntegerField()
+    cantidad_paradas = models.PositiveSmallIntegerField(help_text="Paradas recorridas entre origen y destino")
+    hora_salida = models.TimeField(blank=True, null=True)
+    hora_llegada = models.TimeField(blank=True, null=True)
+    mascara = models.BigIntegerField(default=0, help_text="Bits de los tramos elementales recorridos")
+    precio = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
+                                 help_text="Vacío: precio base de la ruta prorrateado por tramos")
+
+    class Meta:
+        verbose_name = "Tramo de Ruta"
+        verbose_name_plural = "Tramos de Rutas"
+        unique_together = ('ruta', 'origen', 'destino')
+        indexes = [
+            models.Index(fields=['origen', 'destino', 'ruta'], name='tramoruta_origen_destino_ruta'),
+        ]
+
+    def __str__(self):
+        return f"{self.ruta} - {self.origen} a {self.destino}"
+
+
 class Horario(models.Model):
+    """
+    Salida recurrente de una ruta: a qué hora, qué días de la semana, entre
+    qué fechas y con qué buses. Los Viaje de cada día los crea
+    horarios.generar_viajes (comando generar_viajes o POST
+    /api/horarios/generar/), tomando el primer bus activo del grupo que no
+    tenga otro viaje ese día.
+    """
     id_horario = models.BigAutoField(primary_key=True)
-    ruta = models.ForeignKey(Ruta, on_delete=models.CASCADE)
+    ruta = models.ForeignKey(Ruta, on_delete=models.CASCADE, related_name='horarios')
     hora_salida = models.TimeField()
-    dias_semana = models.CharField(max_length=7)
+    dias_semana = models.CharField(
+        max_length=7,
+        default='1111111',
+        help_text="Un carácter por día de lunes a domingo: 1 sale, 0 no (ej. 1111100)"
+    )
+    buses = models.ManyToManyField(Bus, related_name='horarios', help_text="Buses que pueden hacer el viaje, en orden de preferencia por id")
+    vigente_desde = models.DateField()
+    vigente_hasta = models.DateField(blank=True, null=True, help_text="Vacío: sin fecha de fin")
     activo = models.BooleanField(default=True)
 
     class Meta:
+        verbose_name = "Horario"
+        verbose_name_plural = "Horarios"
         unique_together = ('ruta', 'hora_salida')
-"""
+
+    def __str__(self):
+        return f"{self.ruta.nombre} - {self.hora_salida:%H:%M}"
+
+    def sale_el(self, fecha):
+        """True si el horario tiene viaje ese día."""
+        return (
+            self.activo and self.vigente_desde <= fecha
+            and (self.vigente_hasta is None or fecha <= self.vigente_hasta)
+            and self.dias_semana[fecha.weekday()] == '1'
+        )
+
+
 class Viaje(models.Model):
     id_viaje = models.BigAutoField(primary_key=True)
-    #horario = models.ForeignKey(Horario, on_delete=models.CASCADE,null=True, blank=True)
+    # Borrar un horario no borra los viajes ya vendidos
+    horario = models.ForeignKey(Horario, on_delete=models.SET_NULL, null=True, blank=True, related_name='viajes')
     ruta = models.ForeignKey(Ruta, on_delete=models.CASCADE)
     bus = models.ForeignKey(Bus, on_delete=models.CASCADE)
     fecha = models.DateField()
@@ -260,6 +359,13 @@ class Viaje(models.Model):
         verbose_name = "Viaje"
         verbose_name_plural = "Viajes"
         unique_together = ('bus', 'fecha')
+        constraints = [
+            # Un viaje por horario y día: generar dos veces no duplica
+            models.UniqueConstraint(fields=['horario', 'fecha'], name='viaje_horario_fecha'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha', 'activo', 'ruta'], name='viaje_fecha_activo_ruta'),
+        ]
 
     def __str__(self):
         return f"{self.ruta.nombre} - Bus {self.bus.placa} - Fecha {self.fecha} ({'Activo' if self.activo else 'Inactivo'})"
@@ -277,7 +383,7 @@ class Reserva(models.Model):
     id_reserva = models.BigAutoField(primary_key=True)
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
     estado = models.CharField(max_length=20, choices=ESTADOS_RESERVA, default='Pendiente')
-    fecha_reserva = models.DateTimeField(auto_now_add=True)
+    fecha_reserva = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         verbose_name = "Reserva"
@@ -293,6 +399,14 @@ class Pasaje(models.Model):
     viaje = models.ForeignKey(Viaje, on_delete=models.CASCADE)
     asiento = models.ForeignKey(Asiento, on_delete=models.CASCADE)
     pasajero = models.ForeignKey(Pasajero, on_delete=models.CASCADE)
+    origen = models.ForeignKey(
+        Parada, on_delete=models.CASCADE, null=True, blank=True, related_name='origen_pasaje',
+        help_text="Vacío: desde la primera parada de la ruta"
+    )
+    destino = models.ForeignKey(
+        Parada, on_delete=models.CASCADE, null=True, blank=True, related_name='destino_pasaje',
+        help_text="Vacío: hasta la última parada de la ruta"
+    )
 
     class Meta:
         verbose_name = "Pasaje"
@@ -300,6 +414,67 @@ class Pasaje(models.Model):
 
     def __str__(self):
         return f"Pasaje {self.viaje.ruta.nombre} - Asiento {self.asiento.numero_asiento} - Pasajero {self.pasajero}"
+
+# -----------------------------------------------
+# Inventario de asientos por viaje
+# -----------------------------------------------
+class AsientoViaje(models.Model):
+    """
+    Estado de un asiento para un viaje concreto. El mismo bus puede tener el
+    asiento 5 ocupado el lunes y libre el martes, por eso el estado vive aquí
+    y no en Asiento.estado.
+
+    La ocupación es por tramo: `tramos_ocupados` y `tramos_retenidos` usan
+    los mismos bits que TramoRuta.mascara, así un asiento vendido hasta una
+    parada intermedia se puede volver a vender desde ahí. `estado` resume la
+    fila: Ocupado si algún tramo está vendido, Reservado si solo hay una
+    retención y Disponible si no hay ninguna de las dos.
+    """
+    ESTADOS = [
+        ('Disponible', 'Disponible'),
+        ('Reservado', 'Reservado'),
+        ('Ocupado', 'Ocupado'),
+    ]
+
+    id_asiento_viaje = models.BigAutoField(primary_key=True)
+    viaje = models.ForeignKey(Viaje, on_delete=models.CASCADE, related_name='inventario')
+    asiento = models.ForeignKey(Asiento, on_delete=models.CASCADE)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='Disponible')
+    retenido_hasta = models.DateTimeField(blank=True, null=True)
+    reserva = models.ForeignKey(Reserva, null=True, blank=True, on_delete=models.SET_NULL)
+    tramos_ocupados = models.BigIntegerField(default=0)
+    tramos_retenidos = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Asiento por Viaje"
+        verbose_name_plural = "Asientos por Viaje"
+        unique_together = ('viaje', 'asiento')
+        indexes = [
+            models.Index(fields=['viaje', 'estado'], name='asientoviaje_viaje_estado'),
+        ]
+
+    def retencion_vigente(self, ahora):
+        return bool(self.tramos_retenidos) and self.retenido_hasta is not None and self.retenido_hasta >= ahora
+
+    def esta_libre(self, ahora, reserva_id=None, mascara=-1):
+        """
+        Libre para los tramos de `mascara` (-1: todo el viaje). Una retención
+        vencida no cuenta; una vigente solo deja pasar a la reserva que la hizo.
+        """
+        if self.tramos_ocupados & mascara:
+            return False
+        if not (self.tramos_retenidos & mascara) or not self.retencion_vigente(ahora):
+            return True
+        return reserva_id is not None and self.reserva_id == reserva_id
+
+    def calcular_estado(self):
+        if self.tramos_ocupados:
+            return 'Ocupado'
+        return 'Reservado' if self.tramos_retenidos else 'Disponible'
+
+    def __str__(self):
+        return f"Viaje {self.viaje_id} - Asiento {self.asiento_id} ({self.estado})"
+
 """
 class DetalleReserva(models.Model):
     id_detalle = models.BigAutoField(primary_key=True)
@@ -310,12 +485,26 @@ class DetalleReserva(models.Model):
         return f"Detalle #{self.id_detalle} - Reserva #{self.reserva.id_reserva}"
 """
 
+# Sin 0/O ni 1/I para que se pueda dictar por teléfono; 32**10 códigos
+ALFABETO_SEGUIMIENTO = '23456789ABCDEFGHJKLMNPQRSTUVWXYZ'
+
+
+def generar_codigo_seguimiento():
+    return ''.join(secrets.choice(ALFABETO_SEGUIMIENTO) for _ in range(10))
+
+
 class Encomienda(models.Model):
     TIPO_ENVIO_CHOICES = [
         ('sobre', 'Sobre'),
         ('paquete', 'Paquete'),
         ('ambos', 'Ambos'),
     ]
+    ESTADOS = [
+        ('Recibida', 'Recibida'),
+        ('Cargada', 'Cargada'),
+        ('Llegada', 'Llegada'),
+        ('Entregada', 'Entregada'),
+    ]
 
     id_encomienda = models.BigAutoField(primary_key=True)
     viaje = models.ForeignKey(Viaje, on_delete=models.CASCADE)
@@ -330,16 +519,51 @@ class Encomienda(models.Model):
     cantidad_sobre = models.PositiveIntegerField(default=0)
     cantidad_paquete = models.PositiveIntegerField(default=0)
     descripcion = models.TextField(blank=True, null=True)
-    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True, db_index=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
+    # Copia del último EventoEncomienda (ver seguimiento.registrar_evento)
+    codigo_seguimiento = models.CharField(max_length=10, unique=True, default=generar_codigo_seguimiento,
+                                          editable=False)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='Recibida', editable=False)
+    ubicacion = models.ForeignKey(Parada, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                                  related_name='encomiendas_en_parada',
+                                  help_text="Parada del último evento de seguimiento")
+    fecha_estado = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Encomienda"
         verbose_name_plural = "Encomiendas"
+        indexes = [
+            models.Index(fields=['ruc_ci'], name='encomienda_ruc_ci'),
+            models.Index(fields=['numero_contacto'], name='encomienda_numero_contacto'),
+        ]
 
     def __str__(self):
         return f"Encomienda #{self.id_encomienda} - {self.get_tipo_envio_display()}"
 
+class EventoEncomienda(models.Model):
+    """
+    Historial de seguimiento: recibida en la parada de origen, cargada en un
+    viaje, llegada a una parada, entregada. Solo se agregan filas.
+    """
+    encomienda = models.ForeignKey(Encomienda, on_delete=models.CASCADE, related_name='eventos')
+    tipo = models.CharField(max_length=20, choices=Encomienda.ESTADOS)
+    fecha = models.DateTimeField()
+    parada = models.ForeignKey(Parada, on_delete=models.SET_NULL, null=True, blank=True)
+    viaje = models.ForeignKey(Viaje, on_delete=models.SET_NULL, null=True, blank=True)
+    empleado = models.ForeignKey(Empleado, on_delete=models.SET_NULL, null=True, blank=True)
+    observaciones = models.TextField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Evento de Encomienda"
+        verbose_name_plural = "Eventos de Encomiendas"
+        indexes = [
+            models.Index(fields=['encomienda', 'fecha'], name='eventoencomienda_fecha'),
+        ]
+
+    def __str__(self):
+        return f"{self.encomienda_id} - {self.tipo} ({self.fecha:%Y-%m-%d %H:%M})"
+
 class TipoDocumento(models.Model):
     nombre = models.CharField(max_length=50)
     codigo = models.CharField(max_length=10, unique=True)
@@ -362,13 +586,41 @@ class Timbrado(models.Model):
     def __str__(self):
         return self.numero_timbrado
 
+    def vigente(self, fecha):
+        return self.activo and self.fecha_inicio <= fecha <= self.fecha_fin
+
+class PuntoExpedicion(models.Model):
+    """
+    Numerador de facturas de un timbrado: establecimiento (la parada) y
+    punto de expedición (normalmente una caja). Cada punto tiene su propio
+    contador, así los cajeros no compiten por la misma fila al facturar.
+    """
+    timbrado = models.ForeignKey(Timbrado, on_delete=models.CASCADE, related_name='puntos_expedicion')
+    parada = models.ForeignKey(Parada, on_delete=models.CASCADE)
+    caja = models.ForeignKey('Caja', on_delete=models.SET_NULL, null=True, blank=True,
+                             help_text="Vacío: punto compartido por las cajas de la parada")
+    establecimiento = models.CharField(max_length=3, help_text="Código de 3 dígitos, p. ej. 001")
+    punto_expedicion = models.CharField(max_length=3, help_text="Código de 3 dígitos, p. ej. 001")
+    numero_actual = models.PositiveIntegerField(default=0, help_text="Último número emitido")
+    numero_hasta = models.PositiveIntegerField(default=9999999, help_text="Último número autorizado")
+    activo = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "Punto de Expedición"
+        verbose_name_plural = "Puntos de Expedición"
+        unique_together = ('timbrado', 'establecimiento', 'punto_expedicion')
+
+    def __str__(self):
+        return f"{self.establecimiento}-{self.punto_expedicion} ({self.timbrado})"
+
 class CabeceraFactura(models.Model):
     cliente = models.ForeignKey(Cliente, null=True, blank=True, on_delete=models.SET_NULL)
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
     timbrado = models.ForeignKey(Timbrado, on_delete=models.CASCADE)
     parada = models.ForeignKey(Parada, on_delete=models.CASCADE, null=True, blank=True)
-    numero_factura = models.TextField(unique=True)
-    fecha_factura = models.DateField(auto_now_add=True)
+    punto_expedicion = models.ForeignKey(PuntoExpedicion, on_delete=models.PROTECT, null=True, blank=True)
+    numero_factura = models.TextField()
+    fecha_factura = models.DateField(auto_now_add=True, db_index=True)
     condicion = models.CharField(max_length=30, default='Contado')
     monto_total = models.DecimalField(max_digits=10, decimal_places=2)
     monto_exenta = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -380,6 +632,8 @@ class CabeceraFactura(models.Model):
         verbose_name = "Cabecera de Factura"
         verbose_name_plural = "Cabeceras de Facturas"
         ordering = ['-fecha_factura']
+        # Cada timbrado vuelve a numerar desde 1
+        unique_together = ('timbrado', 'numero_factura')
 
     def __str__(self):
         return f"Factura {self.numero_factura}"
@@ -405,7 +659,7 @@ class DetalleFactura(models.Model):
 
 class HistorialFactura(models.Model):
     factura = models.ForeignKey(CabeceraFactura, on_delete=models.CASCADE)
-    fecha_cambio = models.DateTimeField(auto_now_add=True)
+    fecha_cambio = models.DateTimeField(auto_now_add=True, db_index=True)
     campo_modificado = models.CharField(max_length=30)
     valor_anterior = models.TextField(blank=True, null=True)
     valor_nuevo = models.TextField(blank=True, null=True)
@@ -429,13 +683,17 @@ class Caja(models.Model):
         verbose_name = "Caja"
         verbose_name_plural = "Cajas"
         unique_together = ('nombre', 'estado')
+        indexes = [
+            # Solo unas pocas cajas están abiertas a la vez (ver cajas.caja_abierta)
+            models.Index(fields=['estado'], name='caja_abierta', condition=models.Q(estado='Abierta')),
+        ]
 
     def __str__(self):
         return self.nombre
     
 class CabeceraCaja(models.Model):
     tipo_mov = models.CharField(max_length=20)
-    fecha_mov = models.DateTimeField()
+    fecha_mov = models.DateTimeField(db_index=True)
     monto_inical = models.DecimalField(max_digits=12, decimal_places=2)
     monto_final = models.DecimalField(max_digits=12, decimal_places=2)
     caja = models.ForeignKey(Caja, on_delete=models.CASCADE)
@@ -445,6 +703,9 @@ class CabeceraCaja(models.Model):
         verbose_name = "Cabecera de Caja"
         verbose_name_plural = "Cabeceras de Cajas"
         ordering = ['-fecha_mov']
+        indexes = [
+            models.Index(fields=['empleado', 'fecha_mov'], name='cabeceracaja_empleado_fecha'),
+        ]
 
     def __str__(self):
         return f"Movimiento {self.id} - Caja {self.caja.nombre}"
@@ -453,7 +714,7 @@ class DetalleCaja(models.Model):
     descripcion = models.TextField(blank=True, null=True)
     tipo_transaccion = models.CharField(max_length=50)
     monto = models.IntegerField()
-    fecha_transaccion = models.DateTimeField()
+    fecha_transaccion = models.DateTimeField(db_index=True)
     factura = models.ForeignKey(CabeceraFactura, null=True, blank=True, on_delete=models.SET_NULL)
     cabecera_caja = models.ForeignKey(CabeceraCaja, on_delete=models.CASCADE)
 
@@ -466,4 +727,32 @@ class DetalleCaja(models.Model):
         return f"Detalle {self.id} - Caja {self.cabecera_caja.caja.nombre}"
 
 
+class VentaDiaria(models.Model):
+    """
+    Resumen diario de ventas por empresa, ruta y parada de emisión. Se
+    actualiza con cada factura o encomienda (ver ventas_diarias.py) y se
+    concilia de noche con el comando recalcular_ventas_diarias. `clave`
+    identifica la combinación sin depender de cómo la base trate los NULL
+    en las restricciones únicas.
+    """
+    clave = models.CharField(max_length=80, unique=True)
+    fecha = models.DateField()
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, null=True, blank=True)
+    ruta = models.ForeignKey(Ruta, on_delete=models.CASCADE, null=True, blank=True)
+    parada = models.ForeignKey(Parada, on_delete=models.CASCADE, null=True, blank=True)
+    pasajes_vendidos = models.IntegerField(default=0)
+    encomiendas = models.IntegerField(default=0)
+    monto_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    monto_exenta = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    monto_iva_5 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    monto_iva_10 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
+    class Meta:
+        verbose_name = "Venta Diaria"
+        verbose_name_plural = "Ventas Diarias"
+        indexes = [
+            models.Index(fields=['fecha', 'empresa'], name='ventadiaria_fecha_empresa'),
+        ]
+
+    def __str__(self):
+        return f"Ventas {self.fecha} - {self.empresa or 'Sin empresa'} / {self.ruta or 'Sin ruta'}"
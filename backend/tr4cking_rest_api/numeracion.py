@@ -0,0 +1,91 @@
+"""
+Numeración de facturas con el formato 001-001-0000123 (establecimiento,
+punto de expedición y número de 7 dígitos).
+
+El número sale del contador de un PuntoExpedicion, que se bloquea con
+SELECT ... FOR UPDATE solo hasta que termina la transacción de la factura:
+si la factura no se guarda, el contador vuelve atrás y no quedan huecos.
+Como cada caja tiene su propio punto, las cajas no se esperan entre sí.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PuntoExpedicion
+
+
+class NumeracionNoDisponible(Exception):
+    """No se puede numerar: no hay punto de expedición, el timbrado no está vigente o se agotó el rango."""
+
+
+def formatear(punto, numero):
+    return f'{punto.establecimiento}-{punto.punto_expedicion}-{numero:07d}'
+
+
+def punto_para(timbrado, parada, caja=None):
+    """Punto de expedición activo de la caja en esa parada, o el compartido de la parada."""
+    puntos = PuntoExpedicion.objects.filter(
+        timbrado=timbrado, parada=parada, activo=True
+    ).order_by('caja_id', 'pk')
+    if caja is not None:
+        propio = puntos.filter(caja=caja).first()
+        if propio is not None:
+            return propio
+    return puntos.filter(caja__isnull=True).first()
+
+
+def punto_vigente(parada, caja=None, fecha=None):
+    """
+    Punto de expedición de la parada (el de la caja si tiene uno propio)
+    cuyo timbrado está activo y vigente en `fecha`.
+    """
+    fecha = fecha or timezone.localdate()
+    puntos = PuntoExpedicion.objects.filter(
+        parada=parada, activo=True, timbrado__activo=True,
+        timbrado__fecha_inicio__lte=fecha, timbrado__fecha_fin__gte=fecha,
+    ).order_by('-timbrado__fecha_inicio', 'pk')
+    if caja is not None:
+        propio = puntos.filter(caja=caja).first()
+        if propio is not None:
+            return propio
+    return puntos.filter(caja__isnull=True).first()
+
+
+def asignar_numeros(punto, cantidad=1, fecha=None):
+    """
+    Reserva `cantidad` números consecutivos del punto y los devuelve ya
+    formateados. Debe llamarse dentro de la transacción que guarda las
+    facturas para que un error no deje números sin usar.
+    """
+    fecha = fecha or timezone.localdate()
+    with transaction.atomic():
+        punto = (
+            PuntoExpedicion.objects.select_for_update(of=('self',))
+            .select_related('timbrado').get(pk=getattr(punto, 'pk', punto))
+        )
+        if not punto.activo:
+            raise NumeracionNoDisponible(f"El punto de expedición {punto} está inactivo")
+        if not punto.timbrado.vigente(fecha):
+            raise NumeracionNoDisponible(
+                f"El timbrado {punto.timbrado} no está vigente el {fecha:%d/%m/%Y} "
+                f"({punto.timbrado.fecha_inicio:%d/%m/%Y} - {punto.timbrado.fecha_fin:%d/%m/%Y})"
+            )
+        if punto.numero_actual + cantidad > punto.numero_hasta:
+            raise NumeracionNoDisponible(f"Se agotó la numeración autorizada del punto {punto}")
+
+        primero = punto.numero_actual + 1
+        punto.numero_actual += cantidad
+        punto.save(update_fields=['numero_actual'])
+    return punto, [formatear(punto, numero) for numero in range(primero, primero + cantidad)]
+
+
+def numerar_factura(factura, caja=None):
+    """Completa punto_expedicion y numero_factura de una factura sin número."""
+    if factura.parada_id is None:
+        raise NumeracionNoDisponible("La factura necesita una parada para numerarse")
+    punto = factura.punto_expedicion or punto_para(factura.timbrado_id, factura.parada_id, caja)
+    if punto is None:
+        raise NumeracionNoDisponible(
+            "No hay un punto de expedición activo para el timbrado y la parada de la factura"
+        )
+    factura.punto_expedicion, (factura.numero_factura,) = asignar_numeros(punto)
+    return factura.numero_factura
@@ -0,0 +1,22 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacion(CursorPagination):
+    """
+    Paginación por cursor (keyset) por defecto para todos los viewsets.
+
+    El orden sale del atributo `ordering` del viewset (p. ej.
+    ('-fecha_factura', '-id')) y, si no lo define, de la clave primaria
+    descendente. El tamaño de página se toma de REST_FRAMEWORK['PAGE_SIZE']
+    y el cliente puede ajustarlo con ?page_size= hasta `max_page_size`.
+    Las tablas de consulta chicas se excluyen con `pagination_class = None`.
+    """
+    ordering = '-pk'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None)
+        if ordering:
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
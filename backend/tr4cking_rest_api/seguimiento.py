@@ -0,0 +1,91 @@
+"""
+Seguimiento de encomiendas.
+
+Cada paso (recibida, cargada en un viaje, llegada a una parada, entregada)
+se agrega a EventoEncomienda, que nunca se modifica. El último evento se
+copia en la encomienda (estado, ubicacion, fecha_estado), así "¿dónde está
+mi encomienda?" se responde leyendo una fila por su código de seguimiento,
+sin recorrer el historial ni deducirlo de la fecha del viaje.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Encomienda, EventoEncomienda
+
+RECIBIDA, CARGADA, LLEGADA, ENTREGADA = 'Recibida', 'Cargada', 'Llegada', 'Entregada'
+
+# Eventos que pueden seguir a cada estado; Llegada se repite en cada parada
+SIGUIENTES = {
+    RECIBIDA: {CARGADA, ENTREGADA},
+    CARGADA: {LLEGADA},
+    LLEGADA: {CARGADA, LLEGADA, ENTREGADA},
+    ENTREGADA: set(),
+}
+
+
+class EventoInvalido(Exception):
+    """El evento no puede seguir al estado actual de la encomienda."""
+
+
+def _validar(encomienda, tipo, parada_id, viaje_id):
+    if tipo not in SIGUIENTES:
+        raise EventoInvalido(f"Tipo de evento desconocido: {tipo}")
+    if tipo not in SIGUIENTES[encomienda.estado]:
+        raise EventoInvalido(f"Una encomienda {encomienda.estado.lower()} no puede pasar a {tipo.lower()}")
+    if tipo == CARGADA and viaje_id is None:
+        raise EventoInvalido("Indique el viaje en que se cargó")
+    if tipo in (LLEGADA, ENTREGADA) and parada_id is None:
+        raise EventoInvalido("Indique la parada")
+    if tipo in (CARGADA, ENTREGADA) and parada_id != encomienda.ubicacion_id:
+        raise EventoInvalido("La encomienda no está en esa parada")
+
+
+def registrar_evento(encomienda, tipo, parada=None, viaje=None, empleado=None, observaciones=None, fecha=None):
+    """
+    Agrega el evento y actualiza el estado de la encomienda. Se carga y se
+    entrega donde está la encomienda, así que sin parada se usa esa; sin
+    viaje, el de la encomienda.
+    """
+    with transaction.atomic():
+        # Bloqueada: dos eventos simultáneos no pueden saltearse la validación
+        encomienda = Encomienda.objects.select_for_update().get(pk=encomienda.pk)
+        viaje_id = viaje.pk if viaje is not None else encomienda.viaje_id if tipo in (CARGADA, LLEGADA) else None
+        if parada is not None:
+            parada_id = parada.pk
+        else:
+            parada_id = encomienda.ubicacion_id if tipo in (CARGADA, ENTREGADA) else None
+        _validar(encomienda, tipo, parada_id, viaje_id)
+        evento = EventoEncomienda.objects.create(
+            encomienda=encomienda, tipo=tipo, fecha=fecha or timezone.now(), parada_id=parada_id,
+            viaje_id=viaje_id, empleado=empleado, observaciones=observaciones,
+        )
+        # update() y no save(): el estado no mueve las ventas del día (ver signals)
+        Encomienda.objects.filter(pk=encomienda.pk).update(
+            estado=tipo, ubicacion_id=parada_id, fecha_estado=evento.fecha
+        )
+    return evento
+
+
+def registrar_recepcion(encomienda):
+    """Primer evento: recibida en la parada de origen al crearse."""
+    evento = EventoEncomienda.objects.create(
+        encomienda=encomienda, tipo=RECIBIDA, fecha=encomienda.fecha_creacion or timezone.now(),
+        parada_id=encomienda.origen_id,
+    )
+    Encomienda.objects.filter(pk=encomienda.pk).update(
+        estado=RECIBIDA, ubicacion_id=encomienda.origen_id, fecha_estado=evento.fecha
+    )
+    encomienda.estado, encomienda.ubicacion_id, encomienda.fecha_estado = RECIBIDA, encomienda.origen_id, evento.fecha
+    return evento
+
+
+def rastrear(codigo):
+    """
+    Encomienda por su código (sin distinguir mayúsculas), con sus paradas
+    en la misma consulta; None si no existe.
+    """
+    return (
+        Encomienda.objects.select_related('origen', 'destino', 'ubicacion')
+        .filter(codigo_seguimiento=codigo.strip().upper())
+        .first()
+    )
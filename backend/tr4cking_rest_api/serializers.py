@@ -1,18 +1,87 @@
 # serializers.py
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
 from django.contrib.auth.models import Group, Permission
 from .models import (
     Persona, UsuarioPersona, Cliente, Pasajero, Empresa,
     Empleado, Localidad, Parada, Bus, Asiento, Ruta, DetalleRuta,
     Viaje, Pasaje, Reserva, Encomienda, TipoDocumento, Timbrado,
     CabeceraFactura, DetalleFactura, HistorialFactura, Caja,
-    CabeceraCaja, DetalleCaja
+    CabeceraCaja, DetalleCaja, AsientoViaje, PuntoExpedicion, EventoEncomienda, Horario,
+    MAX_PARADAS_RUTA,
 )
+from .inventario import AsientoNoDisponible, mascara_pasaje
+from .asientos import plantillas
+from .tramos import MASCARA_VIAJE, resolver_tramo
+from .numeracion import NumeracionNoDisponible, numerar_factura
+from .cajas import caja_abierta
+from .instrumentacion import serializando
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+
+def _rutas_param(request, nombre):
+    """'a,b.c' -> {('a',), ('b', 'c')}"""
+    valor = request.query_params.get(nombre, '') if request is not None else ''
+    return {tuple(parte.split('.')) for parte in valor.split(',') if parte.strip()}
+
+
+class CamposDinamicosMixin:
+    """
+    Campos a pedido en las lecturas:
+
+    - ?fields=id_viaje,fecha,ruta_details.nombre  limita los campos devueltos
+      (con puntos para los serializers anidados).
+    - ?expand=viaje_details  junto con ?fields=, agrega esos bloques anidados
+      completos sin tener que nombrarlos en ?fields=.
+    - ?omit=detalles,viaje_details.ruta_details  quita esos campos.
+
+    Sin parámetros (y sin request en el contexto) se devuelven todos los
+    campos, con los bloques anidados como siempre.
+    Como el plan de consultas se deriva de los campos que quedan, lo que no
+    se pide tampoco se une ni se precarga.
+    """
+
+    def _ruta(self):
+        ruta, nodo = [], self
+        while nodo.parent is not None:
+            if nodo.field_name:
+                ruta.append(nodo.field_name)
+            nodo = nodo.parent
+        return tuple(reversed(ruta))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return fields
+
+        ruta = self._ruta()
+        nivel = len(ruta)
+
+        def propios(parametro):
+            return {r for r in _rutas_param(request, parametro) if r[:nivel] == ruta and len(r) > nivel}
+
+        solo = {r[nivel] for r in propios('fields')}
+        if solo:
+            solo |= {r[nivel] for r in propios('expand')}
+        omitir = {r[nivel] for r in propios('omit') if len(r) == nivel + 1}
+
+        for nombre in list(fields):
+            if nombre in omitir or (solo and nombre not in solo):
+                del fields[nombre]
+        return fields
+
+    def to_representation(self, instance):
+        # Tiempo de serialización del request (ver instrumentacion)
+        with serializando():
+            return super().to_representation(instance)
+
+
+class UserSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
     groups = serializers.PrimaryKeyRelatedField(
         many=True, 
@@ -58,22 +127,27 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Group
         fields = '__all__'
 
-class PermissionSerializer(serializers.ModelSerializer):
+class PermissionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Permission
         fields = '__all__'
 
-class PersonaSerializer(serializers.ModelSerializer):
+class PersonaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Persona
         fields = ['cedula', 'nombre', 'apellido', 'telefono', 'direccion']
 
-class UsuarioPersonaSerializer(serializers.ModelSerializer):
+class ImportacionPersonasSerializer(serializers.Serializer):
+    archivo = serializers.FileField(help_text="CSV o XLSX con cedula, nombre, apellido, telefono y direccion")
+    clientes = serializers.BooleanField(default=False, help_text="Crear el cliente de cada persona")
+    pasajeros = serializers.BooleanField(default=False, help_text="Crear el pasajero de cada persona")
+
+class UsuarioPersonaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     user_details = UserSerializer(source='user', read_only=True)
     persona_details = PersonaSerializer(source='cedula', read_only=True)
 
@@ -81,7 +155,7 @@ class UsuarioPersonaSerializer(serializers.ModelSerializer):
         model = UsuarioPersona
         fields = ['user', 'cedula', 'user_details', 'persona_details']
 
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     persona_details = PersonaSerializer(source='cedula', read_only=True)
 
     class Meta:
@@ -89,7 +163,7 @@ class ClienteSerializer(serializers.ModelSerializer):
         fields = ['id_cliente', 'cedula', 'dv', 'razon_social', 'fecha_registro', 'persona_details']
         read_only_fields = ('fecha_registro',)
 
-class PasajeroSerializer(serializers.ModelSerializer):
+class PasajeroSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     persona_nombre = serializers.CharField(source='persona.nombre', read_only=True)
     persona_details = PersonaSerializer(source='cedula', read_only=True)
 
@@ -102,12 +176,12 @@ class PasajeroSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El asiento no está disponible")
         return value
 
-class EmpresaSerializer(serializers.ModelSerializer):
+class EmpresaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Empresa
         fields = ['id_empresa', 'nombre', 'ruc', 'telefono', 'email', 'direccion_legal']
 
-class EmpleadoSerializer(serializers.ModelSerializer):
+class EmpleadoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     persona_nombre = serializers.CharField(source='cedula.nombre', read_only=True)
     persona_details = PersonaSerializer(source='cedula', read_only=True)
 
@@ -117,67 +191,114 @@ class EmpleadoSerializer(serializers.ModelSerializer):
                   'empresa', 'cargo', 'fecha_ingreso']
 
 
-class LocalidadSerializer(serializers.ModelSerializer):
+class LocalidadSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Localidad
         fields = ['id_localidad', 'nombre', 'coordenadas']
 
-class ParadaSerializer(serializers.ModelSerializer):
+class ParadaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     localidad_nombre = serializers.CharField(source='localidad.nombre', read_only=True)
 
     class Meta:
         model = Parada
         fields = ['id_parada', 'localidad', 'localidad_nombre', 'nombre', 'direccion', 'coordenadas', 'activo']
 
-class BusSerializer(serializers.ModelSerializer):
+class BusSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     empresa_nombre = serializers.CharField(source='empresa.nombre', read_only=True)
 
     class Meta:
         model = Bus
-        fields = ['id_bus', 'placa', 'marca', 'modelo', 'capacidad', 'estado', 'empresa', 'empresa_nombre']
+        fields = ['id_bus', 'placa', 'marca', 'modelo', 'capacidad', 'estado', 'empresa', 'empresa_nombre',
+                  'plantilla_asientos']
 
-class AsientoSerializer(serializers.ModelSerializer):
+    def validate_plantilla_asientos(self, value):
+        if value not in plantillas():
+            raise serializers.ValidationError(f"Plantilla desconocida. Opciones: {', '.join(plantillas())}")
+        return value
+
+class AsientoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     bus_placa = serializers.CharField(source='bus.placa', read_only=True)
 
     class Meta:
         model = Asiento
-        fields = ['id_asiento', 'bus', 'bus_placa', 'numero_asiento', 'estado', 'tipo_asiento']
+        fields = ['id_asiento', 'bus', 'bus_placa', 'numero_asiento', 'piso', 'estado', 'tipo_asiento']
 
-class DetalleRutaSerializer(serializers.ModelSerializer):
+class DetalleRutaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     parada = ParadaSerializer(read_only=True)  # Include full parada details
 
     class Meta:
         model = DetalleRuta
         fields = ['ruta', 'parada', 'hora_salida', 'orden']
 
-class RutaSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        ruta = attrs.get('ruta')
+        otras = DetalleRuta.objects.filter(ruta=ruta).exclude(pk=getattr(self.instance, 'pk', None))
+        if ruta is not None and otras.count() >= MAX_PARADAS_RUTA:
+            raise serializers.ValidationError(f"Una ruta admite hasta {MAX_PARADAS_RUTA} paradas")
+        return attrs
+
+class RutaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     detalles = DetalleRutaSerializer(many=True, read_only=True, source='detalleruta_set')
 
     class Meta:
         model = Ruta
         fields = ['id_ruta', 'nombre', 
-                 'activo', 'fecha_actualizacion', 'detalles']
+                 'activo', 'precio_base', 'fecha_actualizacion', 'detalles']
         read_only_fields = ('fecha_actualizacion',)
-"""
-class HorarioSerializer(serializers.ModelSerializer):
+
+class HorarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     ruta_details = RutaSerializer(source='ruta', read_only=True)
 
     class Meta:
         model = Horario
-        fields = ['id_horario', 'ruta', 'ruta_details', 'hora_salida', 'dias_semana', 'activo']
-"""
-class ViajeSerializer(serializers.ModelSerializer):
+        fields = ['id_horario', 'ruta', 'ruta_details', 'hora_salida', 'dias_semana', 'buses',
+                  'vigente_desde', 'vigente_hasta', 'activo']
+
+    def validate_dias_semana(self, value):
+        if len(value) != 7 or set(value) - {'0', '1'}:
+            raise serializers.ValidationError("Siete caracteres 0 o 1, de lunes a domingo")
+        return value
+
+    def validate(self, attrs):
+        desde = attrs.get('vigente_desde', getattr(self.instance, 'vigente_desde', None))
+        hasta = attrs.get('vigente_hasta', getattr(self.instance, 'vigente_hasta', None))
+        if desde and hasta and hasta < desde:
+            raise serializers.ValidationError("vigente_hasta no puede ser anterior a vigente_desde")
+        return attrs
+
+class GeneracionViajesSerializer(serializers.Serializer):
+    desde = serializers.DateField(default=timezone.localdate)
+    hasta = serializers.DateField()
+    horarios = serializers.PrimaryKeyRelatedField(
+        queryset=Horario.objects.all(), many=True, required=False,
+        help_text="Vacío: todos los horarios activos"
+    )
+
+    def validate(self, attrs):
+        if attrs['hasta'] < attrs['desde']:
+            raise serializers.ValidationError("hasta no puede ser anterior a desde")
+        if (attrs['hasta'] - attrs['desde']).days >= 366:
+            raise serializers.ValidationError("El período no puede superar un año")
+        return attrs
+
+class AsignacionBusesSerializer(serializers.Serializer):
+    fecha = serializers.DateField()
+    empresa = serializers.PrimaryKeyRelatedField(
+        queryset=Empresa.objects.all(), required=False, allow_null=True, help_text="Vacío: todas las empresas"
+    )
+
+class ViajeSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     ruta_details = RutaSerializer(source='ruta', read_only=True)
     bus_details = BusSerializer(source='bus', read_only=True)
     bus_placa = serializers.CharField(source='bus.placa', read_only=True)
 
     class Meta:
         model = Viaje
-        fields = ['id_viaje', 'ruta', 'ruta_details', 'bus', 'bus_placa', 
+        fields = ['id_viaje', 'horario', 'ruta', 'ruta_details', 'bus', 'bus_placa', 
                  'bus_details', 'fecha', 'activo', 'observaciones']
 
 
-class ReservaSerializer(serializers.ModelSerializer):
+class ReservaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     cliente_details = ClienteSerializer(source='cliente', read_only=True)
 
     class Meta:
@@ -186,18 +307,127 @@ class ReservaSerializer(serializers.ModelSerializer):
                   'estado', 'fecha_reserva']
         read_only_fields = ('fecha_reserva',)
 
-class PasajeSerializer(serializers.ModelSerializer):
+class PasajeSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     reserva_details = ReservaSerializer(source='reserva', read_only=True)
     viaje_details = ViajeSerializer(source='viaje', read_only=True)
     asiento_details = AsientoSerializer(source='asiento', read_only=True)
     pasajero_details = PasajeroSerializer(source='pasajero', read_only=True)
-    origen = serializers.CharField(source='viaje.ruta.detalleruta.parada.nombre', read_only=True)
-    destino = serializers.CharField(source='viaje.ruta.detalleruta.parada.nombre', read_only=True)
+    origen_nombre = serializers.CharField(source='origen.nombre', read_only=True, default=None)
+    destino_nombre = serializers.CharField(source='destino.nombre', read_only=True, default=None)
 
     class Meta:
         model = Pasaje
         fields = ['id_pasaje','reserva', 'reserva_details', 'viaje', 'viaje_details', 'asiento', 
-                 'asiento_details', 'pasajero', 'pasajero_details', 'origen', 'destino']
+                 'asiento_details', 'pasajero', 'pasajero_details', 'origen', 'origen_nombre',
+                 'destino', 'destino_nombre']
+
+    def validate(self, attrs):
+        viaje = attrs.get('viaje', getattr(self.instance, 'viaje', None))
+        asiento = attrs.get('asiento', getattr(self.instance, 'asiento', None))
+        reserva = attrs.get('reserva', getattr(self.instance, 'reserva', None))
+        if asiento.bus_id != viaje.bus_id:
+            raise serializers.ValidationError({'asiento': "El asiento no pertenece al bus del viaje"})
+        origen = attrs.get('origen', getattr(self.instance, 'origen', None))
+        destino = attrs.get('destino', getattr(self.instance, 'destino', None))
+        tramo = resolver_tramo(viaje.ruta_id, getattr(origen, 'pk', None), getattr(destino, 'pk', None))
+        if tramo is not None:
+            attrs['origen'], attrs['destino'] = tramo.origen, tramo.destino
+            mascara = tramo.mascara
+        elif origen is None and destino is None:
+            mascara = MASCARA_VIAJE  # Ruta sin tramos: como en mascara_de, ocupa todo el viaje
+        else:
+            raise serializers.ValidationError(
+                "El origen y el destino deben ser paradas de la ruta del viaje, en ese orden"
+            )
+        fila = AsientoViaje.objects.filter(viaje=viaje, asiento=asiento).first()
+        if fila is not None and self.instance is not None and \
+                (self.instance.viaje_id, self.instance.asiento_id) == (viaje.pk, asiento.pk):
+            fila.tramos_ocupados &= ~mascara_pasaje(self.instance)  # Sus propios tramos no cuentan
+        if fila is None or not fila.esta_libre(timezone.now(), getattr(reserva, 'pk', None), mascara):
+            raise serializers.ValidationError({'asiento': "El asiento no está disponible para este viaje"})
+        return attrs
+
+    def create(self, validated_data):
+        # La señal post_save ocupa el asiento en el inventario del viaje;
+        # si otro pasaje lo tomó entre validate y save se revierte todo.
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except AsientoNoDisponible:
+            raise serializers.ValidationError({'asiento': "El asiento no está disponible para este viaje"})
+
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except AsientoNoDisponible:
+            raise serializers.ValidationError({'asiento': "El asiento no está disponible para este viaje"})
+
+
+class AsientoViajeSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    numero_asiento = serializers.IntegerField(source='asiento.numero_asiento', read_only=True)
+    tipo_asiento = serializers.CharField(source='asiento.tipo_asiento', read_only=True)
+    estado = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AsientoViaje
+        fields = ['id_asiento_viaje', 'viaje', 'asiento', 'numero_asiento', 'tipo_asiento',
+                  'estado', 'retenido_hasta', 'reserva']
+
+    def get_estado(self, obj):
+        # Estado para el tramo pedido (context['mascara']); una retención vencida se muestra como disponible
+        mascara = self.context.get('mascara', MASCARA_VIAJE)
+        if obj.tramos_ocupados & mascara:
+            return 'Ocupado'
+        return 'Disponible' if obj.esta_libre(timezone.now(), mascara=mascara) else 'Reservado'
+
+class PasajeReservaSerializer(serializers.Serializer):
+    pasajero = serializers.IntegerField()
+    asiento = serializers.IntegerField()
+
+class ReservaMasivaSerializer(serializers.Serializer):
+    reserva = serializers.PrimaryKeyRelatedField(queryset=Reserva.objects.all(), required=False)
+    cliente = serializers.PrimaryKeyRelatedField(queryset=Cliente.objects.all(), required=False)
+    origen = serializers.IntegerField(required=False)
+    destino = serializers.IntegerField(required=False)
+    pasajes = PasajeReservaSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        if not attrs.get('reserva') and not attrs.get('cliente'):
+            raise serializers.ValidationError("Debe indicar una reserva o un cliente")
+        # Una sola consulta para todos los pasajeros del grupo
+        pedidos = {pasaje['pasajero'] for pasaje in attrs['pasajes']}
+        existentes = set(Pasajero.objects.filter(pk__in=pedidos).values_list('pk', flat=True))
+        if pedidos - existentes:
+            raise serializers.ValidationError({'pasajes': f"Pasajeros inexistentes: {sorted(pedidos - existentes)}"})
+        return attrs
+
+class BusquedaViajeSerializer(serializers.Serializer):
+    origen = serializers.IntegerField()
+    destino = serializers.IntegerField()
+    fecha = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['origen'] == attrs['destino']:
+            raise serializers.ValidationError("El origen y el destino deben ser distintos")
+        return attrs
+
+class BusquedaPersonaSerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=100, help_text="Nombre, apellido, razón social o cédula")
+    limite = serializers.IntegerField(
+        min_value=1, default=lambda: getattr(settings, 'TR4CKING_BUSQUEDA_PERSONAS_LIMITE', 10)
+    )
+
+    def validate_limite(self, value):
+        return min(value, getattr(settings, 'TR4CKING_BUSQUEDA_PERSONAS_MAXIMO', 50))
+
+class RetencionAsientosSerializer(serializers.Serializer):
+    asientos = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    reserva = serializers.PrimaryKeyRelatedField(queryset=Reserva.objects.all())
+    minutos = serializers.IntegerField(min_value=1, max_value=120, required=False)
+    origen = serializers.IntegerField(required=False)
+    destino = serializers.IntegerField(required=False)
+
 """
 class DetalleReservaSerializer(serializers.ModelSerializer):
     reserva_details = CabeceraReservaSerializer(source='reserva', read_only=True)
@@ -210,7 +440,7 @@ class DetalleReservaSerializer(serializers.ModelSerializer):
 """
 
 
-class EncomiendaSerializer(serializers.ModelSerializer):
+class EncomiendaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     cliente_details = ClienteSerializer(source='cliente', read_only=True)
     viaje_details = ViajeSerializer(source='viaje', read_only=True)
     origen_details = ParadaSerializer(source='origen', read_only=True)
@@ -222,45 +452,134 @@ class EncomiendaSerializer(serializers.ModelSerializer):
                  'origen', 'origen_details', 'destino', 'destino_details', 'flete',
                  'remitente', 'ruc_ci', 'numero_contacto', 'tipo_envio',
                  'cantidad_sobre', 'cantidad_paquete', 'descripcion',
-                 'fecha_creacion', 'fecha_actualizacion']
+                 'fecha_creacion', 'fecha_actualizacion',
+                 'codigo_seguimiento', 'estado', 'ubicacion', 'fecha_estado']
         read_only_fields = ('fecha_creacion', 'fecha_actualizacion')
 
-class TipoDocumentoSerializer(serializers.ModelSerializer):
+class EventoEncomiendaSerializer(serializers.ModelSerializer):
+    parada_nombre = serializers.CharField(source='parada.nombre', read_only=True)
+    fecha = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = EventoEncomienda
+        fields = ['id', 'tipo', 'fecha', 'parada', 'parada_nombre', 'viaje', 'empleado', 'observaciones']
+
+class EventoRastreoSerializer(serializers.ModelSerializer):
+    parada = serializers.CharField(source='parada.nombre', default=None)
+
+    class Meta:
+        model = EventoEncomienda
+        fields = ['tipo', 'fecha', 'parada']
+
+class RastreoEncomiendaSerializer(serializers.ModelSerializer):
+    """Lo que ve quien tiene el código: sin datos del remitente ni del cliente."""
+    origen = serializers.CharField(source='origen.nombre')
+    destino = serializers.CharField(source='destino.nombre')
+    ubicacion = serializers.CharField(source='ubicacion.nombre', default=None)
+
+    class Meta:
+        model = Encomienda
+        fields = ['codigo_seguimiento', 'estado', 'fecha_estado', 'ubicacion', 'origen', 'destino',
+                  'tipo_envio', 'fecha_creacion']
+
+class TipoDocumentoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = TipoDocumento
         fields = '__all__'
 
-class TimbradoSerializer(serializers.ModelSerializer):
+class TimbradoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Timbrado
         fields = '__all__'
 
-class CabeceraFacturaSerializer(serializers.ModelSerializer):
+class PuntoExpedicionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PuntoExpedicion
+        fields = '__all__'
+
+class CabeceraFacturaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = CabeceraFactura
         fields = '__all__'
+        read_only_fields = ('punto_expedicion',)
+        extra_kwargs = {'numero_factura': {'required': False}}
+        validators = []  # El número puede venir vacío; la unicidad se valida en validate()
+
+    def validate(self, attrs):
+        if self.instance is None and caja_abierta(self.context.get('request'), empleado_id=attrs['empleado'].pk) is None:
+            raise serializers.ValidationError("No se puede crear una factura sin una caja abierta")
+        timbrado = attrs.get('timbrado', getattr(self.instance, 'timbrado', None))
+        numero = attrs.get('numero_factura')
+        if numero and CabeceraFactura.objects.filter(timbrado=timbrado, numero_factura=numero).exclude(
+            pk=getattr(self.instance, 'pk', None)
+        ).exists():
+            raise serializers.ValidationError({'numero_factura': "Ya existe una factura con este número para el timbrado"})
+        return attrs
 
-class DetalleFacturaSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        # Sin número se toma el siguiente del punto de expedición de la caja
+        # (o el compartido de la parada), como en emitir_factura
+        with transaction.atomic():
+            if not validated_data.get('numero_factura'):
+                factura = CabeceraFactura(**validated_data)
+                caja = caja_abierta(self.context.get('request'), empleado_id=validated_data['empleado'].pk)
+                try:
+                    numerar_factura(factura, caja)
+                except NumeracionNoDisponible as e:
+                    raise serializers.ValidationError({'numero_factura': [str(e)]})
+                validated_data['numero_factura'] = factura.numero_factura
+                validated_data['punto_expedicion'] = factura.punto_expedicion
+            return super().create(validated_data)
+
+class DetalleFacturaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = DetalleFactura
         fields = '__all__'
 
-class HistorialFacturaSerializer(serializers.ModelSerializer):
+class EmisionFacturaSerializer(serializers.Serializer):
+    empleado = serializers.PrimaryKeyRelatedField(queryset=Empleado.objects.all())
+    parada = serializers.PrimaryKeyRelatedField(queryset=Parada.objects.all())
+    cliente = serializers.PrimaryKeyRelatedField(queryset=Cliente.objects.all(), required=False, allow_null=True)
+    caja = serializers.PrimaryKeyRelatedField(queryset=Caja.objects.all(), required=False)
+    timbrado = serializers.PrimaryKeyRelatedField(queryset=Timbrado.objects.all(), required=False)
+    condicion = serializers.CharField(max_length=30, default='Contado')
+    pasajes = serializers.ListField(child=serializers.IntegerField(), default=list)
+    encomiendas = serializers.ListField(child=serializers.IntegerField(), default=list)
+
+    def validate(self, attrs):
+        if not attrs['pasajes'] and not attrs['encomiendas']:
+            raise serializers.ValidationError("Indique al menos un pasaje o una encomienda")
+        return attrs
+
+class HistorialFacturaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = HistorialFactura
         fields = '__all__'
 
-class CajaSerializer(serializers.ModelSerializer):
+class CajaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Caja
         fields = '__all__'
 
-class CabeceraCajaSerializer(serializers.ModelSerializer):
+class CabeceraCajaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = CabeceraCaja
         fields = '__all__'
+        # Saldo corriente: lo mueven los DetalleCaja de la sesión
+        read_only_fields = ('monto_final',)
+
+    def create(self, validated_data):
+        validated_data['monto_final'] = validated_data['monto_inical']
+        return super().create(validated_data)
+
+class CierreCajaSerializer(serializers.Serializer):
+    empleado = serializers.PrimaryKeyRelatedField(queryset=Empleado.objects.all())
+    monto_contado = serializers.DecimalField(
+        max_digits=12, decimal_places=2, required=False, allow_null=True,
+        help_text="Efectivo contado en el arqueo; vacío cierra con el saldo calculado"
+    )
 
-class DetalleCajaSerializer(serializers.ModelSerializer):
+class DetalleCajaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = DetalleCaja
         fields = '__all__'
\ No newline at end of file
@@ -1,30 +1,175 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import Bus, Asiento, Pasaje
+from django.utils import timezone
+from .models import (
+    Bus, Asiento, Viaje, Pasaje, Ruta, DetalleRuta, Empresa, Localidad, Parada, TipoDocumento,
+    CabeceraFactura, DetalleFactura, Encomienda, Caja, CabeceraCaja, DetalleCaja
+)
+from .inventario import (
+    generar_inventario, confirmar_asientos, desocupar_asientos, agregar_asientos_a_viajes,
+    mascara_pasaje, recalcular_ocupacion
+)
+from .asientos import sincronizar_asientos
+from .tramos import reconstruir_tramos
+from .cache_catalogos import invalidar
+from .cajas import aporte, invalidar_cajas_abiertas, mover_saldo
+from .seguimiento import registrar_recepcion
+from . import ventas_diarias
 
 
 
 @receiver(post_save, sender=Bus)
 def crear_asientos(sender, instance, created, **kwargs):
-    if created:  # Solo cuando se crea un nuevo bus
-        for i in range(1, instance.capacidad + 1):
-            Asiento.objects.create(
-                bus=instance,
-                numero_asiento=i,
-                estado='Disponible',
-                tipo_asiento='Semi-cama'  # O podrías variar según alguna lógica
-            )
-
-# Las señales existentes de Pasaje se mantienen aquí también
+    # Al crear el bus o cambiar su capacidad se generan solo los asientos faltantes
+    sincronizar_asientos(instance)
+
+# Tramos materializados de cada ruta
+@receiver(post_save, sender=DetalleRuta)
+@receiver(post_delete, sender=DetalleRuta)
+def actualizar_tramos_detalle(sender, instance, **kwargs):
+    actualizar_tramos(instance.ruta_id)
+
+@receiver(post_save, sender=Ruta)
+def actualizar_tramos_ruta(sender, instance, **kwargs):
+    actualizar_tramos(instance.pk)
+
+def actualizar_tramos(ruta_id):
+    if reconstruir_tramos(ruta_id):
+        # Los bits de ocupación de los viajes pendientes cambiaron de significado
+        recalcular_ocupacion(Viaje.objects.filter(ruta_id=ruta_id, fecha__gte=timezone.localdate()))
+
+# Inventario de asientos por viaje
+@receiver(post_save, sender=Viaje)
+def crear_inventario_viaje(sender, instance, **kwargs):
+    generar_inventario(instance)
+
+@receiver(post_save, sender=Asiento)
+def agregar_asiento_a_viajes(sender, instance, created, **kwargs):
+    if created:  # Un asiento nuevo se suma a los viajes pendientes de su bus
+        agregar_asientos_a_viajes(instance.bus_id, [instance.pk])
+
+@receiver(pre_save, sender=Pasaje)
+def recordar_ocupacion_anterior(sender, instance, **kwargs):
+    # Tramos que ocupaba el pasaje antes de editarlo, para devolverlos en post_save
+    anterior = Pasaje.objects.filter(pk=instance.pk).select_related('viaje').first() if instance.pk else None
+    instance._ocupacion_anterior = (
+        (anterior.viaje_id, anterior.asiento_id, mascara_pasaje(anterior)) if anterior else None
+    )
+
 @receiver(post_save, sender=Pasaje)
 def actualizar_estado_asiento(sender, instance, created, **kwargs):
-    if created:
-        asiento = instance.asiento
-        asiento.estado = 'Ocupado'
-        asiento.save()
+    with transaction.atomic():
+        anterior = getattr(instance, '_ocupacion_anterior', None)
+        if anterior:
+            viaje_id, asiento_id, mascara = anterior
+            desocupar_asientos(viaje_id, {asiento_id: mascara})
+        confirmar_asientos(instance.viaje_id, {instance.asiento_id: mascara_pasaje(instance)}, instance.reserva_id)
 
 @receiver(post_delete, sender=Pasaje)
 def restaurar_estado_asiento(sender, instance, **kwargs):
-    asiento = instance.asiento
-    asiento.estado = 'Disponible'
-    asiento.save()
\ No newline at end of file
+    desocupar_asientos(instance.viaje_id, {instance.asiento_id: mascara_pasaje(instance)})
+
+# Versiones del cache de catálogos; se invalida al confirmar la transacción
+# para que una lectura concurrente no guarde datos viejos con la versión nueva
+def invalidar_catalogo(sender, **kwargs):
+    transaction.on_commit(lambda: invalidar(sender))
+
+for modelo in (Empresa, Localidad, Parada, Ruta, DetalleRuta, TipoDocumento):
+    post_save.connect(invalidar_catalogo, sender=modelo, dispatch_uid=f'cache_{modelo._meta.model_name}_save')
+    post_delete.connect(invalidar_catalogo, sender=modelo, dispatch_uid=f'cache_{modelo._meta.model_name}_delete')
+
+# Caja abierta de cada empleado/terminal (cajas.py): abrir, cerrar o mover una
+# caja cambia la respuesta
+@receiver(post_save, sender=Caja, dispatch_uid='caja_abierta_caja_save')
+@receiver(post_delete, sender=Caja, dispatch_uid='caja_abierta_caja_delete')
+@receiver(post_save, sender=CabeceraCaja, dispatch_uid='caja_abierta_cabeceracaja_save')
+@receiver(post_delete, sender=CabeceraCaja, dispatch_uid='caja_abierta_cabeceracaja_delete')
+def invalidar_caja_abierta(sender, **kwargs):
+    transaction.on_commit(invalidar_cajas_abiertas)
+
+# Resumen diario de ventas: se guarda el aporte de la fila antes del cambio
+# y después se suma solo la diferencia
+@receiver(pre_save, sender=DetalleFactura)
+@receiver(pre_delete, sender=DetalleFactura)
+def recordar_venta_linea(sender, instance, **kwargs):
+    instance._ventas_anteriores = (
+        ventas_diarias.aportes_lineas(DetalleFactura.objects.filter(pk=instance.pk)) if instance.pk else {}
+    )
+
+@receiver(post_save, sender=DetalleFactura)
+def actualizar_venta_linea(sender, instance, **kwargs):
+    ventas_diarias.aplicar(
+        ventas_diarias.aportes_lineas(DetalleFactura.objects.filter(pk=instance.pk)), instance._ventas_anteriores
+    )
+
+@receiver(post_delete, sender=DetalleFactura)
+def descontar_venta_linea(sender, instance, **kwargs):
+    ventas_diarias.aplicar({}, getattr(instance, '_ventas_anteriores', {}))
+
+@receiver(pre_save, sender=CabeceraFactura)
+def recordar_venta_factura(sender, instance, **kwargs):
+    # Anular la factura o cambiarle la parada mueve todas sus líneas
+    instance._ventas_anteriores = (
+        ventas_diarias.aportes_lineas(DetalleFactura.objects.filter(factura_id=instance.pk)) if instance.pk else {}
+    )
+
+@receiver(post_save, sender=CabeceraFactura)
+def actualizar_venta_factura(sender, instance, created, **kwargs):
+    if not created:
+        ventas_diarias.aplicar(
+            ventas_diarias.aportes_lineas(DetalleFactura.objects.filter(factura_id=instance.pk)),
+            instance._ventas_anteriores
+        )
+
+@receiver(pre_save, sender=Encomienda)
+@receiver(pre_delete, sender=Encomienda)
+def recordar_venta_encomienda(sender, instance, **kwargs):
+    instance._ventas_anteriores = (
+        ventas_diarias.aportes_encomiendas(Encomienda.objects.filter(pk=instance.pk)) if instance.pk else {}
+    )
+
+@receiver(post_save, sender=Encomienda)
+def actualizar_venta_encomienda(sender, instance, **kwargs):
+    ventas_diarias.aplicar(
+        ventas_diarias.aportes_encomiendas(Encomienda.objects.filter(pk=instance.pk)), instance._ventas_anteriores
+    )
+
+@receiver(post_save, sender=Encomienda)
+def recibir_encomienda(sender, instance, created, **kwargs):
+    # Primer evento de seguimiento; las cargadas con bulk_create no lo tienen
+    if created:
+        registrar_recepcion(instance)
+
+@receiver(post_delete, sender=Encomienda)
+def descontar_venta_encomienda(sender, instance, **kwargs):
+    ventas_diarias.aplicar({}, getattr(instance, '_ventas_anteriores', {}))
+
+# Saldo corriente de la sesión de caja: cada movimiento suma (o resta) su
+# diferencia con F(), sin volver a sumar el turno
+@receiver(pre_save, sender=DetalleCaja)
+@receiver(pre_delete, sender=DetalleCaja)
+def recordar_movimiento_caja(sender, instance, **kwargs):
+    anterior = (
+        DetalleCaja.objects.filter(pk=instance.pk).values('cabecera_caja_id', 'tipo_transaccion', 'monto').first()
+        if instance.pk else None
+    )
+    instance._saldo_anterior = (
+        (anterior['cabecera_caja_id'], aporte(anterior['tipo_transaccion'], anterior['monto'])) if anterior else None
+    )
+
+@receiver(post_save, sender=DetalleCaja)
+def actualizar_saldo_caja(sender, instance, **kwargs):
+    with transaction.atomic():
+        anterior = getattr(instance, '_saldo_anterior', None)
+        nuevo = aporte(instance.tipo_transaccion, instance.monto)
+        if anterior and anterior[0] != instance.cabecera_caja_id:
+            mover_saldo(anterior[0], -anterior[1])
+            anterior = None
+        mover_saldo(instance.cabecera_caja_id, nuevo - (anterior[1] if anterior else 0))
+
+@receiver(post_delete, sender=DetalleCaja)
+def descontar_saldo_caja(sender, instance, **kwargs):
+    anterior = getattr(instance, '_saldo_anterior', None)
+    if anterior:
+        mover_saldo(anterior[0], -anterior[1])
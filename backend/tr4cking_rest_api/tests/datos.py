@@ -0,0 +1,53 @@
+"""Datos mínimos compartidos por los tests: una ruta A-B-C con un bus y sus viajes."""
+from datetime import date, time
+
+from django.utils import timezone
+
+from ..models import (
+    Bus, Caja, Cliente, DetalleRuta, Empleado, Empresa, Localidad, Parada, Pasajero,
+    Persona, PuntoExpedicion, Reserva, Ruta, Timbrado, Viaje,
+)
+
+
+def persona(cedula, nombre='Juan', apellido='Pérez'):
+    return Persona.objects.create(cedula=cedula, nombre=nombre, apellido=apellido, telefono='0981', direccion='Asunción')
+
+
+def ruta_con_viaje(capacidad=4, fecha=date(2030, 1, 1)):
+    empresa = Empresa.objects.create(nombre='Empresa', ruc='80000001')
+    localidad = Localidad.objects.create(nombre='Asunción')
+    paradas = [
+        Parada.objects.create(localidad=localidad, nombre=nombre, direccion='Terminal')
+        for nombre in ('A', 'B', 'C')
+    ]
+    ruta = Ruta.objects.create(nombre='A-C')
+    for orden, parada in enumerate(paradas, start=1):
+        DetalleRuta.objects.create(ruta=ruta, parada=parada, orden=orden, hora_salida=time(6 + 2 * orden))
+    bus = Bus.objects.create(placa='AAA001', capacidad=capacidad, estado='Activo', empresa=empresa)
+    viaje = Viaje.objects.create(ruta=ruta, bus=bus, fecha=fecha)
+    return {'empresa': empresa, 'paradas': paradas, 'ruta': ruta, 'bus': bus, 'viaje': viaje}
+
+
+def cliente_y_pasajeros(cantidad=2):
+    personas = [persona(cedula) for cedula in range(1, cantidad + 1)]
+    cliente = Cliente.objects.create(cedula=personas[0], razon_social='Juan Pérez')
+    pasajeros = [Pasajero.objects.create(cedula=p) for p in personas]
+    return cliente, pasajeros, Reserva.objects.create(cliente=cliente)
+
+
+def empleado(empresa, cedula=100):
+    return Empleado.objects.create(cedula=persona(cedula), empresa=empresa, cargo='Cajero', fecha_ingreso=date(2020, 1, 1))
+
+
+def caja(nombre='Caja 1', monto_inicial=0):
+    return Caja.objects.create(nombre=nombre, estado='Abierta', fecha_creacion=timezone.localdate(), monto_inicial=monto_inicial)
+
+
+def timbrado(numero='12345678', fecha_inicio=date(2020, 1, 1), fecha_fin=date(2040, 12, 31)):
+    return Timbrado.objects.create(numero_timbrado=numero, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+
+
+def punto(timbrado, parada, caja=None, codigo='001', **kwargs):
+    return PuntoExpedicion.objects.create(
+        timbrado=timbrado, parada=parada, caja=caja, establecimiento='001', punto_expedicion=codigo, **kwargs
+    )
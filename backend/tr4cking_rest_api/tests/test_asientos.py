@@ -0,0 +1,61 @@
+from django.test import TestCase, override_settings
+
+from ..asientos import plan_asientos
+from ..models import Asiento, AsientoViaje, Bus, Pasaje
+from . import datos
+
+PLANTILLAS = {
+    'doble_piso': [
+        {'piso': 1, 'tipo_asiento': 'Cama', 'cantidad': 2},
+        {'piso': 2, 'tipo_asiento': 'Semi-cama'},
+    ],
+}
+
+
+@override_settings(TR4CKING_PLANTILLAS_ASIENTOS=PLANTILLAS)
+class PlanAsientosTests(TestCase):
+    def test_estandar(self):
+        self.assertEqual(plan_asientos(2), {1: (1, 'Semi-cama'), 2: (1, 'Semi-cama')})
+
+    def test_tramos_de_la_plantilla(self):
+        self.assertEqual(plan_asientos(4, 'doble_piso'), {
+            1: (1, 'Cama'), 2: (1, 'Cama'), 3: (2, 'Semi-cama'), 4: (2, 'Semi-cama'),
+        })
+
+    def test_capacidad_menor_que_la_plantilla(self):
+        self.assertEqual(plan_asientos(1, 'doble_piso'), {1: (1, 'Cama')})
+
+    def test_plantilla_desconocida_usa_la_estandar(self):
+        self.assertEqual(plan_asientos(1, 'no_existe'), {1: (1, 'Semi-cama')})
+
+
+class SincronizarAsientosTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje(capacidad=4)
+        self.bus, self.viaje = base['bus'], base['viaje']
+
+    def numeros(self):
+        return sorted(Asiento.objects.filter(bus=self.bus).values_list('numero_asiento', flat=True))
+
+    def test_crear_el_bus_inserta_los_asientos_juntos(self):
+        self.assertEqual(self.numeros(), [1, 2, 3, 4])
+        otro = Bus(placa='BBB001', capacidad=40, estado='Activo', empresa=self.bus.empresa)
+        # INSERT del bus, lectura de existentes, un INSERT de asientos y la
+        # búsqueda de viajes pendientes
+        with self.assertNumQueries(4):
+            otro.save()
+        self.assertEqual(Asiento.objects.filter(bus=otro).count(), 40)
+
+    def test_aumentar_la_capacidad_agrega_al_inventario(self):
+        self.bus.capacidad = 6
+        self.bus.save()
+        self.assertEqual(self.numeros(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(AsientoViaje.objects.filter(viaje=self.viaje).count(), 6)
+
+    def test_reducir_la_capacidad_conserva_los_vendidos(self):
+        _, pasajeros, reserva = datos.cliente_y_pasajeros(1)
+        vendido = Asiento.objects.get(bus=self.bus, numero_asiento=4)
+        Pasaje.objects.create(reserva=reserva, viaje=self.viaje, asiento=vendido, pasajero=pasajeros[0])
+        self.bus.capacidad = 2
+        self.bus.save()
+        self.assertEqual(self.numeros(), [1, 2, 4])
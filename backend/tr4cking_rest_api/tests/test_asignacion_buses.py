@@ -0,0 +1,67 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .. import asignacion_buses
+from ..asignacion_buses import AsignacionInvalida, aplicar, proponer
+from ..inventario import reservar_asientos
+from ..models import Asiento, AsientoViaje, Bus, Pasaje, Viaje
+from . import datos
+
+FECHA = date(2030, 1, 1)
+
+
+class AsignacionBusesTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje(capacidad=10, fecha=FECHA)
+        self.grande, self.lleno = base['bus'], base['viaje']
+        self.chico = Bus.objects.create(placa='BBB002', capacidad=4, estado='Activo', empresa=base['empresa'])
+        self.vacio = Viaje.objects.create(ruta=base['ruta'], bus=self.chico, fecha=FECHA)
+        cliente, pasajeros, _ = datos.cliente_y_pasajeros(3)
+        asientos = Asiento.objects.filter(bus=self.grande).order_by('numero_asiento').values_list('pk', flat=True)[:3]
+        reservar_asientos(self.lleno, list(zip([p.pk for p in pasajeros], asientos)), cliente=cliente)
+
+    def test_proponer_el_bus_mas_chico_que_alcanza(self):
+        propuesta = proponer(FECHA)
+        buses = {fila['viaje']: fila['bus'] for fila in propuesta['viajes']}
+        self.assertEqual(buses, {self.lleno.pk: self.chico.pk, self.vacio.pk: self.grande.pk})
+        self.assertEqual(propuesta['totales']['cambios'], 2)
+        # Proponer no cambia nada
+        self.assertEqual(Viaje.objects.get(pk=self.lleno.pk).bus_id, self.grande.pk)
+
+    def test_aplicar_intercambia_buses_y_mueve_los_pasajes(self):
+        aplicar(FECHA)
+        self.assertEqual(Viaje.objects.get(pk=self.lleno.pk).bus_id, self.chico.pk)
+        self.assertEqual(Viaje.objects.get(pk=self.vacio.pk).bus_id, self.grande.pk)
+        self.assertFalse(Viaje.objects.filter(fecha=asignacion_buses._ESTACIONADO).exists())
+
+        pasajes = Pasaje.objects.filter(viaje=self.lleno).select_related('asiento')
+        self.assertEqual(sorted(pasaje.asiento.numero_asiento for pasaje in pasajes), [1, 2, 3])
+        self.assertTrue(all(pasaje.asiento.bus_id == self.chico.pk for pasaje in pasajes))
+        inventario = AsientoViaje.objects.filter(viaje=self.lleno)
+        self.assertEqual(inventario.count(), 4)
+        self.assertEqual(inventario.filter(estado='Ocupado').count(), 3)
+        self.assertEqual(AsientoViaje.objects.filter(viaje=self.vacio, asiento__bus=self.grande).count(), 10)
+        # Ya aplicada, no queda nada por cambiar
+        self.assertEqual(proponer(FECHA)['totales']['cambios'], 0)
+
+    def test_conflicto_de_unicidad_no_aplica_nada(self):
+        with mock.patch.object(asignacion_buses, '_mover_pasajes', side_effect=IntegrityError('bus y fecha')):
+            with self.assertRaises(AsignacionInvalida):
+                aplicar(FECHA)
+        self.assertEqual(Viaje.objects.get(pk=self.lleno.pk).bus_id, self.grande.pk)
+        self.assertEqual(Viaje.objects.get(pk=self.vacio.pk).bus_id, self.chico.pk)
+
+    def test_api_responde_409_ante_un_conflicto(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@localhost', 'clave'))
+        with mock.patch.object(asignacion_buses, '_mover_pasajes', side_effect=IntegrityError('bus y fecha')):
+            response = client.post('/api/viajes/asignacion-buses/aplicar/', {'fecha': FECHA}, format='json')
+        self.assertEqual(response.status_code, 409)
+        response = client.post('/api/viajes/asignacion-buses/aplicar/', {'fecha': FECHA}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totales']['cambios'], 2)
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..management.commands.benchmark_endpoints import _percentil
+from ..models import Empresa
+from ..views import EmpresaViewSet
+from . import datos
+
+HOLGADOS = {'*': {'p95_ms': 60000, 'consultas': 100}}
+
+
+class BenchmarkEndpointsTests(TestCase):
+    def setUp(self):
+        datos.ruta_con_viaje()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.salida = os.path.join(directorio.name, 'resultado.json')
+        self.presupuestos = os.path.join(directorio.name, 'presupuestos.json')
+
+    def correr(self, presupuestos=HOLGADOS, *argumentos):
+        with open(self.presupuestos, 'w') as archivo:
+            json.dump(presupuestos, archivo)
+        call_command(
+            'benchmark_endpoints', '--endpoint', 'empresas', '--repeticiones', '2', '--salida', self.salida,
+            '--presupuestos', self.presupuestos, *argumentos, stdout=StringIO(),
+        )
+
+    def resultados(self):
+        with open(self.salida, encoding='utf-8') as archivo:
+            return {resultado['escenario']: resultado for resultado in json.load(archivo)['resultados']}
+
+    def test_mide_y_no_deja_datos(self):
+        usuarios = get_user_model().objects.count()
+        self.correr()
+        resultados = self.resultados()
+        self.assertEqual(list(resultados), ['empresas:list', 'empresas:retrieve', 'empresas:create'])
+        self.assertEqual(resultados['empresas:create']['status'], 201)
+        self.assertEqual(resultados['empresas:list']['excedidos'], [])
+        self.assertEqual(Empresa.objects.count(), 1)
+        self.assertEqual(get_user_model().objects.count(), usuarios)
+
+    def test_presupuesto_excedido(self):
+        with self.assertRaisesMessage(CommandError, 'empresas:list'):
+            self.correr({**HOLGADOS, '*:list': {'consultas': 0}})
+        # Los resultados se guardan igual
+        self.assertEqual(len(self.resultados()['empresas:list']['excedidos']), 1)
+
+    def test_error_del_servidor_falla(self):
+        with mock.patch.object(EmpresaViewSet, 'list', side_effect=RuntimeError('falla')):
+            with self.assertRaisesMessage(CommandError, 'empresas:list'):
+                self.correr()
+        self.assertEqual(self.resultados()['empresas:list']['status'], 500)
+
+    def test_repeticiones_invalidas(self):
+        with self.assertRaises(CommandError):
+            self.correr(HOLGADOS, '--repeticiones', '0')
+
+
+class PercentilTests(TestCase):
+    def test_percentiles(self):
+        valores = list(range(1, 21))
+        self.assertEqual((_percentil(valores, 50), _percentil(valores, 95)), (10, 19))
+        self.assertEqual(_percentil(list(range(1, 11)), 95), 10)
+        self.assertEqual(_percentil([7], 95), 7)
@@ -0,0 +1,109 @@
+from datetime import date, time
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ..busqueda import buscar_personas, buscar_viajes
+from ..models import Asiento, Cliente, Pasaje, Pasajero, Viaje
+from . import datos
+
+
+class BuscarViajesTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje(capacidad=4, fecha=date(2030, 1, 1))
+        self.viaje, self.bus = base['viaje'], base['bus']
+        self.a, self.b, self.c = (parada.pk for parada in base['paradas'])
+
+    def buscar(self, origen, destino, fecha=date(2030, 1, 1)):
+        return list(buscar_viajes(origen, destino, fecha))
+
+    def test_viaje_que_pasa_por_origen_y_destino(self):
+        (viaje,) = self.buscar(self.a, self.b)
+        self.assertEqual(viaje['id_viaje'], self.viaje.pk)
+        self.assertEqual((viaje['hora_salida'], viaje['hora_llegada']), (time(8), time(10)))
+        self.assertEqual((viaje['asientos_disponibles'], viaje['bus_placa'], viaje['ruta_nombre']), (4, 'AAA001', 'A-C'))
+
+    def test_sentido_contrario_u_otra_fecha(self):
+        self.assertEqual(self.buscar(self.c, self.a), [])
+        self.assertEqual(self.buscar(self.a, self.c, date(2030, 1, 2)), [])
+
+    def test_viaje_inactivo(self):
+        Viaje.objects.filter(pk=self.viaje.pk).update(activo=False)
+        self.assertEqual(self.buscar(self.a, self.c), [])
+
+    def test_asientos_libres_por_tramo(self):
+        _, pasajeros, reserva = datos.cliente_y_pasajeros(1)
+        Pasaje.objects.create(
+            reserva=reserva, viaje=self.viaje, asiento=Asiento.objects.get(bus=self.bus, numero_asiento=1),
+            pasajero=pasajeros[0], origen_id=self.a, destino_id=self.b,
+        )
+        self.assertEqual(self.buscar(self.a, self.b)[0]['asientos_disponibles'], 3)
+        self.assertEqual(self.buscar(self.a, self.c)[0]['asientos_disponibles'], 3)
+        self.assertEqual(self.buscar(self.b, self.c)[0]['asientos_disponibles'], 4)
+
+    def test_endpoint(self):
+        client = APIClient()
+        response = client.get('/api/viajes/buscar/', {'origen': self.a, 'destino': self.c, 'fecha': '2030-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([viaje['id_viaje'] for viaje in response.data], [self.viaje.pk])
+        response = client.get('/api/viajes/buscar/', {'origen': self.a, 'destino': self.a, 'fecha': '2030-01-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(client.get('/api/viajes/buscar/', {'origen': self.a}).status_code, 400)
+
+
+class BuscarPersonasTests(TestCase):
+    def setUp(self):
+        self.ana = datos.persona(1234567, 'Ana', 'Benítez')
+        datos.persona(12345678, 'Pedro', 'Gómez')
+        datos.persona(1234, 'Ana', 'Gómez')
+        datos.persona(7654321, 'Luis', 'Anaya')
+        self.pasajero = Pasajero.objects.create(cedula=self.ana)
+        self.cliente = Cliente.objects.create(cedula=self.ana, razon_social='Ana Benítez', dv='8')
+        self.empresa = Cliente.objects.create(razon_social='Transportes Benítez SA', dv='1')
+
+    def cedulas(self, texto, limite=10):
+        return [fila['cedula'] for fila in buscar_personas(texto, limite)]
+
+    def test_prefijo_de_cedula(self):
+        self.assertEqual(self.cedulas('1234'), [1234, 1234567, 12345678])
+        self.assertEqual(self.cedulas('1.234.567'), [1234567, 12345678])
+        self.assertEqual(self.cedulas('1234567-8'), [1234567, 12345678])
+        self.assertEqual(self.cedulas('1234', limite=2), [1234, 1234567])
+
+    def test_todas_las_palabras_por_nombre_o_apellido(self):
+        self.assertEqual(self.cedulas('ana pedro'), [])
+        self.assertEqual(sorted(self.cedulas('ana gómez')), [1234])
+        # Con menos de tres letras solo cuenta el comienzo: 'na' no encuentra a 'Ana'
+        self.assertEqual(self.cedulas('na'), [])
+        self.assertEqual(sorted(self.cedulas('ana')), [1234, 1234567, 7654321])
+
+    def test_pasajero_y_clientes_de_cada_persona(self):
+        fila = buscar_personas('1234567')[0]
+        self.assertEqual(fila['pasajero'], self.pasajero.pk)
+        self.assertEqual(fila['clientes'], [{'id_cliente': self.cliente.pk, 'razon_social': 'Ana Benítez', 'dv': '8'}])
+        self.assertEqual(buscar_personas('1234')[0]['clientes'], [])
+
+    def test_cliente_sin_persona_por_razon_social(self):
+        filas = buscar_personas('benítez')
+        self.assertEqual(len(filas), 2)
+        sin_persona = next(fila for fila in filas if fila['cedula'] is None)
+        self.assertEqual(sin_persona['pasajero'], None)
+        self.assertEqual(sin_persona['clientes'], [
+            {'id_cliente': self.empresa.pk, 'razon_social': 'Transportes Benítez SA', 'dv': '1'}
+        ])
+        # Ana aparece una sola vez aunque coincide por apellido y por razón social
+        self.assertEqual([fila['cedula'] for fila in filas].count(1234567), 1)
+
+    def test_cantidad_de_consultas_fija(self):
+        with self.assertNumQueries(4):
+            buscar_personas('benítez')
+
+    def test_endpoint(self):
+        client = APIClient()
+        response = client.get('/api/personas/buscar/', {'q': '1234', 'limite': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([fila['cedula'] for fila in response.data], [1234])
+        self.assertEqual(client.get('/api/personas/buscar/', {'q': 'a'}).status_code, 400)
+        # Un límite mayor al máximo se recorta en vez de rechazarse
+        with override_settings(TR4CKING_BUSQUEDA_PERSONAS_MAXIMO=2):
+            self.assertEqual(len(client.get('/api/personas/buscar/', {'q': 'ana', 'limite': 500}).data), 2)
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import Empresa, Localidad
+from . import datos
+
+
+class CacheCatalogoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.base = datos.ruta_con_viaje()
+        self.client = APIClient()
+
+    def test_la_segunda_lectura_no_consulta(self):
+        primera = self.client.get('/api/rutas/')
+        with self.assertNumQueries(0):
+            segunda = self.client.get('/api/rutas/')
+        self.assertEqual(segunda.data, primera.data)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+
+    def test_if_none_match(self):
+        etag = self.client.get('/api/empresas/')['ETag']
+        response = self.client.get('/api/empresas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get('/api/empresas/', HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
+
+    def test_cambiar_un_modelo_anidado_invalida(self):
+        self.client.get('/api/rutas/')
+        with self.captureOnCommitCallbacks(execute=True):
+            localidad = self.base['paradas'][0].localidad
+            localidad.nombre = 'Luque'
+            localidad.save()
+        detalles = self.client.get('/api/rutas/').data['results'][0]['detalles']
+        self.assertEqual(detalles[0]['parada']['localidad_nombre'], 'Luque')
+
+    def test_alta_invalida_el_listado(self):
+        self.client.get('/api/empresas/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Empresa.objects.create(nombre='Otra', ruc='80000002')
+        self.assertEqual(len(self.client.get('/api/empresas/').data), 2)
+
+    def test_los_filtros_son_parte_de_la_clave(self):
+        self.client.get('/api/rutas/', {'fields': 'id_ruta'})
+        response = self.client.get('/api/rutas/', {'fields': 'nombre'})
+        self.assertEqual(list(response.data['results'][0]), ['nombre'])
+
+    def test_los_errores_no_se_guardan(self):
+        self.assertEqual(self.client.get('/api/empresas/0/').status_code, 404)
+        Empresa.objects.create(pk=1000, nombre='Nueva', ruc='80000003')
+        self.assertEqual(self.client.get('/api/empresas/1000/').status_code, 200)
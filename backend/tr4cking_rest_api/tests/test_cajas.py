@@ -0,0 +1,185 @@
+import threading
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from ..cajas import (
+    CABECERA_TERMINAL, CajaNoDisponible, abrir_sesion, caja_abierta, cambiar_fondo, cerrar_caja, conciliar,
+)
+from ..models import CabeceraCaja, Caja, DetalleCaja
+from . import datos
+
+
+class CajaAbiertaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        empresa = datos.ruta_con_viaje()['empresa']
+        self.cajero, self.otro, self.nuevo = (datos.empleado(empresa, cedula) for cedula in (100, 101, 102))
+        self.caja, self.caja_otro = datos.caja('Caja 1'), datos.caja('Caja 2')
+        abrir_sesion(self.caja, self.cajero)
+        abrir_sesion(self.caja_otro, self.otro)
+
+    def test_caja_del_empleado(self):
+        self.assertEqual(caja_abierta(empleado_id=self.cajero.pk), self.caja)
+        self.assertEqual(caja_abierta(empleado_id=self.otro.pk), self.caja_otro)
+
+    def test_la_del_ultimo_movimiento(self):
+        abrir_sesion(self.caja_otro, self.cajero)
+        self.assertEqual(caja_abierta(empleado_id=self.cajero.pk), self.caja_otro)
+
+    def test_sin_movimientos_no_toma_la_de_otro(self):
+        self.assertIsNone(caja_abierta(empleado_id=self.nuevo.pk))
+
+    def test_sin_empleado_ni_terminal(self):
+        self.assertIsNone(caja_abierta())
+
+    def test_caja_cerrada(self):
+        self.caja.estado = 'Cerrada'
+        self.caja.save()
+        self.assertIsNone(caja_abierta(empleado_id=self.cajero.pk))
+
+    def test_cerrar_la_caja_invalida_el_cache(self):
+        self.assertEqual(caja_abierta(empleado_id=self.cajero.pk), self.caja)
+        with self.assertNumQueries(0):
+            caja_abierta(empleado_id=self.cajero.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            cerrar_caja(self.caja.pk, self.cajero)
+        self.assertIsNone(caja_abierta(empleado_id=self.cajero.pk))
+
+    def test_terminal(self):
+        request = RequestFactory().get('/', headers={CABECERA_TERMINAL: str(self.caja_otro.pk)})
+        self.assertEqual(caja_abierta(request), self.caja_otro)
+        Caja.objects.filter(pk=self.caja_otro.pk).update(estado='Cerrada')
+        cache.clear()
+        self.assertIsNone(caja_abierta(RequestFactory().get('/', headers={CABECERA_TERMINAL: str(self.caja_otro.pk)})))
+
+
+class SaldoSesionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.empleado = datos.empleado(datos.ruta_con_viaje()['empresa'])
+        self.caja = datos.caja(monto_inicial=100000)
+        self.sesion = abrir_sesion(self.caja, self.empleado)
+
+    def movimiento(self, tipo, monto, sesion=None):
+        return DetalleCaja.objects.create(
+            cabecera_caja=sesion or self.sesion, tipo_transaccion=tipo, monto=monto, fecha_transaccion=timezone.now(),
+        )
+
+    def saldo(self, sesion=None):
+        return CabeceraCaja.objects.get(pk=(sesion or self.sesion).pk).monto_final
+
+    def test_apertura_con_el_fondo_de_la_caja(self):
+        self.assertEqual(self.sesion.monto_inical, 100000)
+        self.assertEqual(self.saldo(), 100000)
+
+    def test_ingresos_y_egresos_mueven_el_saldo(self):
+        self.movimiento('Ingreso', 50000)
+        egreso = self.movimiento('Egreso', 20000)
+        self.assertEqual(self.saldo(), 130000)
+        egreso.monto = 5000
+        egreso.save()
+        self.assertEqual(self.saldo(), 145000)
+        egreso.tipo_transaccion = 'Ingreso'
+        egreso.save()
+        self.assertEqual(self.saldo(), 155000)
+        egreso.delete()
+        self.assertEqual(self.saldo(), 150000)
+
+    def test_mover_un_movimiento_de_sesion(self):
+        otra = abrir_sesion(datos.caja('Caja 2'), self.empleado, monto_inicial=0)
+        ingreso = self.movimiento('Ingreso', 30000)
+        ingreso.cabecera_caja = otra
+        ingreso.save()
+        self.assertEqual(self.saldo(), 100000)
+        self.assertEqual(self.saldo(otra), 30000)
+
+    def test_cerrar_caja(self):
+        self.movimiento('Ingreso', 70000)
+        self.movimiento('Egreso', 10000)
+        # Lee el saldo de la sesión sin recorrer los movimientos del turno
+        with self.assertNumQueries(6):
+            cierre, esperado, diferencia = cerrar_caja(self.caja.pk, self.empleado)
+        self.assertEqual(esperado, 160000)
+        self.assertIsNone(diferencia)
+        self.assertEqual((cierre.tipo_mov, cierre.monto_inical, cierre.monto_final), ('Cierre', 100000, 160000))
+        self.assertEqual(Caja.objects.get(pk=self.caja.pk).estado, 'Cerrada')
+        with self.assertRaises(CajaNoDisponible):
+            cerrar_caja(self.caja.pk, self.empleado)
+
+    def test_cerrar_caja_con_arqueo(self):
+        self.movimiento('Ingreso', 70000)
+        cierre, esperado, diferencia = cerrar_caja(self.caja.pk, self.empleado, monto_contado=165000)
+        self.assertEqual((esperado, diferencia, cierre.monto_final), (170000, -5000, 165000))
+
+    def test_conciliar_lo_cargado_sin_senales(self):
+        self.movimiento('Ingreso', 10000)
+        DetalleCaja.objects.bulk_create([
+            DetalleCaja(cabecera_caja=self.sesion, tipo_transaccion='Ingreso', monto=25000, fecha_transaccion=timezone.now()),
+        ])
+        self.assertEqual(self.saldo(), 110000)
+        corregidas = conciliar(CabeceraCaja.objects.filter(pk=self.sesion.pk))
+        self.assertEqual([(sesion.pk, anterior) for sesion, anterior in corregidas], [(self.sesion.pk, 110000)])
+        self.assertEqual(self.saldo(), 135000)
+        self.assertEqual(conciliar(CabeceraCaja.objects.filter(pk=self.sesion.pk)), [])
+
+    def test_cambiar_fondo_conserva_los_movimientos(self):
+        self.movimiento('Ingreso', 40000)
+        cambiar_fondo(self.sesion.pk, 120000)
+        sesion = CabeceraCaja.objects.get(pk=self.sesion.pk)
+        self.assertEqual((sesion.monto_inical, sesion.monto_final), (120000, 160000))
+
+    def test_admin_editar_fondo(self):
+        self.movimiento('Ingreso', 40000)
+        modelo_admin = admin.site._registry[CabeceraCaja]
+        request = RequestFactory().post('/')
+        request.user = User.objects.create_superuser('admin', 'admin@localhost', 'clave')
+        Formulario = modelo_admin.get_form(request, self.sesion)
+        sesion = CabeceraCaja.objects.get(pk=self.sesion.pk)
+        form = Formulario({
+            'caja': self.caja.pk, 'empleado': self.empleado.pk, 'tipo_mov': sesion.tipo_mov,
+            'fecha_mov_0': sesion.fecha_mov.date(), 'fecha_mov_1': sesion.fecha_mov.time(), 'monto_inical': '90000',
+        }, instance=sesion)
+        self.assertTrue(form.is_valid(), form.errors)
+        modelo_admin.save_model(request, form.save(commit=False), form, change=True)
+        self.assertEqual(self.saldo(), 130000)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class CerrarCajaConcurrenciaTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.empleado = datos.empleado(datos.ruta_con_viaje()['empresa'])
+        self.caja = datos.caja(monto_inicial=100000)
+        self.sesion = abrir_sesion(self.caja, self.empleado)
+
+    def test_movimiento_en_curso_entra_en_el_saldo(self):
+        movido, liberar = threading.Event(), threading.Event()
+
+        def cobro():
+            try:
+                with transaction.atomic():
+                    DetalleCaja.objects.create(
+                        cabecera_caja=self.sesion, tipo_transaccion='Ingreso', monto=50000,
+                        fecha_transaccion=timezone.now(),
+                    )
+                    movido.set()
+                    liberar.wait(10)
+            finally:
+                connection.close()
+
+        hilo = threading.Thread(target=cobro)
+        hilo.start()
+        try:
+            self.assertTrue(movido.wait(10))
+            # El cierre espera al cobro, que confirma un momento después
+            threading.Timer(0.5, liberar.set).start()
+            cierre, esperado, _ = cerrar_caja(self.caja.pk, self.empleado)
+        finally:
+            liberar.set()
+            hilo.join()
+        self.assertEqual((esperado, cierre.monto_final), (150000, 150000))
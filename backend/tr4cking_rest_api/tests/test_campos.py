@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from ..serializers import ViajeSerializer
+from . import datos
+
+TODOS = ['id_viaje', 'horario', 'ruta', 'ruta_details', 'bus', 'bus_placa', 'bus_details', 'fecha', 'activo', 'observaciones']
+
+
+class CamposDinamicosTests(TestCase):
+    def setUp(self):
+        self.viaje = datos.ruta_con_viaje()['viaje']
+        self.client = APIClient()
+
+    def leer(self, **parametros):
+        response = self.client.get(f'/api/viajes/{self.viaje.pk}/', parametros)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_sin_parametros_devuelve_todo(self):
+        data = self.leer()
+        self.assertEqual(list(data), TODOS)
+        self.assertEqual(len(data['ruta_details']['detalles']), 3)
+
+    def test_fields(self):
+        data = self.leer(fields='id_viaje,fecha,ruta_details.nombre')
+        self.assertEqual(list(data), ['id_viaje', 'ruta_details', 'fecha'])
+        self.assertEqual(dict(data['ruta_details']), {'nombre': 'A-C'})
+
+    def test_expand_junto_con_fields(self):
+        data = self.leer(fields='id_viaje', expand='bus_details')
+        self.assertEqual(list(data), ['id_viaje', 'bus_details'])
+        self.assertEqual(data['bus_details']['placa'], 'AAA001')
+
+    def test_expand_solo_no_recorta(self):
+        self.assertEqual(list(self.leer(expand='bus_details')), TODOS)
+
+    def test_omit(self):
+        data = self.leer(omit='bus_details,ruta_details.detalles')
+        self.assertNotIn('bus_details', data)
+        self.assertEqual(list(data['ruta_details']), ['id_ruta', 'nombre', 'activo', 'precio_base', 'fecha_actualizacion'])
+
+    def test_lo_no_pedido_no_se_consulta(self):
+        with CaptureQueriesContext(connection) as completo:
+            self.client.get('/api/viajes/')
+        with CaptureQueriesContext(connection) as recortado:
+            self.client.get('/api/viajes/', {'fields': 'id_viaje,fecha'})
+        self.assertLess(len(recortado), len(completo))
+        self.assertNotIn('detalleruta', ' '.join(query['sql'] for query in recortado.captured_queries).lower())
+
+    def test_escrituras_ignoran_los_parametros(self):
+        request = self.client.post('/api/viajes/?fields=id_viaje').wsgi_request
+        self.assertEqual(list(ViajeSerializer(self.viaje, context={'request': request}).data), TODOS)
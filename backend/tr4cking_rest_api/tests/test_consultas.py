@@ -0,0 +1,91 @@
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from ..consultas import plan_relaciones
+from ..inventario import reservar_asientos
+from ..models import Asiento, Bus, DetalleRuta, Encomienda, Horario, Ruta, Viaje
+from ..serializers import PasajeSerializer
+from . import datos
+
+ENDPOINTS = ['pasajes', 'viajes', 'rutas', 'detalle-rutas', 'reservas', 'encomiendas', 'horarios', 'asientos', 'buses']
+
+
+class ConsultasConstantesTests(TestCase):
+    """Cada listado hace las mismas consultas con 1 fila que con muchas (sin N+1)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        base = datos.ruta_con_viaje()
+        paradas = base['paradas']
+        cliente, pasajeros, _ = datos.cliente_y_pasajeros()
+        buses = [base['bus']] + [
+            Bus.objects.create(placa=f'AAA00{i}', capacidad=4, estado='Activo', empresa=base['empresa'])
+            for i in range(2, 4)
+        ]
+        rutas = [base['ruta']]
+        for nombre, orden in (('C-A', paradas[::-1]), ('A-B', paradas[:2])):
+            ruta = Ruta.objects.create(nombre=nombre)
+            for posicion, parada in enumerate(orden, start=1):
+                DetalleRuta.objects.create(ruta=ruta, parada=parada, orden=posicion, hora_salida=time(6 + posicion))
+            rutas.append(ruta)
+        for ruta in rutas:
+            Horario.objects.create(ruta=ruta, hora_salida=time(7), vigente_desde=date(2030, 1, 1)).buses.set(buses)
+
+        for dia in range(1, 5):
+            for ruta, bus in zip(rutas, buses):
+                viaje = Viaje.objects.create(ruta=ruta, bus=bus, fecha=date(2030, 1, 1) + timedelta(days=dia))
+                asientos = Asiento.objects.filter(bus=bus).order_by('numero_asiento').values_list('pk', flat=True)[:2]
+                reservar_asientos(viaje, list(zip([p.pk for p in pasajeros], asientos)), cliente=cliente)
+                Encomienda.objects.create(
+                    viaje=viaje, cliente=cliente, origen=paradas[0], destino=paradas[1], flete=10000,
+                    remitente='Ana', ruc_ci='123', numero_contacto='0981', tipo_envio='paquete', cantidad_paquete=1,
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def consultas(self, url, params):
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return len(capturadas)
+
+    def assertConstante(self, prefijo, **params):
+        url = f'/api/{prefijo}/'
+        una = self.consultas(url, {'page_size': 1, **params})
+        with self.assertNumQueries(una):
+            response = self.client.get(url, {'page_size': 50, **params})
+        self.assertGreater(len(response.data['results']), 1, f'{url} sin filas suficientes')
+
+    def test_listados(self):
+        for prefijo in ENDPOINTS:
+            with self.subTest(prefijo):
+                self.assertConstante(prefijo)
+
+    def test_listados_sin_bloques_anidados(self):
+        for prefijo in ('pasajes', 'viajes', 'rutas', 'encomiendas'):
+            with self.subTest(prefijo):
+                self.assertConstante(prefijo, omit='viaje_details,ruta_details,detalles')
+
+    def test_listados_con_campos_elegidos(self):
+        self.assertConstante('pasajes', fields='id_pasaje,viaje_details.ruta_details.detalles')
+        self.assertConstante('viajes', fields='id_viaje,fecha', expand='ruta_details')
+
+    def test_pasajes_en_dos_consultas(self):
+        # Pasajes con todos sus bloques: una con los joins y una para las paradas de la ruta
+        with self.assertNumQueries(2):
+            self.client.get('/api/pasajes/', {'page_size': 50})
+        with self.assertNumQueries(1):
+            self.client.get('/api/pasajes/', {'page_size': 50, 'omit': 'viaje_details'})
+
+    def test_plan_de_pasajes(self):
+        select, prefetch = plan_relaciones(PasajeSerializer())
+        self.assertIn('viaje__ruta', select)
+        self.assertIn('asiento__bus', select)
+        self.assertEqual(len(prefetch), 1)
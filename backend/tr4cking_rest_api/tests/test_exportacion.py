@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .. import exportacion
+from ..models import Asiento, Pasaje, Viaje
+from ..views import PasajeViewSet
+from . import datos
+
+
+class ExportarPasajesTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje(fecha=date(2030, 1, 1))
+        otro_dia = Viaje.objects.create(ruta=base['ruta'], bus=base['bus'], fecha=date(2030, 1, 2))
+        _, pasajeros, reserva = datos.cliente_y_pasajeros(2)
+        asientos = list(Asiento.objects.filter(bus=base['bus']).order_by('numero_asiento'))
+        self.pasajes = [
+            Pasaje.objects.create(reserva=reserva, viaje=viaje, asiento=asiento, pasajero=pasajero)
+            for viaje, asiento, pasajero in ((base['viaje'], asientos[0], pasajeros[0]), (otro_dia, asientos[1], pasajeros[1]))
+        ]
+        self.client = APIClient()
+
+    def exportar(self, **parametros):
+        response = self.client.get('/api/pasajes/exportar/', parametros)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, contenido = self.exportar(format='csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment; filename="pasajes-', response['Content-Disposition'])
+        filas = list(csv.reader(io.StringIO(contenido)))
+        self.assertEqual(filas[0], list(PasajeViewSet.exportacion_columnas))
+        self.assertEqual(sorted(int(fila[0]) for fila in filas[1:]), sorted(pasaje.pk for pasaje in self.pasajes))
+
+    def test_ndjson(self):
+        _, contenido = self.exportar(format='ndjson')
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[0]['pasajero__cedula__nombre'], 'Juan')
+
+    def test_rango_de_fechas_y_filtros_del_listado(self):
+        _, contenido = self.exportar(format='ndjson', desde='2030-01-02', hasta='2030-01-31')
+        self.assertEqual([json.loads(linea)['id_pasaje'] for linea in contenido.splitlines()], [self.pasajes[1].pk])
+        _, contenido = self.exportar(format='ndjson', viaje=self.pasajes[0].viaje_id)
+        self.assertEqual([json.loads(linea)['id_pasaje'] for linea in contenido.splitlines()], [self.pasajes[0].pk])
+
+    def test_una_sola_consulta(self):
+        with self.assertNumQueries(1):
+            self.exportar(format='csv')
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/pasajes/exportar/', {'format': 'json'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/pasajes/exportar/', {'desde': '01/01/2030'}).status_code, 400)
+
+
+class EscrituraPorBloquesTests(TestCase):
+    def test_csv_por_bloques(self):
+        filas = [{'a': i, 'b': f'x{i}'} for i in range(5)]
+        with mock.patch.object(exportacion, 'FILAS_POR_ESCRITURA', 2):
+            bloques = list(exportacion._csv(iter(filas), ['a', 'b']))
+        self.assertEqual(len(bloques), 3)
+        self.assertEqual(''.join(bloques).splitlines(), ['a,b', '0,x0', '1,x1', '2,x2', '3,x3', '4,x4'])
+
+    def test_ndjson_por_bloques(self):
+        with mock.patch.object(exportacion, 'FILAS_POR_ESCRITURA', 2):
+            bloques = list(exportacion._ndjson(iter([{'a': i} for i in range(3)]), ['a']))
+        self.assertEqual(bloques, ['{"a": 0}\n{"a": 1}\n', '{"a": 2}\n'])
@@ -0,0 +1,108 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..cajas import abrir_sesion
+from ..facturacion import FacturacionError, ItemsYaFacturados, emitir_factura
+from ..models import Asiento, CabeceraCaja, CabeceraFactura, DetalleCaja, Encomienda, Pasaje, TramoRuta, VentaDiaria
+from . import datos
+
+
+class DatosFactura(TestCase):
+    def setUp(self):
+        cache.clear()
+        base = datos.ruta_con_viaje()
+        self.ruta, self.viaje, self.paradas = base['ruta'], base['viaje'], base['paradas']
+        self.ruta.precio_base = 100000
+        self.ruta.save()
+        self.parada = self.paradas[0]
+        datos.punto(datos.timbrado(), self.parada)
+        self.empleado = datos.empleado(base['empresa'])
+        self.caja = datos.caja()
+        self.sesion = abrir_sesion(self.caja, self.empleado)
+
+        cliente, pasajeros, reserva = datos.cliente_y_pasajeros(2)
+        asientos = Asiento.objects.filter(bus=base['bus']).order_by('numero_asiento')
+        self.cliente = cliente
+        self.completo = Pasaje.objects.create(reserva=reserva, viaje=self.viaje, asiento=asientos[0], pasajero=pasajeros[0])
+        self.tramo = Pasaje.objects.create(
+            reserva=reserva, viaje=self.viaje, asiento=asientos[1], pasajero=pasajeros[1],
+            origen=self.paradas[0], destino=self.paradas[1],
+        )
+        self.encomienda = Encomienda.objects.create(
+            viaje=self.viaje, cliente=cliente, origen=self.paradas[0], destino=self.paradas[2], flete=22000,
+            remitente='Ana', ruc_ci='123', numero_contacto='0981', tipo_envio='paquete', cantidad_paquete=1,
+        )
+
+
+class EmitirFacturaTests(DatosFactura):
+    def emitir(self, **kwargs):
+        return emitir_factura(self.empleado, self.parada, cliente=self.cliente, **{
+            'pasajes': [self.completo.pk, self.tramo.pk], 'encomiendas': [self.encomienda.pk], **kwargs,
+        })
+
+    def test_tarifa_y_totales(self):
+        factura, lineas = self.emitir()
+        # Ruta completa, medio recorrido prorrateado y el flete
+        self.assertEqual(sorted(linea.subtotal for linea in lineas), [22000, 50000, 100000])
+        self.assertEqual(factura.monto_total, 172000)
+        self.assertEqual(factura.monto_iva_10, Decimal('9090.91') + Decimal('4545.45') + Decimal('2000.00'))
+        self.assertEqual((factura.monto_exenta, factura.monto_iva_5), (0, 0))
+        self.assertEqual(factura.numero_factura, '001-001-0000001')
+
+    def test_precio_cargado_en_el_tramo(self):
+        TramoRuta.objects.filter(ruta=self.ruta, origen=self.paradas[0], destino=self.paradas[1]).update(precio=35000)
+        _, lineas = self.emitir(encomiendas=[])
+        self.assertEqual(sorted(linea.subtotal for linea in lineas), [35000, 100000])
+
+    def test_ingreso_en_caja_y_resumen_diario(self):
+        factura, _ = self.emitir()
+        ingreso = DetalleCaja.objects.get(factura=factura)
+        self.assertEqual((ingreso.cabecera_caja_id, ingreso.monto), (self.sesion.pk, 172000))
+        self.assertEqual(CabeceraCaja.objects.get(pk=self.sesion.pk).monto_final, 172000)
+        venta = VentaDiaria.objects.get()
+        self.assertEqual((venta.pasajes_vendidos, venta.monto_total), (2, 172000))
+
+    def test_no_se_factura_dos_veces(self):
+        self.emitir()
+        with self.assertRaises(ItemsYaFacturados) as error:
+            self.emitir(encomiendas=[])
+        self.assertEqual(error.exception.pasajes, sorted([self.completo.pk, self.tramo.pk]))
+        self.assertEqual(CabeceraFactura.objects.count(), 1)
+
+    def test_anulada_libera_los_items(self):
+        factura, _ = self.emitir()
+        factura.estado = 'Anulada'
+        factura.save()
+        otra, _ = self.emitir()
+        self.assertEqual(otra.numero_factura, '001-001-0000002')
+
+    def test_item_inexistente_no_guarda_nada(self):
+        with self.assertRaises(FacturacionError):
+            self.emitir(pasajes=[self.completo.pk, 0])
+        self.assertFalse(CabeceraFactura.objects.exists())
+        self.assertFalse(DetalleCaja.objects.exists())
+
+    def test_sin_caja_abierta(self):
+        self.caja.estado = 'Cerrada'
+        self.caja.save()
+        cache.clear()
+        with self.assertRaises(FacturacionError):
+            self.emitir()
+
+
+class EmitirEndpointTests(DatosFactura):
+    def post(self, **extra):
+        return APIClient().post('/api/facturas/emitir/', {
+            'empleado': self.empleado.pk, 'parada': self.parada.pk, 'cliente': self.cliente.pk,
+            'pasajes': [self.completo.pk], **extra,
+        }, format='json')
+
+    def test_endpoint(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['detalles']), 1)
+        self.assertEqual(self.post().status_code, 409)
+        self.assertEqual(self.post(pasajes=[], encomiendas=[]).status_code, 400)
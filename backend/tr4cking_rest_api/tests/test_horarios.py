@@ -0,0 +1,72 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..horarios import generar_viajes
+from ..models import AsientoViaje, Bus, Horario, Viaje
+from . import datos
+
+
+class GenerarViajesTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje(fecha=date(2030, 1, 1))  # Martes, ya tiene viaje
+        self.ruta, self.bus = base['ruta'], base['bus']
+        # Lunes a viernes
+        self.horario = Horario.objects.create(
+            ruta=self.ruta, hora_salida=time(7), dias_semana='1111100', vigente_desde=date(2030, 1, 1),
+        )
+        self.horario.buses.add(self.bus)
+
+    def viajes(self):
+        return sorted(Viaje.objects.filter(horario=self.horario).values_list('fecha', flat=True))
+
+    def test_crea_los_viajes_de_los_dias_del_horario(self):
+        resultado = generar_viajes(date(2030, 1, 1), date(2030, 1, 7))
+        # Martes sin bus libre; sábado y domingo no sale
+        self.assertEqual(self.viajes(), [date(2030, 1, d) for d in (2, 3, 4, 7)])
+        self.assertEqual(resultado.viajes_creados, 4)
+        self.assertEqual(resultado.sin_bus, [(self.horario.pk, date(2030, 1, 1))])
+        self.assertEqual(resultado.asientos_creados, 4 * self.bus.capacidad)
+        self.assertEqual(
+            AsientoViaje.objects.filter(viaje__horario=self.horario).count(), 4 * self.bus.capacidad
+        )
+
+    def test_es_idempotente(self):
+        generar_viajes(date(2030, 1, 2), date(2030, 1, 4))
+        resultado = generar_viajes(date(2030, 1, 2), date(2030, 1, 4))
+        self.assertEqual((resultado.viajes_creados, resultado.viajes_existentes, resultado.asientos_creados), (0, 3, 0))
+        self.assertEqual(len(self.viajes()), 3)
+
+    def test_usa_el_siguiente_bus_del_grupo(self):
+        otro = Bus.objects.create(placa='AAA002', capacidad=2, estado='Activo', empresa=self.bus.empresa)
+        self.horario.buses.add(otro)
+        generar_viajes(date(2030, 1, 1), date(2030, 1, 1))
+        self.assertEqual(Viaje.objects.get(horario=self.horario).bus, otro)
+
+    def test_bloques_de_dias(self):
+        generar_viajes(date(2030, 1, 2), date(2030, 3, 31), lote=3)
+        self.assertEqual(len(self.viajes()), 63)
+
+
+class GenerarEndpointTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje()
+        self.horario = Horario.objects.create(ruta=base['ruta'], hora_salida=time(7), vigente_desde=date(2030, 1, 1))
+        self.horario.buses.add(base['bus'])
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@localhost', 'clave'))
+
+    def test_genera_el_periodo(self):
+        response = self.client.post('/api/horarios/generar/', {'desde': '2030-01-02', 'hasta': '2030-01-03'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['viajes_creados'], response.data['total_sin_bus']), (2, 0))
+
+    def test_periodo_invertido(self):
+        response = self.client.post('/api/horarios/generar/', {'desde': '2030-01-03', 'hasta': '2030-01-02'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_solo_administradores(self):
+        response = APIClient().post('/api/horarios/generar/', {'hasta': '2030-01-02'}, format='json')
+        self.assertIn(response.status_code, (401, 403))
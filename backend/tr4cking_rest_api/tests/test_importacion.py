@@ -0,0 +1,58 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..importacion import ArchivoInvalido, filas_csv, importar_personas
+from ..models import Persona
+from . import datos
+
+
+def importar(texto, codificacion='utf-8'):
+    return importar_personas(filas_csv(io.BytesIO(texto.encode(codificacion))))
+
+
+class ActualizacionTests(TestCase):
+    def setUp(self):
+        datos.persona(1)
+        datos.persona(2)
+
+    def test_columnas_ausentes_no_pisan_el_contacto(self):
+        resultado = importar('cedula,nombre,apellido\n1,Ana,Gómez\n3,Luis,Báez\n')
+        self.assertEqual((resultado.personas_creadas, resultado.personas_actualizadas), (1, 1))
+        persona = Persona.objects.get(cedula=1)
+        self.assertEqual((persona.nombre, persona.telefono, persona.direccion), ('Ana', '0981', 'Asunción'))
+        self.assertEqual(Persona.objects.get(cedula=3).telefono, '')
+
+    def test_valores_vacios_no_pisan_el_contacto(self):
+        importar('cedula;nombre;apellido;telefono;direccion\n1;Juan;Pérez;0971;\n2;Juan;Pérez;;Luque\n')
+        uno, dos = Persona.objects.get(cedula=1), Persona.objects.get(cedula=2)
+        self.assertEqual((uno.telefono, uno.direccion), ('0971', 'Asunción'))
+        self.assertEqual((dos.telefono, dos.direccion), ('0981', 'Luque'))
+
+
+class ArchivoIlegibleTests(TestCase):
+    def test_encabezado_que_no_es_utf8(self):
+        with self.assertRaises(ArchivoInvalido):
+            list(filas_csv(io.BytesIO('cédula,nombre,apellido\n1,Ana,Gómez\n'.encode('latin-1'))))
+
+    def test_fila_que_no_es_utf8(self):
+        contenido = b'cedula,nombre,apellido\n1,Ana,G\xf3mez\n2,Luis,Baez\n'
+        resultado = importar_personas(filas_csv(io.BytesIO(contenido)))
+        self.assertEqual(resultado.errores, [(2, "La fila no está en UTF-8")])
+        self.assertEqual(list(Persona.objects.values_list('cedula', flat=True)), [2])
+
+    def test_fila_mal_formada(self):
+        resultado = importar(f'cedula,nombre,apellido\n1,Ana,"{"x" * 200000}"\n2,Luis,Baez\n')
+        self.assertEqual([fila for fila, _ in resultado.errores], [2])
+        self.assertIn("mal formada", resultado.errores[0][1])
+        self.assertEqual(list(Persona.objects.values_list('cedula', flat=True)), [2])
+
+    def test_la_vista_responde_400(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@localhost', 'clave'))
+        archivo = SimpleUploadedFile('personas.csv', 'cédula,nombre,apellido\n'.encode('latin-1'))
+        response = client.post('/api/personas/importar/', {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.status_code, 400)
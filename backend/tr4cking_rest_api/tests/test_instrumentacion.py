@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .. import instrumentacion
+from ..instrumentacion import InstrumentacionMiddleware, serializando
+from . import datos
+
+
+@override_settings(TR4CKING_INSTRUMENTACION=True, TR4CKING_INSTRUMENTACION_VOLCADO_SEGUNDOS=0)
+class InstrumentacionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentacion.reiniciar()
+        datos.ruta_con_viaje()
+        self.client = APIClient()
+
+    def test_cabeceras_y_log(self):
+        with self.assertLogs('tr4cking.instrumentacion', 'INFO') as logs:
+            response = self.client.get('/api/viajes/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+        registro = logs.records[0].instrumentacion
+        self.assertEqual(registro['ruta'], 'GET viaje-list')
+        self.assertEqual(int(response['X-Consultas-SQL']), registro['consultas'])
+        self.assertGreater(registro['consultas'], 0)
+
+    @override_settings(TR4CKING_INSTRUMENTACION_UMBRAL_N_MAS_1=3)
+    def test_consultas_repetidas_son_n_mas_1(self):
+        def vista(request):
+            for _ in range(3):
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            return HttpResponse('ok')
+
+        with self.assertLogs('tr4cking.instrumentacion', 'WARNING') as logs:
+            InstrumentacionMiddleware(vista)(RequestFactory().get('/x/'))
+        self.assertEqual(logs.records[0].instrumentacion['repetidas'][0]['veces'], 3)
+
+    def test_histogramas_y_reinicio(self):
+        for _ in range(2):
+            self.client.get('/api/viajes/')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@localhost', 'clave'))
+        rutas = client.get('/api/instrumentacion/').data['rutas']
+        self.assertEqual(rutas['GET viaje-list']['requests'], 2)
+        self.assertEqual(sum(rutas['GET viaje-list']['duracion_ms'].values()), 2)
+        self.assertEqual(client.delete('/api/instrumentacion/').status_code, 204)
+        self.assertNotIn('GET viaje-list', instrumentacion.histogramas())
+
+    def test_solo_staff(self):
+        self.assertIn(self.client.get('/api/instrumentacion/').status_code, (401, 403))
+
+    def test_serializacion_cuenta_el_serializer_de_afuera(self):
+        medicion = instrumentacion.Medicion()
+        token = instrumentacion._medicion.set(medicion)
+        try:
+            with serializando():
+                with serializando():
+                    pass
+                interna = medicion.serializacion
+        finally:
+            instrumentacion._medicion.reset(token)
+        self.assertEqual(interna, 0)
+        self.assertGreater(medicion.serializacion, 0)
+
+
+class InstrumentacionInactivaTests(TestCase):
+    def test_sin_cabeceras(self):
+        response = APIClient().get('/api/empresas/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_middleware_descartado(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            InstrumentacionMiddleware(lambda request: HttpResponse())
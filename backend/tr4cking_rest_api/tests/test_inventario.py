@@ -0,0 +1,114 @@
+import threading
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+
+from ..inventario import AsientoNoDisponible, reservar_asientos, retener_asientos
+from ..models import Asiento, AsientoViaje, Bus, Pasaje, Reserva
+from ..tramos import resolver_tramo
+from . import datos
+
+
+class ReservarAsientosTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje()
+        self.viaje, self.ruta, self.paradas = base['viaje'], base['ruta'], base['paradas']
+        self.asientos = list(Asiento.objects.filter(bus=base['bus']).order_by('numero_asiento').values_list('pk', flat=True))
+        self.cliente, pasajeros, self.reserva = datos.cliente_y_pasajeros()
+        self.pasajeros = [pasajero.pk for pasajero in pasajeros]
+
+    def fila(self, asiento_id):
+        return AsientoViaje.objects.get(viaje=self.viaje, asiento_id=asiento_id)
+
+    def conflictos(self, pasajes, **kwargs):
+        with self.assertRaises(AsientoNoDisponible) as error:
+            reservar_asientos(self.viaje, pasajes, cliente=self.cliente, **kwargs)
+        return error.exception.conflictos
+
+    def test_vende_los_asientos_pedidos(self):
+        reserva, creados = reservar_asientos(
+            self.viaje, [(self.pasajeros[0], self.asientos[0]), (self.pasajeros[1], self.asientos[1])], cliente=self.cliente,
+        )
+        self.assertEqual(reserva.cliente, self.cliente)
+        self.assertEqual(len(creados), 2)
+        for asiento_id in self.asientos[:2]:
+            self.assertEqual(self.fila(asiento_id).estado, 'Ocupado')
+        self.assertEqual(self.fila(self.asientos[2]).estado, 'Disponible')
+
+    def test_asiento_vendido_es_conflicto_y_no_se_vende_ninguno(self):
+        reservar_asientos(self.viaje, [(self.pasajeros[0], self.asientos[0])], cliente=self.cliente)
+        conflictos = self.conflictos([(self.pasajeros[1], self.asientos[1]), (self.pasajeros[1], self.asientos[0])])
+        self.assertEqual(conflictos, {self.asientos[0]: 'Ocupado'})
+        self.assertEqual(Pasaje.objects.count(), 1)
+        self.assertEqual(self.fila(self.asientos[1]).estado, 'Disponible')
+
+    def test_asiento_duplicado(self):
+        conflictos = self.conflictos([(self.pasajeros[0], self.asientos[0]), (self.pasajeros[1], self.asientos[0])])
+        self.assertEqual(conflictos, {self.asientos[0]: 'Duplicado'})
+        self.assertFalse(Pasaje.objects.exists())
+
+    def test_asiento_de_otro_bus(self):
+        otro = Bus.objects.create(placa='BBB002', capacidad=2, estado='Activo', empresa=self.viaje.bus.empresa)
+        ajeno = Asiento.objects.filter(bus=otro).values_list('pk', flat=True).first()
+        conflictos = self.conflictos([(self.pasajeros[0], self.asientos[0]), (self.pasajeros[1], ajeno)])
+        self.assertEqual(conflictos, {ajeno: 'No pertenece al viaje'})
+        self.assertFalse(Pasaje.objects.exists())
+
+    def test_retenido_por_otra_reserva(self):
+        retener_asientos(self.viaje, [self.asientos[0]], Reserva.objects.create(cliente=self.cliente))
+        self.assertEqual(self.conflictos([(self.pasajeros[0], self.asientos[0])]), {self.asientos[0]: 'Reservado'})
+        # La reserva que lo retuvo sí lo compra
+        retener_asientos(self.viaje, [self.asientos[1]], self.reserva)
+        reservar_asientos(self.viaje, [(self.pasajeros[0], self.asientos[1])], reserva=self.reserva)
+        fila = self.fila(self.asientos[1])
+        self.assertEqual((fila.estado, fila.tramos_retenidos, fila.reserva_id), ('Ocupado', 0, None))
+
+    def test_tramos_distintos_del_mismo_asiento(self):
+        a, b, c = self.paradas
+        reservar_asientos(self.viaje, [(self.pasajeros[0], self.asientos[0])], cliente=self.cliente,
+                          tramo=resolver_tramo(self.ruta.pk, a.pk, b.pk))
+        reservar_asientos(self.viaje, [(self.pasajeros[1], self.asientos[0])], cliente=self.cliente,
+                          tramo=resolver_tramo(self.ruta.pk, b.pk, c.pk))
+        self.assertEqual(
+            self.conflictos([(self.pasajeros[0], self.asientos[0])], tramo=resolver_tramo(self.ruta.pk, a.pk, c.pk)),
+            {self.asientos[0]: 'Ocupado'},
+        )
+        self.assertEqual(self.fila(self.asientos[0]).tramos_ocupados, 0b11)
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ReservarAsientosConcurrenciaTests(TransactionTestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje()
+        self.viaje = base['viaje']
+        self.asientos = list(Asiento.objects.filter(bus=base['bus']).order_by('numero_asiento').values_list('pk', flat=True))
+        self.cliente, pasajeros, _ = datos.cliente_y_pasajeros()
+        self.pasajeros = [pasajero.pk for pasajero in pasajeros]
+
+    def test_asiento_bloqueado_por_otra_venta_no_espera(self):
+        bloqueado, liberar = threading.Event(), threading.Event()
+
+        def otra_venta():
+            try:
+                with transaction.atomic():
+                    AsientoViaje.objects.select_for_update().get(viaje=self.viaje, asiento_id=self.asientos[0])
+                    bloqueado.set()
+                    liberar.wait(10)
+            finally:
+                connection.close()
+
+        hilo = threading.Thread(target=otra_venta)
+        hilo.start()
+        try:
+            self.assertTrue(bloqueado.wait(10))
+            with self.assertRaises(AsientoNoDisponible) as error:
+                reservar_asientos(self.viaje, [(self.pasajeros[0], self.asientos[0]),
+                                               (self.pasajeros[1], self.asientos[1])], cliente=self.cliente)
+            self.assertEqual(error.exception.conflictos, {self.asientos[0]: 'En proceso'})
+            self.assertFalse(Pasaje.objects.exists())
+        finally:
+            liberar.set()
+            hilo.join()
+
+        reservar_asientos(self.viaje, [(self.pasajeros[0], self.asientos[0])], cliente=self.cliente)
+        self.assertEqual(AsientoViaje.objects.get(viaje=self.viaje, asiento_id=self.asientos[0]).estado, 'Ocupado')
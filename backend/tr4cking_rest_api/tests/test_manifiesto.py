@@ -0,0 +1,60 @@
+import csv
+import io
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .. import manifiesto
+from ..models import Asiento, Encomienda, Pasaje, Viaje
+from . import datos
+
+
+class ManifiestoTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje(capacidad=4)
+        self.viaje = base['viaje']
+        a, b, c = base['paradas']
+        cliente, pasajeros, reserva = datos.cliente_y_pasajeros(3)
+        uno, dos = Asiento.objects.filter(bus=base['bus']).order_by('numero_asiento')[:2]
+        # El asiento 1 se usa dos veces (A-B y B-C); el 2 hace la ruta completa
+        for asiento, pasajero, origen, destino in ((uno, pasajeros[0], a, b), (uno, pasajeros[1], b, c),
+                                                   (dos, pasajeros[2], None, None)):
+            Pasaje.objects.create(reserva=reserva, viaje=self.viaje, asiento=asiento, pasajero=pasajero,
+                                  origen=origen, destino=destino)
+        for origen, sobres, paquetes in ((a, 0, 1), (b, 2, 0)):
+            Encomienda.objects.create(
+                viaje=self.viaje, cliente=cliente, origen=origen, destino=c, flete=10000, remitente='Ana',
+                ruc_ci='123', numero_contacto='0981', tipo_envio='ambos', cantidad_sobre=sobres, cantidad_paquete=paquetes,
+            )
+
+    def test_carga_por_parada(self):
+        viaje = Viaje.objects.select_related('ruta', 'bus').get(pk=self.viaje.pk)
+        with self.assertNumQueries(3):
+            datos_manifiesto = manifiesto.manifiesto(viaje)
+        a, b, c = datos_manifiesto['paradas']
+        self.assertEqual([len(a['suben']), len(b['suben']), len(c['suben'])], [2, 1, 0])
+        self.assertEqual([a['bajan'], b['bajan'], c['bajan']], [0, 1, 2])
+        self.assertEqual(a['a_bordo'], {'pasajeros': 2, 'asientos_libres': 2, 'encomiendas': 1, 'sobres': 0, 'paquetes': 1})
+        self.assertEqual(b['a_bordo'], {'pasajeros': 2, 'asientos_libres': 2, 'encomiendas': 2, 'sobres': 2, 'paquetes': 1})
+        self.assertEqual(c['a_bordo'], {'pasajeros': 0, 'asientos_libres': 4, 'encomiendas': 0, 'sobres': 0, 'paquetes': 0})
+        self.assertEqual(c['descargar'], {'encomiendas': 2, 'sobres': 2, 'paquetes': 1})
+        self.assertEqual(a['suben'][1]['destino'], 'C')
+        self.assertEqual(datos_manifiesto['totales'], {
+            'pasajeros': 3, 'max_a_bordo': 2, 'encomiendas': 2, 'sobres': 2, 'paquetes': 1,
+        })
+
+    def test_endpoint_y_exportaciones(self):
+        client = APIClient()
+        url = f'/api/viajes/{self.viaje.pk}/manifiesto/'
+        self.assertEqual(client.get(url).data['totales']['pasajeros'], 3)
+
+        response = client.get(url, {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        filas = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([fila['tipo'] for fila in filas], ['pasajero', 'pasajero', 'pasajero', 'encomienda', 'encomienda'])
+        self.assertEqual({fila['parada'] for fila in filas if fila['tipo'] == 'encomienda'}, {'C'})
+
+        response = client.get(url, {'format': 'pdf'})
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF-1.4'))
+        self.assertIn(b'MANIFIESTO', response.content)
@@ -0,0 +1,104 @@
+from datetime import date
+
+from django.db import transaction
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..cajas import abrir_sesion
+from ..models import CabeceraFactura, PuntoExpedicion
+from ..numeracion import NumeracionNoDisponible, asignar_numeros, punto_para
+from . import datos
+
+
+class AsignarNumerosTests(TestCase):
+    def setUp(self):
+        self.parada = datos.ruta_con_viaje()['paradas'][0]
+        self.timbrado = datos.timbrado()
+        self.punto = datos.punto(self.timbrado, self.parada)
+
+    def numero_actual(self, punto=None):
+        return PuntoExpedicion.objects.get(pk=(punto or self.punto).pk).numero_actual
+
+    def test_numeros_consecutivos_con_formato(self):
+        _, numeros = asignar_numeros(self.punto, 3)
+        self.assertEqual(numeros, ['001-001-0000001', '001-001-0000002', '001-001-0000003'])
+        _, (siguiente,) = asignar_numeros(self.punto)
+        self.assertEqual(siguiente, '001-001-0000004')
+
+    def test_transaccion_revertida_no_deja_huecos(self):
+        asignar_numeros(self.punto)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                asignar_numeros(self.punto, 2)
+                raise RuntimeError('la factura no se guardó')
+        self.assertEqual(self.numero_actual(), 1)
+        _, (numero,) = asignar_numeros(self.punto)
+        self.assertEqual(numero, '001-001-0000002')
+
+    def test_rango_agotado_no_avanza_el_contador(self):
+        punto = datos.punto(self.timbrado, self.parada, codigo='002', numero_hasta=2)
+        asignar_numeros(punto, 2)
+        with self.assertRaises(NumeracionNoDisponible):
+            asignar_numeros(punto)
+        self.assertEqual(self.numero_actual(punto), 2)
+
+    def test_timbrado_vencido(self):
+        vencido = datos.timbrado('99999999', date(2020, 1, 1), date(2020, 12, 31))
+        punto = datos.punto(vencido, self.parada)
+        with self.assertRaises(NumeracionNoDisponible):
+            asignar_numeros(punto, fecha=date(2021, 1, 1))
+        self.assertEqual(self.numero_actual(punto), 0)
+
+    def test_punto_propio_de_la_caja(self):
+        caja = datos.caja()
+        propio = datos.punto(self.timbrado, self.parada, caja=caja, codigo='002')
+        self.assertEqual(punto_para(self.timbrado, self.parada, caja), propio)
+        self.assertEqual(punto_para(self.timbrado, self.parada, datos.caja('Caja 2')), self.punto)
+        self.assertEqual(punto_para(self.timbrado, self.parada), self.punto)
+
+
+class FacturaApiNumeracionTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje()
+        self.parada = base['paradas'][0]
+        self.timbrado = datos.timbrado()
+        self.compartido = datos.punto(self.timbrado, self.parada)
+        self.cajas = [datos.caja('Caja 1'), datos.caja('Caja 2')]
+        self.propios = [
+            datos.punto(self.timbrado, self.parada, caja=caja, codigo=f'00{i}')
+            for i, caja in enumerate(self.cajas, start=2)
+        ]
+        self.empleados = [datos.empleado(base['empresa'], cedula) for cedula in (100, 101)]
+        for caja, empleado in zip(self.cajas, self.empleados):
+            abrir_sesion(caja, empleado)
+        self.client = APIClient()
+
+    def crear(self, empleado, **extra):
+        return self.client.post('/api/facturas/', {
+            'empleado': empleado.pk, 'timbrado': self.timbrado.pk, 'parada': self.parada.pk,
+            'monto_total': '10000', 'estado': 'Emitida', **extra,
+        }, format='json')
+
+    def test_cada_cajero_numera_con_el_punto_de_su_caja(self):
+        for empleado, punto in [(self.empleados[0], self.propios[0]), (self.empleados[1], self.propios[1]),
+                                (self.empleados[0], self.propios[0])]:
+            response = self.crear(empleado)
+            self.assertEqual(response.status_code, 201, response.data)
+            self.assertEqual(response.data['punto_expedicion'], punto.pk)
+        self.assertEqual(
+            sorted(CabeceraFactura.objects.values_list('numero_factura', flat=True)),
+            ['001-002-0000001', '001-002-0000002', '001-003-0000001'],
+        )
+        self.assertEqual(PuntoExpedicion.objects.get(pk=self.compartido.pk).numero_actual, 0)
+
+    def test_sin_punto_propio_usa_el_compartido(self):
+        PuntoExpedicion.objects.filter(pk=self.propios[0].pk).update(activo=False)
+        response = self.crear(self.empleados[0])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['numero_factura'], '001-001-0000001')
+
+    def test_numero_repetido_no_consume_numeracion(self):
+        numero = self.crear(self.empleados[0]).data['numero_factura']
+        response = self.crear(self.empleados[0], numero_factura=numero)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(PuntoExpedicion.objects.get(pk=self.propios[0].pk).numero_actual, 1)
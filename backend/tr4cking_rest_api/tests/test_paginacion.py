@@ -0,0 +1,49 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from ..models import Viaje
+from ..paginacion import CursorPaginacion
+from . import datos
+
+
+class CursorPaginacionTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje(fecha=date(2030, 1, 1))
+        for dia in range(2, 6):
+            Viaje.objects.create(ruta=base['ruta'], bus=base['bus'], fecha=date(2030, 1, dia))
+        self.base = base
+        self.client = APIClient()
+
+    def fechas(self, response):
+        return [viaje['fecha'] for viaje in response.data['results']]
+
+    def test_recorre_todas_las_paginas_en_orden(self):
+        response = self.client.get('/api/viajes/', {'page_size': 2, 'fields': 'id_viaje,fecha'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['previous'])
+        fechas = self.fechas(response)
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            fechas += self.fechas(response)
+        self.assertEqual(fechas, [f'2030-01-0{dia}' for dia in range(5, 0, -1)])
+
+    def test_una_alta_entre_paginas_no_repite_filas(self):
+        response = self.client.get('/api/viajes/', {'page_size': 2, 'fields': 'id_viaje,fecha'})
+        vistos = self.fechas(response)
+        Viaje.objects.create(ruta=self.base['ruta'], bus=self.base['bus'], fecha=date(2030, 1, 9))
+        response = self.client.get(response.data['next'])
+        self.assertEqual(vistos + self.fechas(response), ['2030-01-05', '2030-01-04', '2030-01-03', '2030-01-02'])
+
+    def test_page_size_tiene_tope(self):
+        request = Request(APIRequestFactory().get('/api/viajes/', {'page_size': 100000}))
+        self.assertEqual(CursorPaginacion().get_page_size(request), CursorPaginacion.max_page_size)
+        response = self.client.get('/api/viajes/', {'page_size': 100000, 'fields': 'id_viaje'})
+        self.assertEqual((len(response.data['results']), response.data['next']), (5, None))
+
+    def test_catalogos_sin_paginar(self):
+        response = self.client.get('/api/empresas/')
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 1)
@@ -0,0 +1,71 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import Encomienda, EventoEncomienda
+from ..seguimiento import EventoInvalido, rastrear, registrar_evento
+from . import datos
+
+
+class SeguimientoTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje()
+        self.viaje, self.paradas = base['viaje'], base['paradas']
+        cliente, _, _ = datos.cliente_y_pasajeros(1)
+        self.encomienda = Encomienda.objects.create(
+            viaje=self.viaje, cliente=cliente, origen=self.paradas[0], destino=self.paradas[2], flete=10000,
+            remitente='Ana', ruc_ci='123', numero_contacto='0981', tipo_envio='paquete', cantidad_paquete=1,
+        )
+
+    def actual(self):
+        return Encomienda.objects.get(pk=self.encomienda.pk)
+
+    def test_recibida_al_crearse(self):
+        encomienda = self.actual()
+        self.assertEqual((encomienda.estado, encomienda.ubicacion), ('Recibida', self.paradas[0]))
+        self.assertEqual(len(encomienda.codigo_seguimiento), 10)
+        self.assertEqual(list(encomienda.eventos.values_list('tipo', flat=True)), ['Recibida'])
+
+    def test_recorrido_completo(self):
+        registrar_evento(self.encomienda, 'Cargada')
+        registrar_evento(self.encomienda, 'Llegada', parada=self.paradas[1])
+        registrar_evento(self.encomienda, 'Llegada', parada=self.paradas[2])
+        evento = registrar_evento(self.encomienda, 'Entregada')
+        encomienda = self.actual()
+        self.assertEqual((encomienda.estado, encomienda.ubicacion, encomienda.fecha_estado),
+                         ('Entregada', self.paradas[2], evento.fecha))
+        eventos = list(encomienda.eventos.order_by('fecha', 'pk').values_list('tipo', 'viaje_id'))
+        self.assertEqual(eventos, [('Recibida', None), ('Cargada', self.viaje.pk), ('Llegada', self.viaje.pk),
+                                   ('Llegada', self.viaje.pk), ('Entregada', None)])
+
+    def test_transiciones_invalidas(self):
+        with self.assertRaises(EventoInvalido):
+            registrar_evento(self.encomienda, 'Llegada', parada=self.paradas[1])
+        with self.assertRaises(EventoInvalido):
+            registrar_evento(self.encomienda, 'Entregada', parada=self.paradas[2])  # No está ahí
+        with self.assertRaises(EventoInvalido):
+            registrar_evento(self.encomienda, 'Perdida')
+        registrar_evento(self.encomienda, 'Entregada')
+        with self.assertRaises(EventoInvalido):
+            registrar_evento(self.encomienda, 'Cargada')
+        self.assertEqual(EventoEncomienda.objects.filter(encomienda=self.encomienda).count(), 2)
+
+    def test_rastrear_en_una_consulta(self):
+        codigo = self.actual().codigo_seguimiento
+        with self.assertNumQueries(1):
+            encomienda = rastrear(f' {codigo.lower()} ')
+            self.assertEqual(encomienda.ubicacion.nombre, 'A')
+        self.assertIsNone(rastrear('NOEXISTE00'))
+
+    def test_endpoints(self):
+        client = APIClient()
+        codigo = self.actual().codigo_seguimiento
+        response = client.post(f'/api/encomiendas/{self.encomienda.pk}/eventos/', {'tipo': 'Cargada'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        response = client.post(f'/api/encomiendas/{self.encomienda.pk}/eventos/', {'tipo': 'Cargada'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        response = client.get(f'/api/encomiendas/rastrear/{codigo}/', {'historial': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['estado'], 'Cargada')
+        self.assertNotIn('remitente', response.data)
+        self.assertEqual([evento['tipo'] for evento in response.data['eventos']], ['Recibida', 'Cargada'])
+        self.assertEqual(client.get('/api/encomiendas/rastrear/NOEXISTE00/').status_code, 404)
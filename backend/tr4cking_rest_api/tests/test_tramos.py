@@ -0,0 +1,85 @@
+from datetime import time
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import MAX_PARADAS_RUTA, Asiento, AsientoViaje, DetalleRuta, Localidad, Parada, Ruta, TramoRuta, Viaje
+from ..serializers import PasajeSerializer
+from ..tramos import RutaDemasiadoLarga, mascara_tramo, reconstruir_tramos
+from . import datos
+
+
+class MascaraTramoTests(TestCase):
+    def test_bits_de_los_tramos(self):
+        self.assertEqual(mascara_tramo(0, 1), 0b1)
+        self.assertEqual(mascara_tramo(1, 3), 0b110)
+
+    def test_ultima_parada_admitida_entra_en_un_bigint(self):
+        self.assertEqual(mascara_tramo(0, MAX_PARADAS_RUTA - 1), 2 ** 63 - 1)
+        with self.assertRaises(RutaDemasiadoLarga):
+            mascara_tramo(0, MAX_PARADAS_RUTA)
+
+
+class LimiteParadasTests(TestCase):
+    def setUp(self):
+        localidad = Localidad.objects.create(nombre='Asunción')
+        self.paradas = Parada.objects.bulk_create([
+            Parada(localidad=localidad, nombre=f'Parada {i}', direccion='Ruta 1') for i in range(MAX_PARADAS_RUTA + 1)
+        ])
+        self.ruta = Ruta.objects.create(nombre='Larga')
+        # Sin señales: los tramos se arman una sola vez al final
+        DetalleRuta.objects.bulk_create([
+            DetalleRuta(ruta=self.ruta, parada=parada, orden=orden, hora_salida=time(6))
+            for orden, parada in enumerate(self.paradas[:MAX_PARADAS_RUTA], start=1)
+        ])
+        reconstruir_tramos(self.ruta.pk)
+        self.sobrante = DetalleRuta(ruta=self.ruta, parada=self.paradas[-1], orden=MAX_PARADAS_RUTA + 1)
+
+    def test_ruta_en_el_limite(self):
+        ruta_completa = TramoRuta.objects.get(ruta=self.ruta, posicion_origen=0, posicion_destino=MAX_PARADAS_RUTA - 1)
+        self.assertEqual(ruta_completa.mascara, 2 ** 63 - 1)
+
+    def test_clean_rechaza_una_parada_de_mas(self):
+        with self.assertRaises(ValidationError):
+            self.sobrante.full_clean()
+        existente = DetalleRuta.objects.filter(ruta=self.ruta).first()
+        existente.full_clean()
+
+    def test_api_rechaza_una_parada_de_mas(self):
+        response = APIClient().post('/api/detalle-rutas/', {
+            'ruta': self.ruta.pk, 'parada': self.paradas[-1].pk, 'orden': MAX_PARADAS_RUTA + 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(DetalleRuta.objects.filter(ruta=self.ruta).count(), MAX_PARADAS_RUTA)
+
+    def test_reconstruir_no_toca_los_tramos(self):
+        DetalleRuta.objects.bulk_create([self.sobrante])
+        antes = TramoRuta.objects.filter(ruta=self.ruta).count()
+        with self.assertRaises(RutaDemasiadoLarga):
+            reconstruir_tramos(self.ruta.pk)
+        self.assertEqual(TramoRuta.objects.filter(ruta=self.ruta).count(), antes)
+
+
+class PasajeSinTramosTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje()
+        self.viaje, self.paradas = base['viaje'], base['paradas']
+        ruta = Ruta.objects.create(nombre='Solo A')
+        DetalleRuta.objects.create(ruta=ruta, parada=self.paradas[0], orden=1, hora_salida=time(6))
+        Viaje.objects.filter(pk=self.viaje.pk).update(ruta=ruta)
+        self.viaje.refresh_from_db()
+        _, pasajeros, reserva = datos.cliente_y_pasajeros(1)
+        self.asiento = Asiento.objects.filter(bus=base['bus']).first()
+        self.datos = {'reserva': reserva.pk, 'viaje': self.viaje.pk, 'asiento': self.asiento.pk, 'pasajero': pasajeros[0].pk}
+
+    def test_pasaje_de_viaje_completo(self):
+        self.assertFalse(TramoRuta.objects.filter(ruta=self.viaje.ruta).exists())
+        serializer = PasajeSerializer(data=self.datos)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertEqual(AsientoViaje.objects.get(viaje=self.viaje, asiento=self.asiento).estado, 'Ocupado')
+
+    def test_con_origen_sigue_rechazandose(self):
+        serializer = PasajeSerializer(data={**self.datos, 'origen': self.paradas[0].pk})
+        self.assertFalse(serializer.is_valid())
@@ -0,0 +1,52 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import CabeceraFactura, DetalleFactura, Encomienda, VentaDiaria
+from ..ventas_diarias import CAMPOS, recalcular
+from . import datos
+
+historico = import_module('tr4cking_rest_api.migrations.0019_ventas_diarias_historico')
+
+
+class HistoricoTests(TestCase):
+    def setUp(self):
+        base = datos.ruta_con_viaje()
+        cliente, _, _ = datos.cliente_y_pasajeros(1)
+        empleado, timbrado = datos.empleado(base['empresa']), datos.timbrado()
+        self.encomienda = Encomienda.objects.create(
+            viaje=base['viaje'], cliente=cliente, origen=base['paradas'][0], destino=base['paradas'][2], flete=22000,
+            remitente='Ana', ruc_ci='123', numero_contacto='0981', tipo_envio='paquete', cantidad_paquete=1,
+        )
+        for estado, numero in (('Emitida', '001-001-0000001'), ('Anulada', '001-001-0000002')):
+            factura = CabeceraFactura.objects.create(
+                cliente=cliente, empleado=empleado, timbrado=timbrado, parada=base['paradas'][0],
+                numero_factura=numero, monto_total=22000, estado=estado,
+            )
+            DetalleFactura.objects.create(
+                factura=factura, encomienda=self.encomienda, precio_unitario=22000, descripcion='Encomienda',
+                iva_porcentaje=10, subtotal=22000,
+            )
+
+    def celdas(self):
+        return {celda.clave: tuple(getattr(celda, campo) for campo in CAMPOS) for celda in VentaDiaria.objects.all()}
+
+    def test_reconstruye_la_historia(self):
+        VentaDiaria.objects.all().delete()
+        historico.poblar_ventas_diarias(apps, None)
+        celdas = self.celdas()
+        self.assertEqual(len(celdas), 1)
+        (valores,) = celdas.values()
+        self.assertEqual(dict(zip(CAMPOS, valores)), {
+            'pasajes_vendidos': 0, 'encomiendas': 1, 'monto_total': 22000, 'monto_exenta': 0,
+            'monto_iva_5': 0, 'monto_iva_10': 2000,
+        })
+
+    def test_coincide_con_recalcular(self):
+        historico.poblar_ventas_diarias(apps, None)
+        poblado = self.celdas()
+        hoy = timezone.localdate()
+        self.assertEqual(recalcular(hoy, hoy), (0, 0, 0))
+        self.assertEqual(self.celdas(), poblado)
@@ -0,0 +1,108 @@
+"""
+Tabla materializada de tramos (pares ordenados de paradas) por ruta.
+
+Se mantiene desde las señales de DetalleRuta y Ruta: cada cambio recalcula
+los pares de esa ruta y aplica solo la diferencia (altas, bajas y horarios
+modificados), así las búsquedas origen-destino, tarifas y ocupación por
+tramo se resuelven con una lectura indexada de TramoRuta.
+"""
+from django.db import transaction
+
+from .models import MAX_PARADAS_RUTA, DetalleRuta, TramoRuta
+
+# Sin tramos calculados (ruta sin paradas) se toma el viaje completo
+MASCARA_VIAJE = -1
+
+
+class RutaDemasiadoLarga(Exception):
+    """La ruta tiene más paradas de las que entran en una máscara de tramos."""
+
+
+def mascara_tramo(posicion_origen, posicion_destino):
+    """Bits de los tramos elementales entre dos posiciones de la ruta."""
+    if posicion_destino >= MAX_PARADAS_RUTA:
+        raise RutaDemasiadoLarga(f"Una ruta admite hasta {MAX_PARADAS_RUTA} paradas")
+    return ((1 << (posicion_destino - posicion_origen)) - 1) << posicion_origen
+
+
+def tramos_de_paradas(paradas):
+    """
+    Pares ordenados para una lista de (parada_id, hora_salida) en orden de
+    recorrido: {(origen, destino): datos}.
+    """
+    pares = {}
+    for i, (origen, salida) in enumerate(paradas):
+        for j in range(i + 1, len(paradas)):
+            destino, llegada = paradas[j]
+            pares[(origen, destino)] = {
+                'posicion_origen': i,
+                'posicion_destino': j,
+                'cantidad_paradas': j - i,
+                'hora_salida': salida,
+                'hora_llegada': llegada,
+                'mascara': mascara_tramo(i, j),
+            }
+    return pares
+
+
+def reconstruir_tramos(ruta_id):
+    """
+    Sincroniza los tramos de la ruta con su DetalleRuta actual. Devuelve
+    True si cambió la numeración de los tramos (altas, bajas o
+    posiciones), caso en que la ocupación vendida debe recalcularse.
+    Lanza RutaDemasiadoLarga, sin tocar los tramos, si la ruta pasa de
+    MAX_PARADAS_RUTA paradas.
+    """
+    paradas = list(
+        DetalleRuta.objects.filter(ruta_id=ruta_id).order_by('orden').values_list('parada_id', 'hora_salida')
+    )
+    if len(paradas) > MAX_PARADAS_RUTA:
+        raise RutaDemasiadoLarga(f"La ruta {ruta_id} tiene {len(paradas)} paradas; el máximo es {MAX_PARADAS_RUTA}")
+    deseados = tramos_de_paradas(paradas)
+    campos = ['posicion_origen', 'posicion_destino', 'cantidad_paradas', 'hora_salida', 'hora_llegada', 'mascara']
+
+    with transaction.atomic():
+        existentes = {
+            (tramo.origen_id, tramo.destino_id): tramo
+            for tramo in TramoRuta.objects.select_for_update().filter(ruta_id=ruta_id)
+        }
+        sobrantes = [tramo.pk for par, tramo in existentes.items() if par not in deseados]
+        if sobrantes:
+            TramoRuta.objects.filter(pk__in=sobrantes).delete()
+
+        nuevos, modificados, renumerados = [], [], bool(sobrantes)
+        for (origen, destino), datos in deseados.items():
+            tramo = existentes.get((origen, destino))
+            if tramo is None:
+                nuevos.append(TramoRuta(ruta_id=ruta_id, origen_id=origen, destino_id=destino, **datos))
+            elif any(getattr(tramo, campo) != valor for campo, valor in datos.items()):
+                renumerados = renumerados or tramo.mascara != datos['mascara']
+                for campo, valor in datos.items():
+                    setattr(tramo, campo, valor)
+                modificados.append(tramo)
+        TramoRuta.objects.bulk_create(nuevos)
+        TramoRuta.objects.bulk_update(modificados, campos)
+    return renumerados or bool(nuevos)
+
+
+def resolver_tramo(ruta_id, origen_id=None, destino_id=None):
+    """
+    Tramo de la ruta entre origen y destino. Si falta alguno se toma el
+    extremo de la ruta (primera o última parada). Devuelve None si las
+    paradas no están en la ruta o están en orden inverso.
+    """
+    tramos = TramoRuta.objects.filter(ruta_id=ruta_id).select_related('origen', 'destino')
+    if origen_id is not None:
+        tramos = tramos.filter(origen_id=origen_id)
+    if destino_id is not None:
+        tramos = tramos.filter(destino_id=destino_id)
+    return tramos.order_by('posicion_origen', '-posicion_destino').first()
+
+
+def mascara_de(ruta_id, origen_id=None, destino_id=None):
+    """Máscara del tramo, o None si origen/destino no son válidos para la ruta."""
+    tramo = resolver_tramo(ruta_id, origen_id, destino_id)
+    if tramo is not None:
+        return tramo.mascara
+    # Sin origen ni destino solo falla si la ruta no tiene tramos
+    return MASCARA_VIAJE if origen_id is None and destino_id is None else None
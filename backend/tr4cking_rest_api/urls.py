@@ -5,11 +5,11 @@ from .views import (
     UserViewSet, GroupViewSet, PermissionViewSet,
     PersonaViewSet, UsuarioPersonaViewSet, ClienteViewSet, PasajeroViewSet,
     EmpresaViewSet, EmpleadoViewSet, LocalidadViewSet, ParadaViewSet, BusViewSet,
-    AsientoViewSet, RutaViewSet, DetalleRutaViewSet, ViajeViewSet, 
+    AsientoViewSet, RutaViewSet, DetalleRutaViewSet, HorarioViewSet, ViajeViewSet, 
     PasajeViewSet, ReservaViewSet, EncomiendaViewSet,
-    TipoDocumentoViewSet, TimbradoViewSet, CabeceraFacturaViewSet,
+    TipoDocumentoViewSet, TimbradoViewSet, PuntoExpedicionViewSet, CabeceraFacturaViewSet,
     DetalleFacturaViewSet, HistorialFacturaViewSet, CajaViewSet,
-    CabeceraCajaViewSet, DetalleCajaViewSet
+    CabeceraCajaViewSet, DetalleCajaViewSet, InstrumentacionView
 )
 
 
@@ -42,7 +42,7 @@ router.register(r'asientos', AsientoViewSet)
 # Rutas
 router.register(r'rutas', RutaViewSet)
 router.register(r'detalle-rutas', DetalleRutaViewSet)
-#router.register(r'horarios', HorarioViewSet)
+router.register(r'horarios', HorarioViewSet)
 
 # Viajes y Servicios
 router.register(r'viajes', ViajeViewSet)
@@ -53,6 +53,7 @@ router.register(r'encomiendas', EncomiendaViewSet)
 
 router.register(r'tipos-documento', TipoDocumentoViewSet)
 router.register(r'timbrados', TimbradoViewSet)
+router.register(r'puntos-expedicion', PuntoExpedicionViewSet)
 router.register(r'facturas', CabeceraFacturaViewSet)
 router.register(r'detalles-factura', DetalleFacturaViewSet)
 router.register(r'historial-facturas', HistorialFacturaViewSet)
@@ -64,5 +65,6 @@ router.register(r'detalle-caja', DetalleCajaViewSet)
 
 
 urlpatterns = [
+    path('instrumentacion/', InstrumentacionView.as_view(), name='instrumentacion'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,150 @@
+"""
+Resumen diario de ventas (VentaDiaria) por fecha, empresa, ruta y parada.
+
+Cada línea de factura y cada encomienda aporta a una de esas celdas. Las
+señales calculan el aporte de la fila antes y después del cambio y suman
+solo la diferencia con F(), así dos ventas simultáneas no se pisan.
+recalcular() rehace un rango de fechas desde las tablas de movimiento con el
+mismo cálculo y corrige las celdas que no coinciden (conciliación nocturna).
+
+Las líneas cargadas con bulk_create no disparan señales: quien las cree debe
+llamar a aplicar() con su aporte.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce, TruncDate
+
+from .models import DetalleFactura, Encomienda, VentaDiaria
+
+CAMPOS = ('pasajes_vendidos', 'encomiendas', 'monto_total', 'monto_exenta', 'monto_iva_5', 'monto_iva_10')
+DIMENSIONES = ('fecha', 'empresa_id', 'ruta_id', 'parada_id')
+
+# Facturas que no cuentan como venta
+ESTADOS_EXCLUIDOS = ('Anulada',)
+
+CENTIMOS = Decimal('0.01')
+
+
+def _clave(fecha, empresa_id, ruta_id, parada_id):
+    return f'{fecha.isoformat()}:{empresa_id or 0}:{ruta_id or 0}:{parada_id or 0}'
+
+
+def iva_incluido(monto, porcentaje):
+    """IVA contenido en un precio con IVA incluido (monto * 5/105 o 10/110)."""
+    return (monto * porcentaje / (100 + porcentaje)).quantize(CENTIMOS)
+
+
+def filas_lineas(lineas):
+    return lineas.exclude(factura__estado__in=ESTADOS_EXCLUIDOS).values(
+        'pasaje', 'cantidad', 'subtotal', 'iva_porcentaje',
+        fecha=F('factura__fecha_factura'),
+        empresa_id=Coalesce('pasaje__viaje__bus__empresa', 'encomienda__viaje__bus__empresa'),
+        ruta_id=Coalesce('pasaje__viaje__ruta', 'encomienda__viaje__ruta'),
+        parada_id=F('factura__parada'),
+    )
+
+
+def filas_encomiendas(encomiendas):
+    return encomiendas.values(
+        fecha=TruncDate('fecha_creacion'),
+        empresa_id=F('viaje__bus__empresa'),
+        ruta_id=F('viaje__ruta'),
+        parada_id=F('origen'),
+    )
+
+
+def aportes(lineas=(), encomiendas=()):
+    """Totales por celda ({clave: {dimensiones y CAMPOS}}) de las filas dadas."""
+    totales = {}
+
+    def celda(fila):
+        clave = _clave(*(fila[dimension] for dimension in DIMENSIONES))
+        if clave not in totales:
+            totales[clave] = {
+                **{dimension: fila[dimension] for dimension in DIMENSIONES},
+                **dict.fromkeys(CAMPOS, 0),
+            }
+        return totales[clave]
+
+    for fila in lineas:
+        actual = celda(fila)
+        monto = fila['subtotal']
+        if fila['pasaje'] is not None:
+            actual['pasajes_vendidos'] += fila['cantidad']
+        actual['monto_total'] += monto
+        if fila['iva_porcentaje'] == 5:
+            actual['monto_iva_5'] += iva_incluido(monto, 5)
+        elif fila['iva_porcentaje'] == 10:
+            actual['monto_iva_10'] += iva_incluido(monto, 10)
+        else:
+            actual['monto_exenta'] += monto
+    for fila in encomiendas:
+        celda(fila)['encomiendas'] += 1
+    return totales
+
+
+def aportes_lineas(lineas):
+    return aportes(lineas=filas_lineas(lineas))
+
+
+def aportes_encomiendas(encomiendas):
+    return aportes(encomiendas=filas_encomiendas(encomiendas))
+
+
+def aplicar(nuevos, anteriores=None):
+    """Suma al resumen la diferencia entre dos aportes (después - antes)."""
+    anteriores = anteriores or {}
+    with transaction.atomic():
+        for clave in sorted(nuevos.keys() | anteriores.keys()):
+            despues, antes = nuevos.get(clave, {}), anteriores.get(clave, {})
+            delta = {campo: despues.get(campo, 0) - antes.get(campo, 0) for campo in CAMPOS}
+            delta = {campo: valor for campo, valor in delta.items() if valor}
+            if not delta:
+                continue
+            celda = despues or antes
+            VentaDiaria.objects.get_or_create(
+                clave=clave, defaults={dimension: celda[dimension] for dimension in DIMENSIONES}
+            )
+            VentaDiaria.objects.filter(clave=clave).update(
+                **{campo: F(campo) + valor for campo, valor in delta.items()}
+            )
+
+
+def recalcular(desde, hasta):
+    """
+    Recalcula las celdas de `desde` a `hasta` (inclusive) desde las facturas
+    y encomiendas y corrige las que difieran. Devuelve la cantidad de
+    celdas creadas, modificadas y eliminadas.
+    """
+    lineas = filas_lineas(DetalleFactura.objects.filter(factura__fecha_factura__range=(desde, hasta)))
+    encomiendas = filas_encomiendas(Encomienda.objects.filter(fecha_creacion__date__range=(desde, hasta)))
+
+    with transaction.atomic():
+        existentes = {
+            celda.clave: celda
+            for celda in VentaDiaria.objects.select_for_update().filter(fecha__range=(desde, hasta))
+        }
+        totales = aportes(lineas.iterator(chunk_size=2000), encomiendas.iterator(chunk_size=2000))
+
+        nuevas, modificadas = [], []
+        for clave, valores in totales.items():
+            celda = existentes.pop(clave, None)
+            if celda is None:
+                nuevas.append(VentaDiaria(clave=clave, **valores))
+            elif any(getattr(celda, campo) != valores[campo] for campo in CAMPOS):
+                for campo in CAMPOS:
+                    setattr(celda, campo, valores[campo])
+                modificadas.append(celda)
+        VentaDiaria.objects.bulk_create(nuevas, batch_size=1000)
+        VentaDiaria.objects.bulk_update(modificadas, CAMPOS, batch_size=1000)
+        VentaDiaria.objects.filter(pk__in=[celda.pk for celda in existentes.values()]).delete()
+    return len(nuevas), len(modificadas), len(existentes)
+
+
+def dias(desde, hasta):
+    while desde <= hasta:
+        yield desde
+        desde += timedelta(days=1)
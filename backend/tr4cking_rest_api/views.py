@@ -1,6 +1,12 @@
 # views.py
 from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
 from .models import (
@@ -8,7 +14,7 @@ from .models import (
     Empleado, Localidad, Parada, Bus, Asiento, Ruta, DetalleRuta,
     Viaje, Pasaje, Reserva, Encomienda, TipoDocumento, Timbrado,
     CabeceraFactura, DetalleFactura, HistorialFactura, Caja,
-    CabeceraCaja, DetalleCaja
+    CabeceraCaja, DetalleCaja, AsientoViaje, PuntoExpedicion, Horario
 )
 from .serializers import (
     UserSerializer, GroupSerializer, PermissionSerializer,
@@ -19,26 +25,48 @@ from .serializers import (
     ReservaSerializer, EncomiendaSerializer, TipoDocumentoSerializer,
     TimbradoSerializer, CabeceraFacturaSerializer, DetalleFacturaSerializer,
     HistorialFacturaSerializer, CajaSerializer, CabeceraCajaSerializer,
-    DetalleCajaSerializer
+    DetalleCajaSerializer, AsientoViajeSerializer, RetencionAsientosSerializer,
+    ReservaMasivaSerializer, BusquedaViajeSerializer, BusquedaPersonaSerializer, PuntoExpedicionSerializer,
+    EmisionFacturaSerializer, CierreCajaSerializer, ImportacionPersonasSerializer,
+    EventoEncomiendaSerializer, EventoRastreoSerializer, RastreoEncomiendaSerializer,
+    HorarioSerializer, GeneracionViajesSerializer, AsignacionBusesSerializer
 )
+from .busqueda import buscar_personas, buscar_viajes
+from .cache_catalogos import CacheCatalogoMixin
+from .consultas import ConsultaOptimizadaMixin
+from .inventario import AsientoNoDisponible, retener_asientos, liberar_asientos, reservar_asientos
+from .tramos import MASCARA_VIAJE, resolver_tramo
+from .facturacion import FacturacionError, ItemsYaFacturados, emitir_factura
+from .cajas import CajaNoDisponible, cerrar_caja
+from .importacion import ArchivoInvalido, importar_personas, leer_filas
+from .horarios import generar_viajes
+from . import asignacion_buses
+from .asignacion_buses import AsignacionInvalida
+from .exportacion import CSVRenderer, ExportacionMixin, PDFRenderer, respuesta_filas, respuesta_pdf
+from . import manifiesto
+from .seguimiento import EventoInvalido, registrar_evento
+from . import seguimiento
+from . import instrumentacion
 
 User = get_user_model()
 
 # Authentication ViewSets
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
     permission_classes = [AllowAny]
+    pagination_class = None
 
 class PermissionViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Permission.objects.all()
     serializer_class = PermissionSerializer
     permission_classes = [AllowAny]
+    pagination_class = None
 
 # Personas y Usuarios ViewSets
 class PersonaViewSet(viewsets.ModelViewSet):
@@ -53,43 +81,67 @@ class PersonaViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(cedula=cedula)
         return queryset
 
-class UsuarioPersonaViewSet(viewsets.ModelViewSet):
-    queryset = UsuarioPersona.objects.select_related('user', 'cedula')
+    @action(detail=False, methods=['get'])
+    def buscar(self, request):
+        """Autocompletado por nombre, apellido, razón social o prefijo de cédula (?q=&limite=)."""
+        serializer = BusquedaPersonaSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(buscar_personas(serializer.validated_data['q'], serializer.validated_data['limite']))
+
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser], permission_classes=[IsAdminUser])
+    def importar(self, request):
+        """Alta/actualización masiva desde CSV o XLSX; informa los errores por fila."""
+        serializer = ImportacionPersonasSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        archivo = serializer.validated_data['archivo']
+        try:
+            resultado = importar_personas(
+                leer_filas(archivo.file, archivo.name),
+                clientes=serializer.validated_data['clientes'], pasajeros=serializer.validated_data['pasajeros'],
+            )
+        except ArchivoInvalido as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado.como_dict(max_errores=1000))
+
+class UsuarioPersonaViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = UsuarioPersona.objects.all()
     serializer_class = UsuarioPersonaSerializer
     permission_classes = [AllowAny]
 
 # Clientes y Pasajeros ViewSets
-class ClienteViewSet(viewsets.ModelViewSet):
-    queryset = Cliente.objects.select_related('cedula')
+class ClienteViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        queryset = Cliente.objects.select_related('cedula')
+        queryset = Cliente.objects.all()
         cedula = self.request.query_params.get('cedula', None)
         if cedula:
             queryset = queryset.filter(cedula__cedula=cedula)
         return queryset
 
-class PasajeroViewSet(viewsets.ModelViewSet):
-    queryset = Pasajero.objects.select_related('cedula')
+class PasajeroViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Pasajero.objects.all()
     serializer_class = PasajeroSerializer
     permission_classes = [AllowAny]
 
 # Empresas ViewSet
-class EmpresaViewSet(viewsets.ModelViewSet):
+class EmpresaViewSet(CacheCatalogoMixin, viewsets.ModelViewSet):
     queryset = Empresa.objects.all()
     serializer_class = EmpresaSerializer
     permission_classes = [AllowAny]
+    pagination_class = None
+    cache_modelos = [Empresa]
 
 # Empleados ViewSet
-class EmpleadoViewSet(viewsets.ModelViewSet):
-    queryset = Empleado.objects.select_related('cedula', 'empresa')
+class EmpleadoViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Empleado.objects.all()
     serializer_class = EmpleadoSerializer
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        queryset = Empleado.objects.select_related('cedula', 'empresa')
+        queryset = Empleado.objects.all()
         cedula = self.request.query_params.get('cedula', None)
         empresa = self.request.query_params.get('empresa', None)
         if cedula:
@@ -99,18 +151,21 @@ class EmpleadoViewSet(viewsets.ModelViewSet):
         return queryset
 
 # Geografia ViewSets
-class LocalidadViewSet(viewsets.ModelViewSet):
+class LocalidadViewSet(CacheCatalogoMixin, viewsets.ModelViewSet):
     queryset = Localidad.objects.all()
     serializer_class = LocalidadSerializer
     permission_classes = [AllowAny]
+    pagination_class = None
+    cache_modelos = [Localidad]
 
-class ParadaViewSet(viewsets.ModelViewSet):
-    queryset = Parada.objects.select_related('localidad')
+class ParadaViewSet(CacheCatalogoMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Parada.objects.all()
     serializer_class = ParadaSerializer
     permission_classes = [AllowAny]
+    cache_modelos = [Parada, Localidad]
 
     def get_queryset(self):
-        queryset = Parada.objects.select_related('localidad')
+        queryset = Parada.objects.all()
         localidad = self.request.query_params.get('localidad', None)
         activo = self.request.query_params.get('activo', None)
         if localidad:
@@ -120,13 +175,13 @@ class ParadaViewSet(viewsets.ModelViewSet):
         return queryset
 
 # Transporte ViewSets
-class BusViewSet(viewsets.ModelViewSet):
-    queryset = Bus.objects.select_related('empresa')
+class BusViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Bus.objects.all()
     serializer_class = BusSerializer
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        queryset = Bus.objects.select_related('empresa')
+        queryset = Bus.objects.all()
         empresa = self.request.query_params.get('empresa', None)
         estado = self.request.query_params.get('estado', None)
         if empresa:
@@ -135,13 +190,13 @@ class BusViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(estado=estado)
         return queryset
 
-class AsientoViewSet(viewsets.ModelViewSet):
-    queryset = Asiento.objects.select_related('bus')
+class AsientoViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Asiento.objects.all()
     serializer_class = AsientoSerializer
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        queryset = Asiento.objects.select_related('bus')
+        queryset = Asiento.objects.all()
         bus = self.request.query_params.get('bus', None)
         estado = self.request.query_params.get('estado', None)
         if bus:
@@ -151,29 +206,52 @@ class AsientoViewSet(viewsets.ModelViewSet):
         return queryset
 
 # Rutas ViewSets
-class RutaViewSet(viewsets.ModelViewSet):
-    queryset = Ruta.objects.prefetch_related('detalleruta_set')
+class RutaViewSet(CacheCatalogoMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Ruta.objects.all()
     serializer_class = RutaSerializer
     permission_classes = [AllowAny]
+    cache_modelos = [Ruta, DetalleRuta, Parada, Localidad]
 
-class DetalleRutaViewSet(viewsets.ModelViewSet):
-    queryset = DetalleRuta.objects.select_related('ruta', 'parada')
+class DetalleRutaViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = DetalleRuta.objects.all()
     serializer_class = DetalleRutaSerializer
     permission_classes = [AllowAny]
-"""
-class HorarioViewSet(viewsets.ModelViewSet):
-    queryset = Horario.objects.select_related('ruta')
+
+class HorarioViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Horario.objects.all()
     serializer_class = HorarioSerializer
     permission_classes = [AllowAny]
-"""
+
+    def get_queryset(self):
+        queryset = Horario.objects.all()
+        ruta = self.request.query_params.get('ruta', None)
+        activo = self.request.query_params.get('activo', None)
+        if ruta:
+            queryset = queryset.filter(ruta_id=ruta)
+        if activo is not None:
+            queryset = queryset.filter(activo=activo)
+        return queryset
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def generar(self, request):
+        """Crea los viajes de los horarios entre desde y hasta; los que ya existen se saltean."""
+        serializer = GeneracionViajesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        horarios = serializer.validated_data.get('horarios')
+        resultado = generar_viajes(
+            serializer.validated_data['desde'], serializer.validated_data['hasta'],
+            horarios=[horario.pk for horario in horarios] if horarios else None,
+        )
+        return Response(resultado.como_dict(max_sin_bus=1000))
 # Viajes y Servicios ViewSets
-class ViajeViewSet(viewsets.ModelViewSet):
-    queryset = Viaje.objects.select_related('horario', 'bus')
+class ViajeViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Viaje.objects.all()
     serializer_class = ViajeSerializer
     permission_classes = [AllowAny]
+    ordering = ('-fecha', '-id_viaje')
 
     def get_queryset(self):
-        queryset = Viaje.objects.select_related('bus')
+        queryset = Viaje.objects.all()
         fecha = self.request.query_params.get('fecha', None)
         bus = self.request.query_params.get('bus', None)
         activo = self.request.query_params.get('activo', None)
@@ -183,12 +261,132 @@ class ViajeViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(bus_id=bus)
         if activo is not None:
             queryset = queryset.filter(activo=activo)
+        if self.action == 'manifiesto':
+            queryset = queryset.select_related('ruta', 'bus')
         return queryset
 
-class ReservaViewSet(viewsets.ModelViewSet):
-    queryset = Reserva.objects.select_related('cliente')
+    def _tramo(self, viaje, origen=None, destino=None):
+        """Tramo del viaje entre origen y destino (por defecto, la ruta completa)."""
+        tramo = resolver_tramo(viaje.ruta_id, origen, destino)
+        if tramo is None and (origen or destino):
+            raise ValidationError("El origen y el destino deben ser paradas de la ruta del viaje, en ese orden")
+        return tramo
+
+    @action(detail=False, methods=['get'])
+    def buscar(self, request):
+        """Viajes de un día que pasan por origen y luego por destino."""
+        serializer = BusquedaViajeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(list(buscar_viajes(**serializer.validated_data)))
+
+    @action(detail=True, methods=['get'])
+    def asientos(self, request, pk=None):
+        """Mapa de asientos del viaje según su inventario, opcionalmente para ?origen=&destino=."""
+        viaje = self.get_object()
+        tramo = self._tramo(viaje, request.query_params.get('origen'), request.query_params.get('destino'))
+        inventario = AsientoViaje.objects.filter(viaje=viaje).select_related('asiento').order_by('asiento__numero_asiento')
+        estado = request.query_params.get('estado', None)
+        serializer = AsientoViajeSerializer(
+            inventario, many=True, context={'mascara': tramo.mascara if tramo else MASCARA_VIAJE}
+        )
+        data = serializer.data
+        if estado:
+            data = [fila for fila in data if fila['estado'] == estado]
+        return Response(data)
+
+    @action(detail=True, methods=['post'])
+    def retener(self, request, pk=None):
+        viaje = self.get_object()
+        serializer = RetencionAsientosSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tramo = self._tramo(viaje, serializer.validated_data.get('origen'), serializer.validated_data.get('destino'))
+        try:
+            hasta = retener_asientos(
+                viaje,
+                serializer.validated_data['asientos'],
+                serializer.validated_data['reserva'],
+                serializer.validated_data.get('minutos'),
+                mascara=tramo.mascara if tramo else MASCARA_VIAJE
+            )
+        except AsientoNoDisponible as e:
+            return Response({'conflictos': e.como_lista()}, status=status.HTTP_409_CONFLICT)
+        return Response({'asientos': serializer.validated_data['asientos'], 'retenido_hasta': hasta})
+
+    @action(detail=True, methods=['post'])
+    def reservar(self, request, pk=None):
+        """Crea la reserva y todos sus pasajes del viaje en una sola transacción."""
+        viaje = self.get_object()
+        serializer = ReservaMasivaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        tramo = self._tramo(viaje, datos.get('origen'), datos.get('destino'))
+        try:
+            reserva, pasajes = reservar_asientos(
+                viaje,
+                [(pasaje['pasajero'], pasaje['asiento']) for pasaje in datos['pasajes']],
+                reserva=datos.get('reserva'),
+                cliente=datos.get('cliente'),
+                tramo=tramo
+            )
+        except AsientoNoDisponible as e:
+            return Response({'conflictos': e.como_lista()}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'reserva': reserva.pk,
+            'pasajes': [
+                {'id_pasaje': pasaje.pk, 'pasajero': pasaje.pasajero_id, 'asiento': pasaje.asiento_id,
+                 'origen': pasaje.origen_id, 'destino': pasaje.destino_id}
+                for pasaje in pasajes
+            ]
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def liberar(self, request, pk=None):
+        viaje = self.get_object()
+        serializer = RetencionAsientosSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        liberados = liberar_asientos(
+            viaje,
+            serializer.validated_data['asientos'],
+            serializer.validated_data['reserva']
+        )
+        return Response({'liberados': liberados})
+
+    @action(detail=True, methods=['get'], renderer_classes=[JSONRenderer, CSVRenderer, PDFRenderer])
+    def manifiesto(self, request, pk=None):
+        """Pasajeros y encomiendas por parada, en el orden de la ruta; ?format=csv|pdf para imprimir."""
+        viaje = self.get_object()
+        datos = manifiesto.manifiesto(viaje)
+        formato = request.query_params.get('format')
+        if formato in ('csv', 'pdf'):
+            encomiendas = list(manifiesto.detalle_encomiendas(viaje))
+            nombre = f'manifiesto-{viaje.pk}'
+            if formato == 'pdf':
+                return respuesta_pdf(manifiesto.lineas(datos, encomiendas), nombre)
+            return respuesta_filas(manifiesto.filas(datos, encomiendas), manifiesto.COLUMNAS_CSV, 'csv', nombre)
+        return Response(datos)
+
+    @action(detail=False, methods=['get'], url_path='asignacion-buses')
+    def asignacion_buses(self, request):
+        """Bus propuesto para cada viaje de ?fecha= (y ?empresa=) con el mínimo de asientos vacíos; no cambia nada."""
+        serializer = AsignacionBusesSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(asignacion_buses.proponer(**serializer.validated_data))
+
+    @action(detail=False, methods=['post'], url_path='asignacion-buses/aplicar', permission_classes=[IsAdminUser])
+    def aplicar_asignacion_buses(self, request):
+        """Aplica la asignación propuesta: cambia buses, mueve los pasajes y rehace el inventario."""
+        serializer = AsignacionBusesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            return Response(asignacion_buses.aplicar(**serializer.validated_data))
+        except AsignacionInvalida as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+
+class ReservaViewSet(ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Reserva.objects.all()
     serializer_class = ReservaSerializer
     permission_classes = [AllowAny]
+    ordering = ('-fecha_reserva', '-id_reserva')
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -197,10 +395,17 @@ class ReservaViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(cliente_id=cliente)
         return queryset
     
-class PasajeViewSet(viewsets.ModelViewSet):
-    queryset = Pasaje.objects.select_related('viaje', 'asiento', 'pasajero')
+class PasajeViewSet(ExportacionMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Pasaje.objects.all()
     serializer_class = PasajeSerializer
     permission_classes = [AllowAny]
+    exportacion_nombre = 'pasajes'
+    exportacion_fecha = 'viaje__fecha'
+    exportacion_columnas = (
+        'id_pasaje', 'viaje_id', 'viaje__fecha', 'viaje__ruta__nombre', 'asiento__numero_asiento',
+        'pasajero__cedula', 'pasajero__cedula__nombre', 'pasajero__cedula__apellido',
+        'origen__nombre', 'destino__nombre', 'reserva_id',
+    )
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -226,41 +431,168 @@ class DetalleReservaViewSet(viewsets.ModelViewSet):
         return queryset
 """
 
-class EncomiendaViewSet(viewsets.ModelViewSet):
-    queryset = Encomienda.objects.select_related(
-        'viaje', 'cliente', 'origen', 'destino'
-    )
+class EncomiendaViewSet(ExportacionMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
+    queryset = Encomienda.objects.all()
     serializer_class = EncomiendaSerializer
     permission_classes = [AllowAny]
+    ordering = ('-fecha_creacion', '-id_encomienda')
+    exportacion_nombre = 'encomiendas'
+    exportacion_fecha = 'fecha_creacion__date'
+    exportacion_columnas = (
+        'id_encomienda', 'fecha_creacion', 'viaje_id', 'viaje__fecha', 'cliente__razon_social', 'remitente',
+        'ruc_ci', 'numero_contacto', 'origen__nombre', 'destino__nombre', 'tipo_envio', 'cantidad_sobre',
+        'cantidad_paquete', 'flete', 'codigo_seguimiento', 'estado', 'ubicacion__nombre', 'fecha_estado',
+    )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for parametro, campo in (('ruc_ci', 'ruc_ci'), ('numero_contacto', 'numero_contacto'), ('estado', 'estado'),
+                                 ('viaje', 'viaje_id'), ('origen', 'origen_id'), ('destino', 'destino_id')):
+            valor = self.request.query_params.get(parametro, None)
+            if valor:
+                queryset = queryset.filter(**{campo: valor})
+        return queryset
 
-class TipoDocumentoViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], url_path=r'rastrear/(?P<codigo>[^/.]+)')
+    def rastrear(self, request, codigo=None):
+        """Estado actual por código de seguimiento; ?historial=1 agrega los eventos."""
+        encomienda = seguimiento.rastrear(codigo)
+        if encomienda is None:
+            return Response({'detail': 'No existe una encomienda con ese código'}, status=status.HTTP_404_NOT_FOUND)
+        data = RastreoEncomiendaSerializer(encomienda).data
+        if request.query_params.get('historial') in ('1', 'true'):
+            eventos = encomienda.eventos.select_related('parada').order_by('fecha', 'pk')
+            data['eventos'] = EventoRastreoSerializer(eventos, many=True).data
+        return Response(data)
+
+    @action(detail=True, methods=['get', 'post'])
+    def eventos(self, request, pk=None):
+        """Historial de seguimiento; POST agrega un evento (cargada, llegada, entregada)."""
+        encomienda = self.get_object()
+        if request.method == 'GET':
+            eventos = encomienda.eventos.select_related('parada').order_by('fecha', 'pk')
+            return Response(EventoEncomiendaSerializer(eventos, many=True).data)
+        serializer = EventoEncomiendaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            evento = registrar_evento(encomienda, **serializer.validated_data)
+        except EventoInvalido as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(EventoEncomiendaSerializer(evento).data, status=status.HTTP_201_CREATED)
+
+class TipoDocumentoViewSet(CacheCatalogoMixin, viewsets.ModelViewSet):
     queryset = TipoDocumento.objects.all()
     serializer_class = TipoDocumentoSerializer
+    pagination_class = None
+    cache_modelos = [TipoDocumento]
 
 class TimbradoViewSet(viewsets.ModelViewSet):
     queryset = Timbrado.objects.all()
     serializer_class = TimbradoSerializer
+    pagination_class = None
+
+class PuntoExpedicionViewSet(viewsets.ModelViewSet):
+    queryset = PuntoExpedicion.objects.all()
+    serializer_class = PuntoExpedicionSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        timbrado = self.request.query_params.get('timbrado', None)
+        parada = self.request.query_params.get('parada', None)
+        if timbrado:
+            queryset = queryset.filter(timbrado_id=timbrado)
+        if parada:
+            queryset = queryset.filter(parada_id=parada)
+        return queryset
 
-class CabeceraFacturaViewSet(viewsets.ModelViewSet):
+class CabeceraFacturaViewSet(ExportacionMixin, viewsets.ModelViewSet):
     queryset = CabeceraFactura.objects.all()
     serializer_class = CabeceraFacturaSerializer
+    ordering = ('-fecha_factura', '-id')
+    exportacion_nombre = 'facturas'
+    exportacion_fecha = 'fecha_factura'
+    exportacion_columnas = (
+        'id', 'numero_factura', 'fecha_factura', 'timbrado__numero_timbrado', 'cliente__razon_social',
+        'cliente__cedula', 'cliente__dv', 'empleado_id', 'parada__nombre', 'condicion', 'estado',
+        'monto_total', 'monto_exenta', 'monto_iva_5', 'monto_iva_10',
+    )
 
-class DetalleFacturaViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def emitir(self, request):
+        """Factura pasajes y encomiendas calculando precios e IVA en el servidor."""
+        serializer = EmisionFacturaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            factura, lineas = emitir_factura(**serializer.validated_data, request=request)
+        except ItemsYaFacturados as e:
+            return Response(
+                {'detail': str(e), 'pasajes': e.pasajes, 'encomiendas': e.encomiendas},
+                status=status.HTTP_409_CONFLICT
+            )
+        except FacturacionError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = CabeceraFacturaSerializer(factura, context=self.get_serializer_context()).data
+        data['detalles'] = DetalleFacturaSerializer(lineas, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+class DetalleFacturaViewSet(ExportacionMixin, viewsets.ModelViewSet):
     queryset = DetalleFactura.objects.all()
     serializer_class = DetalleFacturaSerializer
+    exportacion_nombre = 'detalles-factura'
+    exportacion_fecha = 'factura__fecha_factura'
+    exportacion_columnas = (
+        'id', 'factura_id', 'factura__numero_factura', 'factura__fecha_factura', 'factura__estado',
+        'pasaje_id', 'encomienda_id', 'descripcion', 'cantidad', 'precio_unitario', 'iva_porcentaje', 'subtotal',
+    )
 
 class HistorialFacturaViewSet(viewsets.ModelViewSet):
     queryset = HistorialFactura.objects.all()
     serializer_class = HistorialFacturaSerializer
+    ordering = ('-fecha_cambio', '-id')
 
 class CajaViewSet(viewsets.ModelViewSet):
     queryset = Caja.objects.all()
     serializer_class = CajaSerializer
 
+    @action(detail=True, methods=['post'])
+    def cerrar(self, request, pk=None):
+        """Arqueo y cierre: usa el saldo corriente de la sesión, sin sumar sus movimientos."""
+        serializer = CierreCajaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            cierre, esperado, diferencia = cerrar_caja(self.get_object().pk, **serializer.validated_data)
+        except CajaNoDisponible as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'cierre': CabeceraCajaSerializer(cierre).data,
+            'saldo_esperado': f'{esperado:.2f}',
+            'diferencia': None if diferencia is None else f'{diferencia:.2f}',
+        })
+
 class CabeceraCajaViewSet(viewsets.ModelViewSet):
     queryset = CabeceraCaja.objects.all()
     serializer_class = CabeceraCajaSerializer
+    ordering = ('-fecha_mov', '-id')
 
 class DetalleCajaViewSet(viewsets.ModelViewSet):
     queryset = DetalleCaja.objects.all()
-    serializer_class = DetalleCajaSerializer
\ No newline at end of file
+    serializer_class = DetalleCajaSerializer
+    ordering = ('-fecha_transaccion', '-id')
+
+
+class InstrumentacionView(APIView):
+    """Histogramas por ruta del middleware de instrumentación; DELETE los reinicia."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'activa': instrumentacion.activa(),
+            'limites_ms': instrumentacion.LIMITES_MS,
+            'limites_consultas': instrumentacion.LIMITES_CONSULTAS,
+            'rutas': instrumentacion.histogramas(),
+        })
+
+    def delete(self, request):
+        instrumentacion.reiniciar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
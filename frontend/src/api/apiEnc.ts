@@ -1,4 +1,5 @@
 import axios, { AxiosInstance, InternalAxiosRequestConfig, AxiosResponse } from "axios";
+import { obtenerTodos } from "./paginacion";
 
 const URL = import.meta.env.VITE_BACKEND_URL || "http://localhost:8000";
 
@@ -33,7 +34,7 @@ const createApi = <T extends { id?: number | string }>(resource: string): ApiMet
   });
 
   return {
-    getAll: () => api.get<T[]>("/"),
+    getAll: () => obtenerTodos<T>("/", {}, api),
     getOne: (id: number | string) => api.get<T>(`/${id}/`),
     create: (data: Omit<T, 'id'>) => api.post<T>("/", data),
     update: (id: number | string, data: Partial<T>) => api.put<T>(`/${id}/`, data),
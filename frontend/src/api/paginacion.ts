@@ -0,0 +1,38 @@
+import axios, { AxiosInstance, AxiosRequestConfig, AxiosResponse } from "axios";
+
+// Los listados del backend vienen paginados por cursor; los catálogos chicos
+// (empresas, localidades, ...) siguen devolviendo la lista completa.
+export interface Pagina<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+const TAMANO_PAGINA = 500;
+
+// Trae todas las filas de un listado siguiendo `next` hasta el final. Devuelve
+// la respuesta de la primera página con `data` reemplazado por la lista entera.
+export const obtenerTodos = async <T>(
+  url: string,
+  config: AxiosRequestConfig = {},
+  cliente: AxiosInstance = axios
+): Promise<AxiosResponse<T[]>> => {
+  const respuesta = await cliente.get<T[] | Pagina<T>>(url, {
+    ...config,
+    params: { page_size: TAMANO_PAGINA, ...config.params },
+  });
+  const datos = respuesta.data;
+  if (Array.isArray(datos)) {
+    return { ...respuesta, data: datos };
+  }
+
+  const filas = [...datos.results];
+  let siguiente = datos.next;
+  while (siguiente) {
+    // `next` ya trae el cursor y los mismos filtros
+    const { data: pagina } = await cliente.get<Pagina<T>>(siguiente, { ...config, params: undefined });
+    filas.push(...pagina.results);
+    siguiente = pagina.next;
+  }
+  return { ...respuesta, data: filas };
+};
@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { obtenerTodos } from "../../api/paginacion";
 import { Trash, Armchair } from "lucide-react";
 
 interface Empresa {
@@ -62,7 +63,7 @@ const Buses = () => {
 
   const fetchBuses = async () => {
     try {
-      const response = await axios.get(BUSES_API_URL);
+      const response = await obtenerTodos(BUSES_API_URL);
       setBuses(response.data as Bus[]);
     } catch (error) {
       console.error("Error al obtener buses:", error);
@@ -80,7 +81,7 @@ const Buses = () => {
 
   const fetchAsientos = async (busId: number) => {
     try {
-      const response = await axios.get(`${ASIENTOS_API_URL}?bus=${busId}`);
+      const response = await obtenerTodos(`${ASIENTOS_API_URL}?bus=${busId}`);
       setAsientos(response.data as Asiento[]);
     } catch (error) {
       console.error("Error al obtener asientos:", error);
@@ -96,7 +97,7 @@ const Buses = () => {
       }
 
       // Obtener asientos existentes para el bus
-      const response = await axios.get(`${ASIENTOS_API_URL}?bus=${busId}`);
+      const response = await obtenerTodos(`${ASIENTOS_API_URL}?bus=${busId}`);
       const asientosExistentes = response.data as Asiento[];
       
       // Encontrar el número más alto de asiento existente
@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { obtenerTodos } from "../../api/paginacion";
 import { Edit, Trash } from "lucide-react";
 
 interface Usuario {
@@ -45,7 +46,7 @@ const Clientes = () => {
 
   const fetchClientes = async () => {
     try {
-      const response = await axios.get(CLIENTES_API_URL);
+      const response = await obtenerTodos(CLIENTES_API_URL);
       console.log('Datos crudos de clientes:', response.data); // Debug
       
       // Validar que la respuesta tenga el formato esperado
@@ -62,7 +63,7 @@ const Clientes = () => {
   // Añadir esta función
   const fetchUsuarios = async () => {
     try {
-      const response = await axios.get(USUARIOS_API_URL);
+      const response = await obtenerTodos(USUARIOS_API_URL);
       setUsuarios(response.data as Usuario[]);
     } catch (error) {
       console.error("Error al obtener usuarios:", error);
@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { obtenerTodos } from "../../api/paginacion";
 import { Edit, Trash } from "lucide-react";
 
 interface Usuario {
@@ -47,7 +48,7 @@ const Empleados = () => {
 
   const fetchEmpleados = async () => {
     try {
-      const response = await axios.get(EMPLEADOS_API_URL);
+      const response = await obtenerTodos(EMPLEADOS_API_URL);
       if (Array.isArray(response.data)) {
         setEmpleados(response.data);
       } else {
@@ -60,7 +61,7 @@ const Empleados = () => {
 
   const fetchUsuarios = async () => {
     try {
-      const response = await axios.get(USUARIOS_API_URL);
+      const response = await obtenerTodos(USUARIOS_API_URL);
       setUsuarios(response.data);
     } catch (error) {
       console.error("Error al obtener usuarios:", error);
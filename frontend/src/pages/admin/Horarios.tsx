@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { obtenerTodos } from "../../api/paginacion";
 import { Edit, Trash } from "lucide-react";
 
 interface DiasSemana {
@@ -68,7 +69,7 @@ const Horarios = () => {
 
   const fetchHorarios = async () => {
     try {
-      const response = await axios.get(HORARIOS_API_URL);
+      const response = await obtenerTodos(HORARIOS_API_URL);
       setHorarios(response.data);
     } catch (error) {
       console.error("Error al obtener horarios:", error);
@@ -77,7 +78,7 @@ const Horarios = () => {
 
   const fetchRutas = async () => {
     try {
-      const response = await axios.get(RUTAS_API_URL);
+      const response = await obtenerTodos(RUTAS_API_URL);
       setRutas(response.data);
     } catch (error) {
       console.error("Error al obtener rutas:", error);
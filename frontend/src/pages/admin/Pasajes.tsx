@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { obtenerTodos } from "../../api/paginacion";
 import { Edit, Trash } from "lucide-react";
 //import { AsientosSelector } from "../../pages/admin/AsientosSelector";
 import AsientosSelector from "../../pages/admin/AsientosSelector2";
@@ -32,7 +33,7 @@ const Pasajes = () => {
 
   const fetchPasajes = async () => {
     try {
-      const response = await axios.get(PASAJES_API_URL);
+      const response = await obtenerTodos(PASAJES_API_URL);
       setPasajes(response.data);
     } catch (error) {
       console.error("Error al obtener pasajes:", error);
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { obtenerTodos } from '../../../api/paginacion';
 import PersonasForm from './PersonasForm';
 import PersonasTable from './PersonasTable';
 import UsuarioForm from '../UsuariosForm';
@@ -24,7 +25,7 @@ const Personas = () => {
   const fetchPersonas = async () => {
     try {
       setLoading(true);
-      const response = await axios.get<Persona[]>(PERSONAS_API_URL);
+      const response = await obtenerTodos<Persona>(PERSONAS_API_URL);
       setPersonas(response.data);
       setError(null);
     } catch (err) {
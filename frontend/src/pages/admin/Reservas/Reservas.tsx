@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react';
 import axios from 'axios';
+import { obtenerTodos } from '../../../api/paginacion';
 import ReservaTable from './ReservaTable';
 import ReservaForm from './ReservaForm';
 
@@ -74,9 +75,9 @@ const Reservas = () => {
     setLoading(true);
     try {
       const [clientesRes, viajesRes, pasajerosRes] = await Promise.all([
-        axios.get<Cliente[]>(`${API_URL}/clientes/`),
-        axios.get<Viaje[]>(`${API_URL}/viajes/`),
-        axios.get<Pasajero[]>(`${API_URL}/pasajeros/`)
+        obtenerTodos<Cliente>(`${API_URL}/clientes/`),
+        obtenerTodos<Viaje>(`${API_URL}/viajes/`),
+        obtenerTodos<Pasajero>(`${API_URL}/pasajeros/`)
       ]);
       console.log('Viajes cargados:', viajesRes.data);
 
@@ -94,7 +95,7 @@ const Reservas = () => {
   const fetchReservasPorCliente = async (clienteId: number) => {
     try {
       setLoading(true);
-      const response = await axios.get<ReservaConDetalles[]>(
+      const response = await obtenerTodos<ReservaConDetalles>(
         `${API_URL}/reservas/?cliente=${clienteId}&estado=Pendiente`
       );
       setReservasActivas(response.data);
@@ -117,7 +118,7 @@ const Reservas = () => {
     try {
       setLoading(true);
       // Primero verificar si hay reservas pendientes
-      const reservasExistentes = await axios.get<ReservaConDetalles[]>(
+      const reservasExistentes = await obtenerTodos<ReservaConDetalles>(
         `${API_URL}/reservas/?cliente=${clienteId}&estado=Pendiente`
       );
 
@@ -166,16 +167,23 @@ const Reservas = () => {
     try {
       setLoading(true);
       
-      // Crear todos los pasajes
-      await Promise.all(
-        pasajesTemp.map(pasaje => 
-          axios.post(`${API_URL}/pasajes/`, {
-            ...pasaje,
-            reserva: reservaActual.id_reserva
-          })
-        )
+      // Agrupar los pasajes por viaje: una sola petición por viaje
+      const pasajesPorViaje = pasajesTemp.reduce<Record<number, PasajeForm[]>>(
+        (grupos, pasaje) => {
+          (grupos[pasaje.viaje] ??= []).push(pasaje);
+          return grupos;
+        },
+        {}
       );
 
+      // Crear todos los pasajes de cada viaje en una sola transacción
+      for (const [viaje, pasajesViaje] of Object.entries(pasajesPorViaje)) {
+        await axios.post(`${API_URL}/viajes/${viaje}/reservar/`, {
+          reserva: reservaActual.id_reserva,
+          pasajes: pasajesViaje.map(({ pasajero, asiento }) => ({ pasajero, asiento }))
+        });
+      }
+
       // Reset states
       setPasajesTemp([]);
       setReservaActual(null);
@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { obtenerTodos } from "../../api/paginacion";
 import { Edit, Trash, MapPin, ArrowUp, ArrowDown, X } from "lucide-react";
 
 interface Localidad {
@@ -53,7 +54,7 @@ const Rutas = () => {
 
   const fetchRutas = async () => {
     try {
-      const response = await axios.get<Ruta[]>(RUTAS_API_URL);
+      const response = await obtenerTodos<Ruta>(RUTAS_API_URL);
       setRutas(response.data);
     } catch (error) {
       console.error("Error al obtener rutas:", error);
@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { obtenerTodos } from "../../../api/paginacion";
 import { Ruta, Localidad, Parada } from "./types";
 import RutasForm from "./RutasForm";
 import RutasTable from "./RutasTable";
@@ -24,7 +25,7 @@ const Rutas = () => {
 
   const fetchRutas = async () => {
     try {
-      const response = await axios.get<Ruta[]>(RUTAS_API_URL);
+      const response = await obtenerTodos<Ruta>(RUTAS_API_URL);
       setRutas(response.data);
     } catch (error) {
       console.error("Error al obtener rutas:", error);
@@ -42,7 +43,7 @@ const Rutas = () => {
 
   const fetchParadas = async () => {
     try {
-      const response = await axios.get<Parada[]>("http://127.0.0.1:8000/api/paradas/");
+      const response = await obtenerTodos<Parada>("http://127.0.0.1:8000/api/paradas/");
       setParadas(response.data);
     } catch (error) {
       console.error("Error al obtener paradas:", error);
@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { obtenerTodos } from '../../../api/paginacion';
 import { Ruta, DetalleRuta, Parada } from './types';
 
 const BASE_URL = "http://127.0.0.1:8000/api";
@@ -6,7 +7,7 @@ const BASE_URL = "http://127.0.0.1:8000/api";
 export const rutasApi = {
   // Rutas
   getRutas: () => 
-    axios.get<Ruta[]>(`${BASE_URL}/rutas/`),
+    obtenerTodos<Ruta>(`${BASE_URL}/rutas/`),
   
   createRuta: (ruta: Omit<Ruta, 'id_ruta'>) => 
     axios.post<Ruta>(`${BASE_URL}/rutas/`, ruta),
@@ -19,11 +20,11 @@ export const rutasApi = {
 
   // Paradas
   getParadas: () => 
-    axios.get<Parada[]>(`${BASE_URL}/paradas/`),
+    obtenerTodos<Parada>(`${BASE_URL}/paradas/`),
 
   // Detalles de Ruta
   getDetalles: (rutaId: number) => 
-    axios.get<DetalleRuta[]>(`${BASE_URL}/detalle-rutas/?ruta=${rutaId}`),
+    obtenerTodos<DetalleRuta>(`${BASE_URL}/detalle-rutas/?ruta=${rutaId}`),
   
   createDetalle: (detalle: Omit<DetalleRuta, 'id'>) => 
     axios.post<DetalleRuta>(`${BASE_URL}/detalle-rutas/`, detalle),
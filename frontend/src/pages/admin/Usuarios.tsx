@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { obtenerTodos } from "../../api/paginacion";
 import { Edit, Trash } from "lucide-react";
 
 interface Usuario {
@@ -42,7 +43,7 @@ const Usuarios = () => {
 
   const fetchUsuarios = async () => {
     try {
-      const response = await axios.get<Usuario[]>(USUARIOS_API_URL);
+      const response = await obtenerTodos<Usuario>(USUARIOS_API_URL);
       setUsuarios(response.data);
     } catch (error) {
       console.error("Error al obtener usuarios:", error);
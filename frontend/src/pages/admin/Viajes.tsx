@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
+import { obtenerTodos } from "../../api/paginacion";
 import { Edit, Trash } from "lucide-react";
 
 interface Bus {
@@ -61,7 +62,7 @@ const Viajes = () => {
 
   const fetchViajes = async () => {
     try {
-      const response = await axios.get(VIAJES_API_URL);
+      const response = await obtenerTodos(VIAJES_API_URL);
       setViajes(response.data);
     } catch (error) {
       console.error("Error al obtener viajes:", error);
@@ -70,7 +71,7 @@ const Viajes = () => {
 
   const fetchBuses = async () => {
     try {
-      const response = await axios.get(BUSES_API_URL);
+      const response = await obtenerTodos(BUSES_API_URL);
       setBuses(response.data);
     } catch (error) {
       console.error("Error al obtener buses:", error);
@@ -79,7 +80,7 @@ const Viajes = () => {
 
   const fetchHorarios = async () => {
     try {
-      const response = await axios.get(HORARIOS_API_URL);
+      const response = await obtenerTodos(HORARIOS_API_URL);
       setHorarios(response.data);
     } catch (error) {
       console.error("Error al obtener horarios:", error);
@@ -88,7 +89,7 @@ const Viajes = () => {
 
   const fetchRutas = async () => {
     try {
-      const response = await axios.get(RUTAS_API_URL);
+      const response = await obtenerTodos(RUTAS_API_URL);
       setRutas(response.data);
     } catch (error) {
       console.error("Error al obtener rutas:", error);
@@ -47,6 +47,22 @@ interface Viaje {
   observaciones?: string
 }
 
+// Los listados vienen paginados ({ next, previous, results }): se sigue `next`
+// hasta juntar todas las filas
+async function obtenerTodos<T>(url: string): Promise<T[]> {
+  const filas: T[] = []
+  let siguiente: string | null = `${url}?page_size=500`
+  while (siguiente) {
+    const respuesta = await fetch(siguiente)
+    if (!respuesta.ok) throw new Error(`${url} respondió ${respuesta.status}`)
+    const datos = await respuesta.json()
+    if (Array.isArray(datos)) return datos
+    filas.push(...datos.results)
+    siguiente = datos.next
+  }
+  return filas
+}
+
 function Reservas() {
   const [origen, setOrigen] = useState<number | ''>('');
   const [destino, setDestino] = useState<number | ''>('');
@@ -60,12 +76,9 @@ function Reservas() {
   useEffect(() => {
     setLoading(true)
     Promise.all([
-      fetch('http://localhost:8000/api/paradas/'),
-      fetch('http://localhost:8000/api/viajes/')
+      obtenerTodos<Parada>('http://localhost:8000/api/paradas/'),
+      obtenerTodos<Viaje>('http://localhost:8000/api/viajes/')
     ])
-      .then(([paradasRes, viajesRes]) => 
-        Promise.all([paradasRes.json(), viajesRes.json()])
-      )
       .then(([paradasData, viajesData]) => {
         setParadas(paradasData)
         setViajes(viajesData)